@@ -1,23 +1,41 @@
 import os
+import time
 import asyncio
 import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
-import httpx
-from sentence_transformers import SentenceTransformer
 import numpy as np
 
-from database import get_database
+from bristol_analysis import bristol_pipeline, summarize_bristol
+from communication_triage import TriageSummary, create_triage_engine
+from database import date_since, get_database
+from llm_cache import ResponseCache, create_response_cache
+from llm_provider import LLMProvider, ProviderError, create_provider
+from metrics import OPERATION_LATENCY, RAG_STAGE_LATENCY, REGISTRY, cache_collector, observe_ollama
+from retrieval import RetrievalResult, count_tokens, fit_to_budget
+from singleflight import SingleFlight
 from vector_store import VectorStore
 
 logger = logging.getLogger(__name__)
 
+# Retrieval-augmented chat: chunks retrieved, prompt tokens they may use, and
+# the largest distance still considered relevant (normalized vectors, L2)
+RAG_TOP_K = int(os.getenv('RAG_TOP_K', '4'))
+RAG_CONTEXT_TOKENS = int(os.getenv('RAG_CONTEXT_TOKENS', '400'))
+RAG_MAX_DISTANCE = float(os.getenv('RAG_MAX_DISTANCE', '1.2'))
+
 class AIService:
-    def __init__(self, vector_store: VectorStore):
+    def __init__(self, vector_store: VectorStore, response_cache: Optional[ResponseCache] = None,
+                 provider: Optional[LLMProvider] = None):
         self.vector_store = vector_store
-        self.embedding_model = None
-        self.ollama_base_url = "http://localhost:11434"
-        self.model_name = "gemma3n:latest"  # Lightweight model for healthcare
+        self.provider = provider or create_provider()
+        self.response_cache = response_cache or create_response_cache()
+        self.single_flight = SingleFlight()
+        REGISTRY.add_collector(cache_collector("ai_service", self.response_cache))
+        # Shared with the vector store, so only one embedding model is loaded
+        self.embeddings = vector_store.embeddings
+        self.triage = create_triage_engine()
+        self.model_name = self.provider.model
         self.db = None
         self._ready = False
 
@@ -26,9 +44,8 @@ class AIService:
         try:
             logger.info("Initializing AI service...")
             
-            # Initialize embedding model
-            logger.info("Loading embedding model...")
-            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+            # Load the embedding model in the background
+            self.embeddings.start_warmup()
             
             # Initialize database connection
             self.db = await get_database()
@@ -46,52 +63,111 @@ class AIService:
     def is_ready(self) -> bool:
         return self._ready
 
+    async def close(self):
+        """Release the pooled LLM connections held for the service lifetime."""
+        await self.provider.close()
+        self._ready = False
+
     async def _check_ollama_health(self):
         """Check if Ollama service is available."""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.ollama_base_url}/api/tags")
-                if response.status_code == 200:
-                    logger.info("Ollama service is available")
-                    return True
+            await self.provider.list_models()
+            logger.info(f"LLM provider {self.provider.name} is available")
+            return True
         except Exception as e:
             logger.warning(f"Ollama service not available: {e}")
         return False
 
+    @OPERATION_LATENCY.time(operation="call_ollama")
     async def _call_ollama(self, prompt: str, system_prompt: str = None) -> str:
         """Call Ollama API for text generation."""
         try:
-            payload = {
-                "model": self.model_name,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.7,
-                    "top_p": 0.9,
-                    "max_tokens": 500
-                }
+            options = {
+                "temperature": 0.7,
+                "top_p": 0.9,
+                "num_predict": 500
             }
+
+            cache_key = self.response_cache.make_key(prompt, system_prompt or "", self.model_name, options)
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
             
-            if system_prompt:
-                payload["system"] = system_prompt
-            
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.ollama_base_url}/api/generate",
-                    json=payload
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    return result.get("response", "")
-                else:
-                    logger.error(f"Ollama API error: {response.status_code}")
-                    return "Je suis désolé, je ne peux pas répondre pour le moment."
+            # Identical prompts already in flight share one upstream call
+            text, _ = await self.single_flight.do(
+                cache_key, lambda: self._generate_uncached(prompt, system_prompt, options, cache_key)
+            )
+            if text is None:
+                return "Je suis désolé, je ne peux pas répondre pour le moment."
+            return text
                     
         except Exception as e:
             logger.error(f"Error calling Ollama: {e}")
             return "Je suis désolé, je ne peux pas répondre pour le moment."
 
+    async def _generate_uncached(self, prompt: str, system_prompt: Optional[str],
+                                 options: Dict[str, Any], cache_key: str) -> Optional[str]:
+        """Send one generate request to the LLM provider and cache a successful response."""
+        try:
+            result = await self.provider.generate(prompt, options, system=system_prompt)
+        except ProviderError as e:
+            logger.error(str(e))
+            return None
+
+        observe_ollama(result, caller="ai_service", model=self.model_name)
+        text = result.get("response", "")
+        await self.response_cache.set(cache_key, text)
+        return text
+
+    async def retrieve_context(self, question: str, limit: int = RAG_TOP_K,
+                               max_tokens: int = RAG_CONTEXT_TOKENS) -> RetrievalResult:
+        """
+        Retrieve the knowledge chunks most relevant to `question`, trimmed to
+        `max_tokens`, with the time spent in each stage (in ms).
+        """
+        result = RetrievalResult()
+
+        def lap(stage: str, started: float):
+            elapsed = time.perf_counter() - started
+            RAG_STAGE_LATENCY.observe(elapsed, stage=stage)
+            result.timings[f"{stage}_ms"] = round(elapsed * 1000, 2)
+
+        try:
+            started = time.perf_counter()
+            # Lookup counted here only: the search below skips the cache
+            await self.vector_store.refresh_local_indexes()
+            documents = self.vector_store.cached_search(question, limit)
+            lap("cache", started)
+
+            if documents is None:
+                embedding = None
+                if self.vector_store.needs_embedding(question):
+                    started = time.perf_counter()
+                    embedding = await self.embeddings.embed_one(question)
+                    lap("embed", started)
+
+                started = time.perf_counter()
+                documents = await self.vector_store.search_documents(
+                    question, limit, query_embedding=embedding, check_cache=False
+                )
+                lap("search", started)
+            else:
+                result.cached = True
+        except Exception as e:
+            logger.warning(f"Knowledge retrieval failed: {e}")
+            return result
+
+        started = time.perf_counter()
+        result.documents = [
+            doc for doc in documents
+            if doc.get("distance") is None or doc["distance"] <= RAG_MAX_DISTANCE
+        ]
+        result.context = fit_to_budget([doc["content"] for doc in result.documents], max_tokens)
+        result.tokens = sum(count_tokens(chunk) for chunk in result.context)
+        lap("trim", started)
+        return result
+
+    @OPERATION_LATENCY.time(operation="process_chat_message")
     async def process_chat_message(
         self, 
         message: str, 
@@ -124,10 +200,23 @@ Tu NE dois PAS:
                 # Get recent patient data for context
                 patient_context = await self._get_patient_context(patient_id)
                 context_info = f"\nContexte de l'usager: {patient_context}"
+
+        # Ground the answer in the protocol library, within a fixed token budget
+        retrieval = await self.retrieve_context(message)
+        if retrieval.context:
+            knowledge = "\n".join(f"- {chunk}" for chunk in retrieval.context)
+            context_info += f"\nConnaissances pertinentes (protocoles et lignes directrices):\n{knowledge}"
         
         full_prompt = f"{context_info}\n\nQuestion: {message}"
         
+        started = time.perf_counter()
         response = await self._call_ollama(full_prompt, system_prompt)
+        RAG_STAGE_LATENCY.observe(time.perf_counter() - started, stage="generate")
+        logger.info(
+            f"Chat answered with {len(retrieval.context)} knowledge chunks "
+            f"({retrieval.tokens} tokens, cached={retrieval.cached}, timings={retrieval.timings}, "
+            f"generate_ms={round((time.perf_counter() - started) * 1000, 1)})"
+        )
         return response
 
     async def _get_patient_context(self, patient_id: str) -> str:
@@ -135,8 +224,8 @@ Tu NE dois PAS:
         try:
             # Get recent reports and communications
             recent_reports = await self.db.daily_reports.find(
-                {"patientId": patient_id}
-            ).sort("reportDate", -1).limit(3).to_list(length=None)
+                {"patientReports.patientId": patient_id}, {"_id": 1}
+            ).sort("reportDate", -1).limit(3).to_list(length=3)
             
             context = f"Derniers rapports disponibles: {len(recent_reports)} rapports"
             return context
@@ -145,33 +234,35 @@ Tu NE dois PAS:
             logger.error(f"Error getting patient context: {e}")
             return "Contexte de l'usager non disponible"
 
+    @OPERATION_LATENCY.time(operation="generate_patient_summary")
     async def generate_patient_summary(self, patient_id: str, date_range: int = 7) -> Dict[str, Any]:
         """Generate AI-powered patient summary."""
         try:
             # Get patient data
-            patient = await self.db.patients.find_one({"_id": patient_id})
+            patient = await self.db.patients.find_one(
+                {"_id": patient_id}, {"firstName": 1, "lastName": 1}
+            )
             if not patient:
                 raise ValueError("Patient not found")
 
-            # Get recent data
+            # Count recent data; served from the (patient, date) compound indexes
             cutoff_date = datetime.now() - timedelta(days=date_range)
             
-            reports = await self.db.daily_reports.find({
-                "patientId": patient_id,
-                "reportDate": {"$gte": cutoff_date.strftime("%Y-%m-%d")}
-            }).to_list(length=None)
-            
-            bristol_entries = await self.db.bristol_entries.find({
-                "patientId": patient_id,
-                "entryDate": {"$gte": cutoff_date.strftime("%Y-%m-%d")}
-            }).to_list(length=None)
+            reports_count, bristol_entries_count = await asyncio.gather(
+                self.db.daily_reports.count_documents({
+                    "patientReports.patientId": patient_id, **date_since("reportDate", cutoff_date)
+                }),
+                self.db.bristol_entries.count_documents({
+                    "patientId": patient_id, **date_since("entryDate", cutoff_date)
+                })
+            )
 
             # Generate summary using AI
             data_summary = f"""
 Usager: {patient.get('firstName', '')} {patient.get('lastName', '')}
 Période: {date_range} derniers jours
-Nombre de rapports: {len(reports)}
-Nombre d'entrées Bristol: {len(bristol_entries)}
+Nombre de rapports: {reports_count}
+Nombre d'entrées Bristol: {bristol_entries_count}
 """
 
             system_prompt = """Génère un résumé professionnel basé sur les données de l'usager. 
@@ -183,8 +274,8 @@ Reste factuel et bienveillant."""
             return {
                 "ai_summary": ai_summary,
                 "data_points": {
-                    "reports_count": len(reports),
-                    "bristol_entries_count": len(bristol_entries),
+                    "reports_count": reports_count,
+                    "bristol_entries_count": bristol_entries_count,
                     "date_range": date_range
                 }
             }
@@ -193,88 +284,80 @@ Reste factuel et bienveillant."""
             logger.error(f"Error generating patient summary: {e}")
             return {"error": "Impossible de générer le résumé"}
 
+    @OPERATION_LATENCY.time(operation="analyze_communications")
     async def analyze_communications(self, communications: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Analyze sentiment and urgency of communications."""
         try:
             analysis_results = []
-            
+            summary = TriageSummary()
+
             for comm in communications:
-                content = comm.get('content', '')
-                
-                # Simple sentiment analysis using keywords
-                urgent_keywords = ['urgent', 'immédiat', 'critique', 'emergency', 'problème']
-                positive_keywords = ['bien', 'excellent', 'amélioration', 'progrès', 'stable']
-                negative_keywords = ['préoccupant', 'difficile', 'problème', 'inquiétude']
-                
-                urgency_score = sum(1 for keyword in urgent_keywords if keyword.lower() in content.lower())
-                sentiment_score = (
-                    sum(1 for keyword in positive_keywords if keyword.lower() in content.lower()) -
-                    sum(1 for keyword in negative_keywords if keyword.lower() in content.lower())
-                )
-                
+                score = self.triage.score(comm.get('content', ''))
+                summary.add(comm, score)
                 analysis_results.append({
                     "communication_id": comm.get('_id'),
-                    "urgency_score": urgency_score,
-                    "sentiment_score": sentiment_score,
-                    "estimated_urgency": "high" if urgency_score > 0 else "normal",
-                    "estimated_sentiment": "positive" if sentiment_score > 0 else "negative" if sentiment_score < 0 else "neutral"
+                    "urgency_score": score.urgency,
+                    "sentiment_score": score.sentiment,
+                    "estimated_urgency": score.urgency_level,
+                    "estimated_sentiment": score.sentiment_label
                 })
 
             return {
                 "analyses": analysis_results,
-                "summary": {
-                    "total_communications": len(communications),
-                    "high_urgency_count": sum(1 for a in analysis_results if a["estimated_urgency"] == "high"),
-                    "positive_sentiment_count": sum(1 for a in analysis_results if a["estimated_sentiment"] == "positive")
-                }
+                "summary": summary.as_dict()
             }
 
         except Exception as e:
             logger.error(f"Error analyzing communications: {e}")
             return {"error": "Impossible d'analyser les communications"}
 
-    async def analyze_bristol_patterns(self, patient_id: str) -> Dict[str, Any]:
+    async def _aggregate_bristol(self, patient_ids: Optional[List[str]], date_range: int) -> Dict[str, Dict[str, Any]]:
+        cutoff_date = datetime.now() - timedelta(days=date_range)
+        cursor = self.db.bristol_entries.aggregate(bristol_pipeline(patient_ids, cutoff_date))
+        facets = await cursor.to_list(length=1)
+        return summarize_bristol(facets[0] if facets else {}, date_range)
+
+    @OPERATION_LATENCY.time(operation="analyze_bristol_patterns")
+    async def analyze_bristol_patterns(self, patient_id: str, date_range: int = 30) -> Dict[str, Any]:
         """Analyze Bristol scale patterns for health insights."""
         try:
-            # Get Bristol entries from last 30 days
-            cutoff_date = datetime.now() - timedelta(days=30)
-            
-            entries = await self.db.bristol_entries.find({
-                "patientId": patient_id,
-                "entryDate": {"$gte": cutoff_date.strftime("%Y-%m-%d")},
-                "type": "bowel"
-            }).to_list(length=None)
-
-            if not entries:
+            patients = await self._aggregate_bristol([patient_id], date_range)
+            analysis = patients.get(patient_id)
+            if not analysis:
                 return {"insights": "Pas assez de données pour l'analyse"}
+            return analysis
 
-            # Analyze patterns
-            bristol_values = [int(entry.get('value', '4')) for entry in entries if entry.get('value', '').isdigit()]
-            
-            if bristol_values:
-                avg_bristol = sum(bristol_values) / len(bristol_values)
-                
-                insights = []
-                if avg_bristol < 3:
-                    insights.append("Tendance vers la constipation")
-                elif avg_bristol > 5:
-                    insights.append("Tendance vers la diarrhée")
-                else:
-                    insights.append("Selles dans la normale")
-
-                return {
-                    "insights": "; ".join(insights),
-                    "average_bristol": round(avg_bristol, 1),
-                    "total_entries": len(entries),
-                    "date_range": 30
-                }
+        except Exception as e:
+            logger.error(f"Error analyzing Bristol patterns: {e}")
+            return {"error": "Impossible d'analyser les données Bristol"}
 
-            return {"insights": "Données insuffisantes pour l'analyse"}
+    @OPERATION_LATENCY.time(operation="analyze_bristol_patterns_bulk")
+    async def analyze_bristol_patterns_bulk(self, patient_ids: Optional[List[str]] = None,
+                                            date_range: int = 30) -> Dict[str, Any]:
+        """Bristol analysis for several patients (or every patient when None) in one query."""
+        try:
+            patients = await self._aggregate_bristol(patient_ids, date_range)
+            return {
+                "patients": patients,
+                "summary": {
+                    "patients_with_entries": len(patients),
+                    "constipation_trend": sorted(
+                        patient_id for patient_id, analysis in patients.items()
+                        if analysis["average_bristol"] is not None and analysis["average_bristol"] < 3
+                    ),
+                    "diarrhea_trend": sorted(
+                        patient_id for patient_id, analysis in patients.items()
+                        if analysis["average_bristol"] is not None and analysis["average_bristol"] > 5
+                    ),
+                    "date_range": date_range
+                }
+            }
 
         except Exception as e:
             logger.error(f"Error analyzing Bristol patterns: {e}")
             return {"error": "Impossible d'analyser les données Bristol"}
 
+    @OPERATION_LATENCY.time(operation="generate_care_recommendations")
     async def generate_care_recommendations(self, patient_id: str) -> Dict[str, Any]:
         """Generate personalized care recommendations."""
         try:
@@ -0,0 +1,79 @@
+"""
+Latency benchmark for the local /analyze-text analyzer.
+
+Measures TextAnalyzer.analyze on synthetic observation notes of increasing
+length, optionally with a dictionary file (one word per line), and reports
+p50/p99 latency in milliseconds. The target is p99 < 10 ms for typical notes.
+
+Usage:
+    python benchmarks/analyzer_benchmark.py --iterations 2000 [--dictionary words.txt]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_analyzer import Dawg, TextAnalyzer, WORD_PATTERN, load_dictionary  # noqa: E402
+
+SENTENCES = [
+    "L'usager a bien dormi durant la nuit et s'est levé calme.",
+    "Selles de type Bristol 4 observées ce matin , hydratation adéquate.",
+    "ca va mieux depuis l'ajustement de la routine du soir.",
+    "Il a refusé son déjeuner parmis les options proposées.",
+    "Comportement stable, aucune automutilation observée.  Suivi PRN non requis.",
+    "quand meme surveiller la dysphagie au repas de midi. merci",
+]
+
+
+def make_note(sentence_count: int, rng: random.Random) -> str:
+    return " ".join(rng.choice(SENTENCES) for _ in range(sentence_count))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * (len(ordered) - 1)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--dictionary", help="word list; defaults to the words of the sample notes")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    if args.dictionary:
+        dictionary = load_dictionary(args.dictionary)
+    else:
+        dictionary = Dawg.from_words(
+            word.lower() for sentence in SENTENCES for word in WORD_PATTERN.findall(sentence)
+        )
+    analyzer = TextAnalyzer(dictionary)
+
+    results = []
+    for sentence_count in (3, 15, 60):
+        notes = [make_note(sentence_count, rng) for _ in range(50)]
+        timings = []
+        for i in range(args.iterations):
+            note = notes[i % len(notes)]
+            started = time.perf_counter()
+            analyzer.analyze(note)
+            timings.append((time.perf_counter() - started) * 1000)
+        results.append({
+            "note_chars": sum(len(n) for n in notes) // len(notes),
+            "iterations": args.iterations,
+            "p50_ms": round(percentile(timings, 50), 3),
+            "p99_ms": round(percentile(timings, 99), 3),
+        })
+
+    print(json.dumps({
+        "dictionary_words": len(dictionary) if dictionary else 0,
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Regression check for the analyzer's unknown-word underlines.
+
+Runs the default TextAnalyzer (with the shipped dictionary) over realistic,
+correctly written care notes and fails when any word is reported as
+"Mot inconnu": every such hit would be a false underline in the editor.
+Run it after changing text_analyzer.py or regenerating the dictionary.
+
+Usage:
+    python benchmarks/analyzer_notes_check.py [--dictionary words.txt]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_analyzer import DEFAULT_DICTIONARY_PATH, TextAnalyzer, load_dictionary  # noqa: E402
+
+NOTES = [
+    "Aujourd'hui, l'usager a bien dormi.",
+    "Aide à l'habillage ce matin, les gens de la famille sont venus.",
+    "Le matériel de soins est rangé dans l'armoire de la salle de bain.",
+    "Nuit calme. L'usager s'est réveillé deux fois et s'est rendormi seul.",
+    "Les deux dernières nuits ont été agitées; il s'est levé plusieurs fois vers 3 h.",
+    "Globalement, la journée s'est bien passée et elle était enthousiaste à l'atelier.",
+    "Passage de l'infirmière à 14 h pour la prise de la glycémie: 6,2 mmol/L.",
+    "Les professionnels de l'équipe se rencontrent jeudi pour réviser le plan d'intervention.",
+    "Selles de type 4 sur l'échelle de Bristol après le dîner, aucune douleur rapportée.",
+    "Pas de selles depuis trois jours; laxatif administré au coucher selon la prescription.",
+    "Elle a bu environ 1,5 litre d'eau et de jus durant la journée; bonne hydratation.",
+    "Refus du souper, il a accepté une collation vers 19 h (yogourt et biscuits).",
+    "Médication du soir administrée à 21 h, sans effet secondaire observé.",
+    "Acétaminophène 500 mg donné en PRN à 10 h pour un mal de tête, soulagement en 30 minutes.",
+    "Crise d'épilepsie d'environ deux minutes vers 16 h; protocole appliqué et infirmière avisée.",
+    "Ecchymose de 3 cm observée sur l'avant-bras gauche, origine inconnue; rapport d'incident rempli.",
+    "L'usagère a été désorganisée après l'appel de sa mère; elle criait et frappait la porte.",
+    "Retrait dans sa chambre proposé, elle s'est calmée en une dizaine de minutes.",
+    "Utilisation des pictogrammes pour annoncer la transition vers la douche, bonne collaboration.",
+    "Il a participé à la sortie à l'épicerie et a payé ses achats avec un peu d'aide.",
+    "Comportements d'automutilation (se mord la main) lors des bruits forts; casque antibruit offert.",
+    "Bonne humeur toute la soirée; il a regardé un film au salon avec les autres résidents.",
+    "La psychoéducatrice recommande de maintenir l'horaire visuel et de renforcer les demandes verbales.",
+    "Rendez-vous chez le dentiste confirmé pour mardi prochain à 9 h 30; transport adapté réservé.",
+    "Sa sœur est venue le visiter en après-midi; la visite s'est bien déroulée.",
+    "Il a tendance à manger rapidement; rappels fréquents pour prendre de plus petites bouchées.",
+    "Texture des repas modifiée (purée) à la suite de l'évaluation de la nutritionniste pour dysphagie.",
+    "Douche donnée avec l'aide de deux intervenants; peau intacte, aucune rougeur aux points d'appui.",
+    "Elle s'est plainte de maux de ventre avant le déjeuner; température normale, à surveiller.",
+    "Les parents demandent d'être appelés si la toux persiste demain matin.",
+    "Note au dossier: l'usager refuse de porter ses lunettes depuis lundi.",
+    "Promenade au parc avec l'éducatrice; il a salué les voisins et il est resté calme.",
+    "Le médecin a ajusté la dose de mélatonine; début du nouveau traitement ce soir.",
+    "Agitation en fin de journée, probablement liée au changement d'intervenant.",
+    "Suivi du poids mensuel: 62 kg, stable par rapport au mois dernier.",
+    "Il a demandé à téléphoner à son frère; l'appel a duré une quinzaine de minutes.",
+    "Nausées en matinée, un vomissement vers 8 h; hydratation encouragée par petites gorgées.",
+    "Le lève-personne a été utilisé pour le transfert du lit au fauteuil roulant.",
+    "L'ergothérapeute passera la semaine prochaine pour évaluer l'orthèse.",
+    "Consignes transmises à l'équipe de nuit: surveiller la respiration et noter les réveils.",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dictionary", default=DEFAULT_DICTIONARY_PATH)
+    args = parser.parse_args()
+
+    dictionary = load_dictionary(args.dictionary)
+    if dictionary is None:
+        sys.exit(f"Could not load {args.dictionary}")
+    analyzer = TextAnalyzer(dictionary)
+
+    failures = 0
+    for note in NOTES:
+        unknown = [
+            note[error["start"]:error["end"]] for error in analyzer.analyze(note)
+            if error["message"].startswith("Mot inconnu")
+        ]
+        if unknown:
+            failures += 1
+            print(f"FAIL {unknown}: {note}")
+    print(f"{len(NOTES) - failures}/{len(NOTES)} notes without unknown-word hits")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Golden check and micro-benchmark for the response cleanup engine.
+
+First replays the recorded model outputs in data/cleanup_golden.json through
+both the batch cleaner and the StreamingCleaner (fed a few characters at a
+time) and exits with status 1 on any mismatch. It then times the precompiled
+engine against the previous prefix-loop implementation on the same outputs
+and on long summaries, and prints per-call latency in microseconds.
+
+Usage:
+    python benchmarks/cleanup_benchmark.py --iterations 20000 [--check-only]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_cleanup import (  # noqa: E402
+    CORRECTION_CLEANUP,
+    ENHANCEMENT_CLEANUP,
+    SUMMARY_CLEANUP,
+    SUMMARY_SENTENCES,
+    StreamingCleaner,
+)
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'cleanup_golden.json')
+
+PROFILES = {
+    'correction': CORRECTION_CLEANUP,
+    'enhancement': ENHANCEMENT_CLEANUP,
+    'summary': SUMMARY_CLEANUP,
+}
+
+# Prefix lists used by the endpoints before the precompiled engine
+LEGACY_PREFIXES = {
+    'correction': [
+        'voici', 'voilà', 'le texte corrigé', 'texte corrigé', 'correction',
+        'voici le texte', 'voilà le texte', 'le résultat', 'résultat',
+        'voici la correction', 'voilà la correction', 'après correction'
+    ],
+    'summary': [
+        'voici', 'voilà', 'le résumé', 'résumé', 'voici le résumé',
+        'voilà le résumé', 'résumé:', 'voici un résumé', 'résultat',
+        'voici la synthèse', 'synthèse', 'en résumé', 'pour résumer',
+        'ce résumé', 'ce résumé est', 'le patient', 'dans le contexte'
+    ],
+}
+LEGACY_PREFIXES['enhancement'] = LEGACY_PREFIXES['correction']
+
+
+def legacy_clean(text, prefixes, sentences=()):
+    """The original per-prefix loop, kept for comparison."""
+    text = text.strip()
+    text_lower = text.lower()
+    for sentence in sentences:
+        if sentence in text_lower:
+            lines = text.split('.')
+            cleaned_lines = []
+            found_content = False
+            for line in lines:
+                if not found_content and any(s in line.lower() for s in sentences):
+                    continue
+                if not found_content and line.strip() and not any(s in line.lower() for s in sentences):
+                    found_content = True
+                if found_content:
+                    cleaned_lines.append(line)
+            text = '.'.join(cleaned_lines).strip()
+            break
+    text_lower = text.lower()
+    for prefix in prefixes:
+        if text_lower.startswith(prefix):
+            lines = text.split('\n')
+            for i, line in enumerate(lines):
+                if ':' in line and any(p in line.lower() for p in prefixes):
+                    text = '\n'.join(lines[i+1:]).strip()
+                    break
+            else:
+                text = text[len(prefix):].strip()
+            break
+    if text.startswith('"') and text.endswith('"'):
+        text = text[1:-1].strip()
+    if text.startswith(':'):
+        text = text[1:].strip()
+    return text
+
+
+def stream(profile, raw, chunk_size=3):
+    cleaner = StreamingCleaner(profile)
+    parts = [cleaner.feed(raw[i:i + chunk_size]) for i in range(0, len(raw), chunk_size)]
+    parts.append(cleaner.flush())
+    return ''.join(parts)
+
+
+def check(cases):
+    failures = 0
+    for case in cases:
+        profile = PROFILES[case['endpoint']]
+        cleaned = profile.clean(case['raw'])
+        if cleaned != case['expected']:
+            failures += 1
+            print(f"FAIL [{case['endpoint']}] {case['raw']!r}\n  got      {cleaned!r}\n  expected {case['expected']!r}")
+        # Closing remarks are only removed from the final text, not from the preview
+        if profile.strip_tail(case['raw'].strip()) == case['raw'].strip():
+            streamed = stream(profile, case['raw'])
+            if streamed != case['expected']:
+                failures += 1
+                print(f"FAIL stream [{case['endpoint']}] {case['raw']!r}\n  got      {streamed!r}")
+    return failures
+
+
+def time_per_call(fn, texts, iterations):
+    started = time.perf_counter()
+    for i in range(iterations):
+        fn(texts[i % len(texts)])
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--check-only", action="store_true")
+    args = parser.parse_args()
+
+    with open(GOLDEN_PATH, encoding='utf-8') as f:
+        cases = json.load(f)
+
+    failures = check(cases)
+    if failures:
+        print(f"{failures} golden mismatches")
+        sys.exit(1)
+    if args.check_only:
+        print(f"{len(cases)} golden cases OK")
+        return
+
+    long_summary = ("Résumé de la journée :\n" + "L'usager a participé aux activités prévues. " * 60).strip()
+    results = []
+    for endpoint, profile in PROFILES.items():
+        raws = [case['raw'] for case in cases if case['endpoint'] == endpoint]
+        if endpoint == 'summary':
+            raws.append(long_summary)
+        sentences = SUMMARY_SENTENCES if endpoint == 'summary' else ()
+        legacy_us = time_per_call(lambda t: legacy_clean(t, LEGACY_PREFIXES[endpoint], sentences), raws, args.iterations)
+        engine_us = time_per_call(profile.clean, raws, args.iterations)
+        results.append({
+            "endpoint": endpoint,
+            "outputs": len(raws),
+            "legacy_us": round(legacy_us, 2),
+            "engine_us": round(engine_us, 2),
+        })
+
+    print(json.dumps({"golden_cases": len(cases), "iterations": args.iterations, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Concurrent throughput benchmark for /correct-text.
+
+Starts a local stand-in for the Ollama HTTP API (fixed generation latency),
+then drives the FastAPI app in-process at a given concurrency. The "blocking"
+mode reproduces the original behaviour (synchronous HTTP client called from
+async handlers); the "async" mode uses the pooled OllamaProvider; the "fake"
+mode uses the in-process FakeProvider with the same latency and no HTTP.
+
+Usage:
+    python benchmarks/concurrency_benchmark.py --requests 64 --concurrency 16 --latency 0.25 [--modes blocking,async,fake]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_provider import FakeProvider, LLMProvider, OllamaProvider  # noqa: E402
+
+
+def start_fake_ollama(latency: float) -> ThreadingHTTPServer:
+    """Serve /api/generate and /api/tags with a fixed artificial latency."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            self._send({"models": [{"name": "gemma3:4b"}]})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            time.sleep(latency)
+            self._send({"response": "Le patient a bien dormi.", "done": True})
+
+    ThreadingHTTPServer.request_queue_size = 128
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class BlockingProvider(LLMProvider):
+    """Original behaviour: a synchronous client awaited from async handlers."""
+
+    name = 'blocking'
+
+    def __init__(self, host: str):
+        super().__init__()
+        import httpx
+        self._client = httpx.Client(base_url=host, timeout=None)
+
+    async def generate(self, prompt, options=None, system=None, model=None, keep_alive=None):
+        payload = {"model": model or self.model, "prompt": prompt, "stream": False, "options": options or {}}
+        return self._client.post("/api/generate", json=payload).json()
+
+    async def stream(self, prompt, options=None, system=None, model=None, keep_alive=None):
+        # No token streaming in the original client: the whole reply arrives as the final chunk
+        yield await self.generate(prompt, options, system, model, keep_alive)
+
+    async def preload(self, model=None, keep_alive=None):
+        return self._client.post("/api/generate", json={"model": model or self.model}).json()
+
+    async def list_models(self):
+        return [m["name"] for m in self._client.get("/api/tags").json()["models"]]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_mode(main, mode: str, total: int, concurrency: int, host: str, latency: float):
+    import httpx
+
+    if mode == "blocking":
+        main.llm_provider = BlockingProvider(f"http://{host}")
+    elif mode == "fake":
+        main.llm_provider = FakeProvider(latency=latency, tokens_per_second=0)
+    else:
+        main.llm_provider = OllamaProvider(host)
+
+    transport = httpx.ASGITransport(app=main.app)
+    latencies = []
+    health_latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(i):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/correct-text", json={"text": f"le patient a bien dormi {mode} {i}"})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        async def probe_health(stop: asyncio.Event):
+            while not stop.is_set():
+                start = time.perf_counter()
+                await client.get("/health")
+                health_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.05)
+
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe_health(stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await prober
+
+    return {
+        "mode": mode,
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "health_max_ms": round(max(health_latencies) * 1000, 1) if health_latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.25, help="simulated generation time (s)")
+    parser.add_argument("--modes", default="blocking,async")
+    args = parser.parse_args()
+
+    server = start_fake_ollama(args.latency)
+    host = f"127.0.0.1:{server.server_address[1]}"
+    import main as backend
+    logging.disable(logging.INFO)
+
+    results = [
+        asyncio.run(run_mode(backend, mode, args.requests, args.concurrency, host, args.latency))
+        for mode in args.modes.split(",")
+    ]
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
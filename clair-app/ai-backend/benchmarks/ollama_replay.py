@@ -0,0 +1,237 @@
+"""
+Record/replay stand-in for the Ollama HTTP API.
+
+Replays the /api/generate responses in a recording file (by default
+data/ollama_recording.json) with the timings Ollama reported for them:
+the reply is delayed by prompt_eval_duration, then streamed (or returned)
+over eval_duration, both divided by --speed. /api/tags lists the recorded
+models and prompt-less generate requests (model preloads) return at once.
+
+A request is answered with the entry recorded for the exact same model and
+prompt, otherwise with the entries whose prompt starts like it (same
+template) in turn, then any entry for the model, then any entry, so
+recordings stay usable when the texts in a benchmark change.
+
+With --record URL, requests are forwarded to a real Ollama and appended to
+the recording instead.
+
+Usage:
+    python benchmarks/ollama_replay.py [--port 11435] [--speed 1.0] [--record http://localhost:11434]
+    OLLAMA_HOST=127.0.0.1:11435 uvicorn main:app
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+RECORDING = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'ollama_recording.json')
+
+# Characters of the prompt used to recognise the template it was built from
+PROMPT_PREFIX_CHARS = 40
+
+TIMING_FIELDS = ('total_duration', 'load_duration', 'prompt_eval_count', 'prompt_eval_duration',
+                 'eval_count', 'eval_duration')
+
+
+def prompt_key(model: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model}\0{prompt}".encode('utf-8')).hexdigest()
+
+
+class Recording:
+    """Recorded generations, with the lookup fallbacks described in the module docstring."""
+
+    def __init__(self, entries: Optional[List[Dict[str, Any]]] = None, models: Optional[List[str]] = None):
+        self.entries = entries or []
+        self.models = models or sorted({entry['model'] for entry in self.entries})
+        self._lock = threading.Lock()
+        self._index()
+
+    def _index(self):
+        self._by_key = {entry['key']: entry for entry in self.entries if entry.get('key')}
+        self._cycles: Dict[Any, Any] = {}
+
+    @classmethod
+    def load(cls, path: str) -> 'Recording':
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['entries'], data.get('models'))
+
+    def save(self, path: str):
+        with self._lock:
+            data = {"models": self.models, "entries": self.entries}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def add(self, model: str, prompt: str, response: Dict[str, Any]):
+        entry = {
+            "key": prompt_key(model, prompt),
+            "model": model,
+            "prompt_prefix": prompt[:PROMPT_PREFIX_CHARS],
+            "response": response.get('response', ''),
+            **{field: response.get(field, 0) for field in TIMING_FIELDS},
+        }
+        with self._lock:
+            self.entries.append(entry)
+            if model not in self.models:
+                self.models.append(model)
+            self._index()
+
+    def _next(self, cycle_key, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # Deterministic round-robin over the candidates of each fallback level
+        if cycle_key not in self._cycles:
+            self._cycles[cycle_key] = itertools.cycle(candidates)
+        return next(self._cycles[cycle_key])
+
+    def lookup(self, model: str, prompt: str) -> Dict[str, Any]:
+        if not self.entries:
+            raise LookupError("empty recording")
+        with self._lock:
+            entry = self._by_key.get(prompt_key(model, prompt))
+            if entry is not None:
+                return entry
+            prefix = prompt[:PROMPT_PREFIX_CHARS]
+            for cycle_key, match in (
+                (('prefix', model, prefix), lambda e: e['model'] == model and e['prompt_prefix'] == prefix),
+                (('prefix', prefix), lambda e: e['prompt_prefix'] == prefix),
+                (('model', model), lambda e: e['model'] == model),
+            ):
+                candidates = [e for e in self.entries if match(e)]
+                if candidates:
+                    return self._next(cycle_key, candidates)
+            return self._next(('any',), self.entries)
+
+
+def final_response(entry: Dict[str, Any], model: str) -> Dict[str, Any]:
+    return {
+        "model": model,
+        "created_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        "done": True,
+        "done_reason": "stop",
+        **{field: entry.get(field, 0) for field in TIMING_FIELDS},
+    }
+
+
+def make_handler(recording: Recording, speed: float, upstream: Optional[str], recording_path: Optional[str]):
+    upstream_client = None
+    if upstream:
+        import httpx
+        upstream_client = httpx.Client(base_url=upstream, timeout=None)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, payload: Dict[str, Any], status: int = 200):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_chunk(self, payload: Dict[str, Any]):
+            line = json.dumps(payload, ensure_ascii=False).encode('utf-8') + b"\n"
+            self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path == '/api/tags':
+                self._send_json({"models": [{"name": model, "model": model} for model in recording.models]})
+            elif self.path == '/api/version':
+                self._send_json({"version": "replay"})
+            else:
+                self._send_json({"error": "not found"}, 404)
+
+        def do_POST(self):
+            if self.path != '/api/generate':
+                self._send_json({"error": "not found"}, 404)
+                return
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            model = request.get('model', '')
+            prompt = request.get('prompt')
+            if not prompt:
+                # Model preload: recorded models are always "loaded"
+                self._send_json({"model": model, "done": True, "done_reason": "load", "response": ""})
+                return
+
+            if upstream_client is not None:
+                forwarded = {**request, "stream": False}
+                response = upstream_client.post('/api/generate', json=forwarded).json()
+                if 'error' in response:
+                    self._send_json(response, 500)
+                    return
+                recording.add(model, prompt, response)
+                if recording_path:
+                    recording.save(recording_path)
+                entry, pace = recording.lookup(model, prompt), 0.0
+            else:
+                entry, pace = recording.lookup(model, prompt), 1 / speed
+
+            time.sleep(entry.get('prompt_eval_duration', 0) / 1e9 * pace)
+            eval_seconds = entry.get('eval_duration', 0) / 1e9 * pace
+
+            if not request.get('stream', True):
+                time.sleep(eval_seconds)
+                self._send_json({**final_response(entry, model), "response": entry['response']})
+                return
+
+            words = entry['response'].split(' ')
+            tokens = [word if i == 0 else ' ' + word for i, word in enumerate(words)]
+            interval = eval_seconds / len(tokens) if tokens else 0.0
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for token in tokens:
+                time.sleep(interval)
+                self._send_chunk({"model": model, "response": token, "done": False})
+            self._send_chunk({**final_response(entry, model), "response": ""})
+            self.wfile.write(b"0\r\n\r\n")
+
+    return Handler
+
+
+def start_replay_server(recording: Recording, speed: float = 1.0, port: int = 0,
+                        upstream: Optional[str] = None, recording_path: Optional[str] = None) -> ThreadingHTTPServer:
+    """Serve the recording on 127.0.0.1:`port` (0 picks a free port) from a daemon thread."""
+    ThreadingHTTPServer.request_queue_size = 128
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(recording, speed, upstream, recording_path))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--recording", default=RECORDING)
+    parser.add_argument("--speed", type=float, default=1.0, help="replay faster (>1) or slower than recorded")
+    parser.add_argument("--record", metavar="URL", help="forward to this Ollama and append to the recording")
+    args = parser.parse_args()
+
+    if args.record and not os.path.exists(args.recording):
+        recording = Recording()
+    else:
+        recording = Recording.load(args.recording)
+    server = start_replay_server(recording, args.speed, args.port, args.record,
+                                 args.recording if args.record else None)
+    mode = f"recording from {args.record}" if args.record else f"replaying {len(recording.entries)} entries"
+    print(f"Ollama stand-in on 127.0.0.1:{server.server_address[1]}, {mode}", file=sys.stderr)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
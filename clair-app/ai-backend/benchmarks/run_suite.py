@@ -0,0 +1,271 @@
+"""
+Benchmark suite for the AI backend, with JSON results to compare commits.
+
+Points the app at the Ollama record/replay stand-in (ollama_replay.py),
+drives the text endpoints in-process at --concurrency and reports
+throughput and p50/p95/p99 per endpoint. Every request sends a distinct
+text, so the response cache never answers. Then micro-benchmarks response
+cleanup, VectorStore.search_documents (BM25 path unless Chroma and the
+embedding model are installed) and AIService.analyze_communications.
+
+Usage:
+    python benchmarks/run_suite.py [--requests 32] [--concurrency 8] [--speed 1.0] [--output results.json]
+    python benchmarks/run_suite.py --compare baseline.json [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+from ollama_replay import RECORDING, Recording, start_replay_server  # noqa: E402
+from search_benchmark import DATA as SEARCH_DATA, build_store, filler_documents  # noqa: E402
+from triage_benchmark import make_messages  # noqa: E402
+
+GOLDEN_PATH = os.path.join(BENCHMARKS_DIR, 'data', 'cleanup_golden.json')
+
+NOTE_SENTENCES = [
+    "Le patient a bien dormi durant la nuit",
+    "l'usager etait agité en debut de soirée",
+    "médication du soir administré a 21h sans effet secondaire",
+    "refus du repas du midi, repris au souper",
+    "participation a l'atelier de cuisine avec deux intervenant",
+    "visite de la famille prévu samedi",
+]
+
+# label -> request body for request i; the path is the first word of the label
+ENDPOINTS = {
+    "/correct-text": lambda i, note: {"text": note},
+    "/correct-text (stream)": lambda i, note: {"text": note, "stream": True},
+    "/generate-summary": lambda i, note: {"text": note},
+    "/enhance-text": lambda i, note: {"text": note},
+    "/analyze-text": lambda i, note: {"text": note},
+}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * (len(ordered) - 1)))]
+
+
+def latency_summary(seconds, scale: float = 1000.0, digits: int = 1) -> dict:
+    return {
+        f"p{pct}_ms" if scale == 1000.0 else f"p{pct}_us": round(percentile(seconds, pct) * scale, digits)
+        for pct in (50, 95, 99)
+    }
+
+
+def make_note(i: int, rng: random.Random) -> str:
+    return ". ".join(rng.sample(NOTE_SENTENCES, rng.randint(2, 4))) + f". (note {i})"
+
+
+async def run_endpoints(main, requests: int, concurrency: int) -> dict:
+    import httpx
+
+    transport = httpx.ASGITransport(app=main.app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for name, payload in ENDPOINTS.items():
+            path = name.split(" ")[0]
+            rng = random.Random(name)
+            semaphore = asyncio.Semaphore(concurrency)
+            latencies, errors = [], 0
+
+            async def one(i):
+                nonlocal errors
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.post(path, json=payload(i, make_note(i, rng)))
+                    # Streamed endpoints report failures in their last line
+                    if response.status_code != 200 or '"type": "error"' in response.text:
+                        errors += 1
+                    latencies.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(requests)))
+            elapsed = time.perf_counter() - started
+            results[name] = {
+                "requests": requests,
+                "errors": errors,
+                "throughput_rps": round(requests / elapsed, 2),
+                **latency_summary(latencies),
+            }
+    return results
+
+
+def bench_cleanup(iterations: int) -> dict:
+    from text_cleanup import clean_correction, clean_enhancement, clean_summary
+
+    with open(GOLDEN_PATH, encoding='utf-8') as f:
+        cases = json.load(f)
+    cleaners = {"correction": clean_correction, "summary": clean_summary, "enhancement": clean_enhancement}
+    results = {}
+    for endpoint, clean in cleaners.items():
+        texts = [case["raw"] for case in cases if case["endpoint"] == endpoint] or [case["raw"] for case in cases]
+        timings = []
+        for i in range(iterations):
+            started = time.perf_counter()
+            clean(texts[i % len(texts)])
+            timings.append(time.perf_counter() - started)
+        results[endpoint] = latency_summary(timings, scale=1e6, digits=2)
+    return results
+
+
+async def bench_search(iterations: int, filler: int) -> dict:
+    from vector_store import SEARCH_MODES
+
+    with open(SEARCH_DATA, encoding='utf-8') as f:
+        data = json.load(f)
+    documents = [
+        {"content": doc["content"], "document_type": doc["document_type"], "metadata": {"key": doc["key"]}}
+        for doc in data["documents"]
+    ] + filler_documents(filler, random.Random(42))
+    try:
+        import chromadb  # noqa: F401
+        import sentence_transformers  # noqa: F401
+        lexical_only = False
+    except ImportError:
+        lexical_only = True
+
+    store = await build_store(documents, lexical_only)
+    results = {"documents": len(documents)}
+    for mode in (['lexical'] if lexical_only else list(SEARCH_MODES)):
+        timings = []
+        for _ in range(iterations):
+            for query in data["queries"]:
+                store._search_cache.clear()
+                started = time.perf_counter()
+                await store.search_documents(query["query"], 3, mode=mode)
+                timings.append(time.perf_counter() - started)
+        results[mode] = latency_summary(timings, digits=3)
+    return results
+
+
+async def bench_communications(messages: int, iterations: int) -> dict:
+    from ai_service import AIService
+    from llm_provider import FakeProvider
+    from vector_store import VectorStore
+
+    service = AIService(VectorStore(), provider=FakeProvider())
+    communications = list(make_messages(messages, random.Random(7)))
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await service.analyze_communications(communications)
+        timings.append(time.perf_counter() - started)
+    return {
+        "messages": messages,
+        "messages_per_second": round(messages / percentile(timings, 50)),
+        **latency_summary(timings),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{path}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(baseline: dict, current: dict) -> dict:
+    """Relative change (%) of every latency and throughput figure present in both runs."""
+    before = flatten({k: baseline[k] for k in ("endpoints", "micro") if k in baseline})
+    after = flatten({k: current[k] for k in ("endpoints", "micro") if k in current})
+    changes = {}
+    for path, value in after.items():
+        old = before.get(path)
+        metric = path.rsplit(".", 1)[-1]
+        if old and (metric.startswith("p") or "per_second" in metric or metric.endswith("_rps")):
+            changes[path] = round((value - old) / old * 100, 1)
+    return changes
+
+
+async def run(args) -> dict:
+    server = start_replay_server(Recording.load(args.recording), args.speed)
+    os.environ.update({
+        "LLM_PROVIDER": "ollama",
+        "OLLAMA_HOST": f"127.0.0.1:{server.server_address[1]}",
+    })
+    import main
+    logging.disable(logging.WARNING)
+
+    try:
+        endpoints = await run_endpoints(main, args.requests, args.concurrency)
+    finally:
+        await main.llm_provider.close()
+        server.shutdown()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "speed": args.speed,
+        },
+        "endpoints": endpoints,
+        "micro": {
+            "cleanup": bench_cleanup(args.iterations * 100),
+            "search_documents": await bench_search(args.iterations, args.filler),
+            "analyze_communications": await bench_communications(args.messages, args.iterations),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=32, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed-up of the recorded timings")
+    parser.add_argument("--recording", default=RECORDING)
+    parser.add_argument("--iterations", type=int, default=20, help="repetitions of each micro-benchmark")
+    parser.add_argument("--filler", type=int, default=2000, help="synthetic notes added to the search corpus")
+    parser.add_argument("--messages", type=int, default=5000, help="communications per analyze_communications call")
+    parser.add_argument("--output", help="also write the results to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="results file of an earlier run to diff against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        settings = ("requests", "concurrency", "speed")
+        baseline_meta = baseline.get("meta", {})
+        results["compare"] = {
+            "baseline_commit": baseline_meta.get("commit"),
+            # Figures from runs with different load settings are not comparable
+            "settings_match": all(baseline_meta.get(key) == results["meta"][key] for key in settings),
+            "change_percent": compare(baseline, results),
+        }
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
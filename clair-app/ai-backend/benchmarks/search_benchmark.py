@@ -0,0 +1,141 @@
+"""
+Relevance and latency benchmark for VectorStore search modes.
+
+Loads the labelled French clinical corpus in data/search_relevance.json
+(optionally padded with synthetic filler notes) into an in-memory Chroma
+collection plus the BM25 index, then runs every query in each mode and
+reports recall@k, MRR and p50/p99 latency in milliseconds. Vector and
+hybrid modes need the embedding model; with --lexical-only (or without
+sentence-transformers installed) only the BM25 path is measured.
+
+Usage:
+    python benchmarks/search_benchmark.py [--k 3] [--filler 2000] [--iterations 20] [--lexical-only]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexical_index import LexicalIndex  # noqa: E402
+from vector_store import SEARCH_MODES, VectorStore  # noqa: E402
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'search_relevance.json')
+
+FILLER_SENTENCES = [
+    "L'usager a participé à l'activité de groupe en après-midi.",
+    "Repas pris en entier, bonne humeur générale.",
+    "Visite de la famille prévue samedi, usager content.",
+    "Nuit calme, aucun réveil noté par l'équipe de nuit.",
+    "Atelier de cuisine réussi, consignes bien suivies.",
+    "Promenade au parc avec deux intervenants.",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * (len(ordered) - 1)))]
+
+
+def filler_documents(count: int, rng: random.Random):
+    return [
+        {
+            "content": f"Note {i}: " + " ".join(rng.sample(FILLER_SENTENCES, 3)),
+            "document_type": "note",
+            "metadata": {"key": f"filler-{i}"},
+        }
+        for i in range(count)
+    ]
+
+
+async def build_store(documents, lexical_only: bool) -> VectorStore:
+    store = VectorStore()
+    store.lexical = LexicalIndex()
+    if lexical_only:
+        store.lexical.add([
+            (VectorStore.content_id(doc["content"], doc["document_type"]), doc["content"],
+             {"document_type": doc["document_type"], **doc["metadata"]})
+            for doc in documents
+        ])
+        return store
+
+    import chromadb
+    store.client = chromadb.EphemeralClient()
+    store.collection = store.client.create_collection(name="search_benchmark", embedding_function=None)
+    await store.add_documents(documents)
+    return store
+
+
+async def run_mode(store: VectorStore, queries, mode: str, k: int, iterations: int):
+    recall_hits, reciprocal_ranks, timings = 0, [], []
+    for query in queries:
+        results = await store.search_documents(query["query"], k, mode=mode)
+        keys = [result["metadata"].get("key") for result in results]
+        if any(key in query["relevant"] for key in keys):
+            recall_hits += 1
+        rank = next((i + 1 for i, key in enumerate(keys) if key in query["relevant"]), None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+        for _ in range(iterations):
+            store._search_cache.clear()
+            started = time.perf_counter()
+            await store.search_documents(query["query"], k, mode=mode)
+            timings.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "mode": mode,
+        f"recall@{k}": round(recall_hits / len(queries), 3),
+        "mrr": round(sum(reciprocal_ranks) / len(queries), 3),
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+    }
+
+
+async def run(args):
+    with open(DATA, encoding='utf-8') as f:
+        data = json.load(f)
+    documents = [
+        {"content": doc["content"], "document_type": doc["document_type"], "metadata": {"key": doc["key"]}}
+        for doc in data["documents"]
+    ] + filler_documents(args.filler, random.Random(42))
+
+    lexical_only = args.lexical_only
+    if not lexical_only:
+        try:
+            import chromadb  # noqa: F401
+            import sentence_transformers  # noqa: F401
+        except ImportError as e:
+            print(f"{e.name} not installed, measuring the lexical path only", file=sys.stderr)
+            lexical_only = True
+
+    store = await build_store(documents, lexical_only)
+    modes = ['lexical'] if lexical_only else list(SEARCH_MODES)
+
+    results = [await run_mode(store, data["queries"], mode, args.k, args.iterations) for mode in modes]
+    fast_path = sum(store.lexical_fast_path(query["query"]) for query in data["queries"])
+    return {
+        "documents": len(documents),
+        "queries": len(data["queries"]),
+        "hybrid_lexical_fast_path": fast_path,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--filler", type=int, default=2000, help="synthetic notes added to the corpus")
+    parser.add_argument("--iterations", type=int, default=20, help="timed repetitions per query")
+    parser.add_argument("--lexical-only", action="store_true")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
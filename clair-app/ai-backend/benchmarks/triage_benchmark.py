@@ -0,0 +1,119 @@
+"""
+Throughput and memory benchmark for communication triage.
+
+Scores synthetic team messages with the original per-keyword
+`content.lower()` scan and with TriageEngine, then streams them through
+triage_cursor from an async generator standing in for a Motor cursor and
+reports its throughput and peak memory, which stays flat as --messages grows.
+
+Usage:
+    python benchmarks/triage_benchmark.py --messages 100000 [--report-every 10000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from communication_triage import TriageEngine, triage_cursor  # noqa: E402
+
+SENTENCES = [
+    "Bonne nuit pour Marc, il est resté calme et stable.",
+    "URGENT: chute dans la salle de bain, appeler l'infirmière immédiatement.",
+    "Problème avec la médication du soir, à vérifier demain.",
+    "Belle amélioration de l'appétit, beaucoup de progrès cette semaine.",
+    "Comportement préoccupant au souper, refus de participer.",
+    "Rendez-vous chez le dentiste jeudi à 14h, prévoir le transport.",
+    "Fièvre à 38,5 ce matin, surveiller l'hydratation.",
+    "Rien à signaler pour le quart de soir.",
+    "Situation difficile avec la famille, inquiétude de la mère.",
+    "Désorganisation en fin de journée, retour au calme après 20 minutes.",
+]
+
+URGENT_KEYWORDS = ['urgent', 'immédiat', 'critique', 'emergency', 'problème']
+POSITIVE_KEYWORDS = ['bien', 'excellent', 'amélioration', 'progrès', 'stable']
+NEGATIVE_KEYWORDS = ['préoccupant', 'difficile', 'problème', 'inquiétude']
+
+
+def legacy_score(content: str):
+    """Scoring as AIService.analyze_communications did it before TriageEngine."""
+    urgency_score = sum(1 for keyword in URGENT_KEYWORDS if keyword.lower() in content.lower())
+    sentiment_score = (
+        sum(1 for keyword in POSITIVE_KEYWORDS if keyword.lower() in content.lower()) -
+        sum(1 for keyword in NEGATIVE_KEYWORDS if keyword.lower() in content.lower())
+    )
+    return urgency_score, sentiment_score
+
+
+def make_messages(count: int, rng: random.Random):
+    for i in range(count):
+        yield {
+            "_id": f"m{i}",
+            "content": " ".join(rng.sample(SENTENCES, rng.randint(1, 4))),
+            "isUrgent": rng.random() < 0.05,
+            "patientId": f"p{i % 40}",
+        }
+
+
+async def as_cursor(messages):
+    for message in messages:
+        yield message
+
+
+async def stream(count: int, engine: TriageEngine, report_every: int):
+    final = None
+    async for update in triage_cursor(as_cursor(make_messages(count, random.Random(7))), engine,
+                                      report_every=report_every):
+        final = update
+    return final
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--report-every", type=int, default=10000)
+    args = parser.parse_args()
+
+    messages = list(make_messages(args.messages, random.Random(7)))
+    engine = TriageEngine()
+
+    started = time.perf_counter()
+    for message in messages:
+        legacy_score(message["content"])
+    legacy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for message in messages:
+        engine.score(message["content"])
+    engine_seconds = time.perf_counter() - started
+    del messages
+
+    started = time.perf_counter()
+    final = asyncio.run(stream(args.messages, engine, args.report_every))
+    stream_seconds = time.perf_counter() - started
+
+    # Separate pass: tracing allocations slows the loop down several times
+    tracemalloc.start()
+    asyncio.run(stream(args.messages, engine, args.report_every))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(json.dumps({
+        "messages": args.messages,
+        "legacy_messages_per_second": round(args.messages / legacy_seconds),
+        "engine_messages_per_second": round(args.messages / engine_seconds),
+        "streaming_messages_per_second": round(args.messages / stream_seconds),
+        "streaming_peak_memory_kb": round(peak / 1024),
+        "high_urgency_count": final["high_urgency_count"],
+        "flagged_urgent_count": final["flagged_urgent_count"],
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""
+Server-side Bristol scale analysis.
+
+Builds one MongoDB aggregation pipeline over `bristol_entries` that
+returns, for one patient, several, or the whole unit, in a single round
+trip:
+
+- totals, including entries whose value is not a Bristol type (1-7)
+- the overall type distribution and average
+- per-shift distributions
+- per-day counts, averages and a rolling average over `rolling_days`,
+  with days taken in `timezone` (BRISTOL_TIMEZONE, America/Toronto by
+  default) so an evening entry is not counted on the next UTC day
+- type-to-type transition counts between consecutive entries
+
+`$setWindowFields`, `$shift`, `$dateTrunc` and `$dateDiff` need MongoDB 5.0
+or later.
+"""
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from database import date_since
+
+BRISTOL_TYPES = range(1, 8)
+DEFAULT_ROLLING_DAYS = 7
+DEFAULT_TIMEZONE = os.getenv("BRISTOL_TIMEZONE", "America/Toronto")
+VALID = {"bristol": {"$ne": None}}
+
+
+def bristol_pipeline(patient_ids: Optional[List[str]], since: datetime,
+                     rolling_days: int = DEFAULT_ROLLING_DAYS,
+                     timezone: str = DEFAULT_TIMEZONE) -> List[Dict[str, Any]]:
+    """
+    Aggregation pipeline for `patient_ids` (None for every patient) since
+    `since`. Entries whose date cannot be parsed are left out.
+    """
+    match: Dict[str, Any] = {"type": "bowel", **date_since("entryDate", since)}
+    if patient_ids is not None:
+        match["patientId"] = patient_ids[0] if len(patient_ids) == 1 else {"$in": patient_ids}
+
+    bristol_value = {"$convert": {"input": "$value", "to": "int", "onError": None, "onNull": None}}
+    # Legacy "YYYY-MM-DD" strings are local days; anything unparsable becomes null
+    entry_date = {"$cond": [
+        {"$and": [{"$eq": [{"$type": "$entryDate"}, "string"]}, {"$eq": [{"$strLenCP": "$entryDate"}, 10]}]},
+        {"$dateFromString": {"dateString": "$entryDate", "format": "%Y-%m-%d", "timezone": timezone,
+                             "onError": None, "onNull": None}},
+        {"$convert": {"input": "$entryDate", "to": "date", "onError": None, "onNull": None}},
+    ]}
+    day = {"$dateTrunc": {"date": "$at", "unit": "day", "timezone": timezone}}
+
+    return [
+        {"$match": match},
+        {"$project": {
+            "patientId": 1,
+            "shift": 1,
+            "at": entry_date,
+            "bristol": {
+                "$let": {
+                    "vars": {"value": bristol_value},
+                    "in": {"$cond": [
+                        {"$and": [{"$gte": ["$$value", 1]}, {"$lte": ["$$value", 7]}]}, "$$value", None
+                    ]},
+                }
+            },
+        }},
+        {"$match": {"at": {"$ne": None}}},
+        {"$facet": {
+            "totals": [
+                {"$group": {
+                    "_id": "$patientId",
+                    "entries": {"$sum": 1},
+                    "valid": {"$sum": {"$cond": [{"$ne": ["$bristol", None]}, 1, 0]}},
+                    "average": {"$avg": "$bristol"},
+                }},
+            ],
+            "by_shift": [
+                {"$match": VALID},
+                {"$group": {"_id": {"patient": "$patientId", "shift": "$shift", "type": "$bristol"},
+                            "count": {"$sum": 1}}},
+            ],
+            "by_day": [
+                {"$match": VALID},
+                {"$group": {
+                    "_id": {"patient": "$patientId", "day": day, "type": "$bristol"},
+                    "count": {"$sum": 1},
+                }},
+                {"$group": {
+                    "_id": {"patient": "$_id.patient", "day": "$_id.day"},
+                    "types": {"$push": {"type": "$_id.type", "count": "$count"}},
+                    "count": {"$sum": "$count"},
+                    "sum": {"$sum": {"$multiply": ["$_id.type", "$count"]}},
+                }},
+                # Local calendar day number: a time range in days would drop
+                # the window's first day across a DST change (23/25 h days)
+                {"$set": {
+                    "date": {"$dateToString": {"date": "$_id.day", "format": "%Y-%m-%d", "timezone": timezone}},
+                    "day_number": {"$dateDiff": {"startDate": datetime(1970, 1, 1), "endDate": "$_id.day",
+                                                 "unit": "day", "timezone": timezone}},
+                }},
+                {"$setWindowFields": {
+                    "partitionBy": "$_id.patient",
+                    "sortBy": {"day_number": 1},
+                    "output": {
+                        "window_sum": {"$sum": "$sum", "window": {"range": [-(rolling_days - 1), 0]}},
+                        "window_count": {"$sum": "$count", "window": {"range": [-(rolling_days - 1), 0]}},
+                    },
+                }},
+                {"$sort": {"_id.patient": 1, "_id.day": 1}},
+            ],
+            "transitions": [
+                {"$match": VALID},
+                {"$setWindowFields": {
+                    "partitionBy": "$patientId",
+                    "sortBy": {"at": 1},
+                    "output": {"previous": {"$shift": {"output": "$bristol", "by": -1}}},
+                }},
+                {"$match": {"previous": {"$ne": None}}},
+                {"$group": {"_id": {"patient": "$patientId", "from": "$previous", "to": "$bristol"},
+                            "count": {"$sum": 1}}},
+            ],
+        }},
+    ]
+
+
+def bristol_insights(average: float) -> List[str]:
+    if average < 3:
+        return ["Tendance vers la constipation"]
+    if average > 5:
+        return ["Tendance vers la diarrhée"]
+    return ["Selles dans la normale"]
+
+
+def _distribution(counts: Dict[int, int]) -> Dict[str, int]:
+    return {str(bristol_type): counts.get(bristol_type, 0) for bristol_type in BRISTOL_TYPES}
+
+
+def summarize_bristol(facets: Dict[str, List[Dict[str, Any]]], date_range: int) -> Dict[str, Dict[str, Any]]:
+    """Shape the pipeline output into one analysis per patient ID."""
+    patients: Dict[str, Dict[str, Any]] = {}
+    for row in facets.get("totals", []):
+        patients[row["_id"]] = {
+            "total_entries": row["entries"],
+            "valid_entries": row["valid"],
+            "invalid_entries": row["entries"] - row["valid"],
+            "average_bristol": round(row["average"], 1) if row["average"] is not None else None,
+            "distribution": {},
+            "by_shift": {},
+            "by_day": [],
+            "transitions": [],
+            "date_range": date_range,
+        }
+
+    overall: Dict[str, Dict[int, int]] = {}
+    shifts: Dict[str, Dict[str, Dict[int, int]]] = {}
+    for row in facets.get("by_shift", []):
+        key = row["_id"]
+        overall.setdefault(key["patient"], {})
+        overall[key["patient"]][key["type"]] = overall[key["patient"]].get(key["type"], 0) + row["count"]
+        shifts.setdefault(key["patient"], {}).setdefault(key.get("shift") or "unknown", {})[key["type"]] = row["count"]
+
+    for patient_id, analysis in patients.items():
+        analysis["distribution"] = _distribution(overall.get(patient_id, {}))
+        analysis["by_shift"] = {
+            shift: _distribution(counts) for shift, counts in sorted(shifts.get(patient_id, {}).items())
+        }
+        average = analysis["average_bristol"]
+        analysis["insights"] = "; ".join(bristol_insights(average)) if average is not None \
+            else "Données insuffisantes pour l'analyse"
+
+    for row in facets.get("by_day", []):
+        analysis = patients.get(row["_id"]["patient"])
+        if analysis is None:
+            continue
+        analysis["by_day"].append({
+            "date": row["date"],
+            "count": row["count"],
+            "average": round(row["sum"] / row["count"], 2),
+            "rolling_average": round(row["window_sum"] / row["window_count"], 2) if row["window_count"] else None,
+            "distribution": _distribution({item["type"]: item["count"] for item in row["types"]}),
+        })
+
+    for row in sorted(facets.get("transitions", []), key=lambda r: -r["count"]):
+        analysis = patients.get(row["_id"]["patient"])
+        if analysis is not None:
+            analysis["transitions"].append({"from": row["_id"]["from"], "to": row["_id"]["to"], "count": row["count"]})
+
+    return patients
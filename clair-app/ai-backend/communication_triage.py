@@ -0,0 +1,151 @@
+"""
+Keyword triage of team communications.
+
+Every weighted term is accent-folded and compiled into one regular
+expression, so a message is lowercased and folded once and scanned once,
+whatever the number of terms. Terms match at the start of a word and
+accept inflected endings ("problème" matches "Problèmes"); each term
+counts once per message.
+
+Scoring streams from a Motor cursor with a projection and only keeps
+running totals, so a whole unit can be triaged in bounded memory.
+"""
+import os
+import re
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from lexical_index import fold
+
+logger = logging.getLogger(__name__)
+
+URGENCY = 'urgency'
+POSITIVE = 'positive'
+NEGATIVE = 'negative'
+
+# (category, term, weight)
+TRIAGE_TERMS: List[Tuple[str, str, float]] = [
+    (URGENCY, 'urgent', 3), (URGENCY, 'urgence', 3), (URGENCY, 'immédiat', 3), (URGENCY, 'critique', 3),
+    (URGENCY, 'emergency', 3), (URGENCY, '911', 3), (URGENCY, 'ambulance', 3), (URGENCY, 'hôpital', 2),
+    (URGENCY, 'chute', 2), (URGENCY, 'blessure', 2), (URGENCY, 'saignement', 2), (URGENCY, 'convulsion', 2),
+    (URGENCY, 'fièvre', 1), (URGENCY, 'problème', 1),
+    (POSITIVE, 'bien', 1), (POSITIVE, 'excellent', 1), (POSITIVE, 'amélioration', 1), (POSITIVE, 'progrès', 1),
+    (POSITIVE, 'stable', 1), (POSITIVE, 'calme', 1),
+    (NEGATIVE, 'préoccupant', 1), (NEGATIVE, 'difficile', 1), (NEGATIVE, 'problème', 1), (NEGATIVE, 'inquiétude', 1),
+    (NEGATIVE, 'agressi', 1), (NEGATIVE, 'refus', 1), (NEGATIVE, 'désorganis', 1),
+]
+
+# Only the fields scoring needs
+COMMUNICATION_PROJECTION = {"content": 1, "isUrgent": 1, "patientId": 1}
+
+
+def _compile_terms(terms: List[Tuple[str, str, float]]) -> Tuple[re.Pattern, Dict[str, List[Tuple[str, float]]]]:
+    """Compile terms into one alternation (longest first); returns the pattern and term -> [(category, weight)]."""
+    lookup: Dict[str, List[Tuple[str, float]]] = {}
+    for category, term, weight in terms:
+        lookup.setdefault(fold(term), []).append((category, weight))
+    alternation = '|'.join(re.escape(term) for term in sorted(lookup, key=len, reverse=True))
+    return re.compile(rf"\b({alternation})\w*"), lookup
+
+
+@dataclass
+class TriageScore:
+    urgency: float
+    sentiment: float
+    terms: List[str]
+    urgency_level: str
+    sentiment_label: str
+
+
+class TriageEngine:
+    """Scores messages for urgency and sentiment with a single precompiled matcher."""
+
+    def __init__(self, terms: List[Tuple[str, str, float]] = TRIAGE_TERMS, urgency_threshold: float = 1):
+        self.urgency_threshold = urgency_threshold
+        self._pattern, self._lookup = _compile_terms(terms)
+
+    def score(self, text: str) -> TriageScore:
+        found = set(self._pattern.findall(fold(text)))
+        urgency = sentiment = 0.0
+        for term in found:
+            for category, weight in self._lookup[term]:
+                if category == URGENCY:
+                    urgency += weight
+                elif category == POSITIVE:
+                    sentiment += weight
+                else:
+                    sentiment -= weight
+        return TriageScore(
+            urgency=urgency,
+            sentiment=sentiment,
+            terms=sorted(found),
+            urgency_level="high" if urgency >= self.urgency_threshold else "normal",
+            sentiment_label="positive" if sentiment > 0 else "negative" if sentiment < 0 else "neutral",
+        )
+
+
+@dataclass
+class TriageSummary:
+    """Running totals over triaged messages; `urgent_ids` is capped at `max_urgent_ids`."""
+    total: int = 0
+    high_urgency: int = 0
+    flagged_urgent: int = 0
+    sentiments: Counter = field(default_factory=Counter)
+    terms: Counter = field(default_factory=Counter)
+    urgent_ids: List[str] = field(default_factory=list)
+    max_urgent_ids: int = 100
+
+    def add(self, message: Dict[str, Any], score: TriageScore):
+        self.total += 1
+        self.sentiments[score.sentiment_label] += 1
+        self.terms.update(score.terms)
+        if message.get("isUrgent"):
+            self.flagged_urgent += 1
+        if score.urgency_level == "high":
+            self.high_urgency += 1
+            if len(self.urgent_ids) < self.max_urgent_ids:
+                self.urgent_ids.append(str(message.get("_id")))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total_communications": self.total,
+            "high_urgency_count": self.high_urgency,
+            "flagged_urgent_count": self.flagged_urgent,
+            "positive_sentiment_count": self.sentiments["positive"],
+            "negative_sentiment_count": self.sentiments["negative"],
+            "neutral_sentiment_count": self.sentiments["neutral"],
+            "top_terms": dict(self.terms.most_common(10)),
+            "urgent_ids": list(self.urgent_ids),
+        }
+
+
+def unread_filter(user_id: Optional[str] = None, patient_ids: Optional[List[str]] = None,
+                  since=None) -> Dict[str, Any]:
+    """Communications not yet read by `user_id` (or by anyone when None)."""
+    query: Dict[str, Any] = {"readBy.userId": {"$ne": user_id}} if user_id else {"readBy": {"$size": 0}}
+    if patient_ids:
+        query["patientId"] = {"$in": patient_ids}
+    if since is not None:
+        query["creationDate"] = {"$gte": since}
+    return query
+
+
+async def triage_cursor(cursor, engine: TriageEngine, summary: Optional[TriageSummary] = None,
+                        report_every: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Score every message from an async cursor, yielding the running totals
+    every `report_every` messages and once more at the end.
+    """
+    summary = summary or TriageSummary()
+    async for message in cursor:
+        summary.add(message, engine.score(message.get("content") or ""))
+        if summary.total % report_every == 0:
+            yield {**summary.as_dict(), "done": False}
+    yield {**summary.as_dict(), "done": True}
+
+
+def create_triage_engine() -> TriageEngine:
+    """Build a TriageEngine from TRIAGE_* environment variables."""
+    return TriageEngine(urgency_threshold=float(os.getenv('TRIAGE_URGENCY_THRESHOLD', '1')))
@@ -0,0 +1,75 @@
+"""
+Build fr_soins.txt, the default word list of the real-time text analyzer.
+
+Merges a full-form French lexicon (every plural, feminine and conjugated
+form found in a large French corpus; by default the fr.json.gz word list
+shipped with the MIT-licensed pyspellchecker package) with the care-notes
+vocabulary of care_terms.txt. Abbreviations and bare elisions ("l'",
+"aujourd'") are left out: the analyzer handles those itself.
+
+Usage:
+    pip install pyspellchecker
+    python dictionaries/build_dictionary.py [--lexicon fr.json.gz] [--output dictionaries/fr_soins.txt]
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+
+DICTIONARIES_DIR = os.path.dirname(os.path.abspath(__file__))
+CARE_TERMS = os.path.join(DICTIONARIES_DIR, 'care_terms.txt')
+OUTPUT = os.path.join(DICTIONARIES_DIR, 'fr_soins.txt')
+
+WORD = re.compile(r"[a-zà-öø-ÿœæ0-9]+(?:['-][a-zà-öø-ÿœæ0-9]+)*")
+
+HEADER = """\
+# Lexique français (formes fléchies) et vocabulaire des notes de soins, un mot par ligne.
+# Généré par build_dictionary.py à partir de {source} et de care_terms.txt;
+# modifier care_terms.txt puis régénérer plutôt que d'éditer ce fichier.
+"""
+
+
+def default_lexicon() -> str:
+    try:
+        import spellchecker
+    except ImportError:
+        sys.exit("pyspellchecker is not installed; pass --lexicon or pip install pyspellchecker")
+    return os.path.join(os.path.dirname(spellchecker.__file__), 'resources', 'fr.json.gz')
+
+
+def read_lexicon(path: str):
+    """Words of a pyspellchecker frequency file (.json.gz) or of a one-word-per-line list."""
+    if path.endswith('.json.gz'):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return list(json.load(f))
+    with open(path, encoding='utf-8') as f:
+        return [line.split('/')[0].strip() for line in f]
+
+
+def read_word_list(path: str):
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lexicon", help="French full-form word list (.json.gz frequency file or .txt/.dic)")
+    parser.add_argument("--output", default=OUTPUT)
+    args = parser.parse_args()
+
+    lexicon = args.lexicon or default_lexicon()
+    words = {
+        word.lower().replace('’', "'")
+        for word in read_lexicon(lexicon) + read_word_list(CARE_TERMS)
+    }
+    words = sorted(word for word in words if WORD.fullmatch(word))
+    with open(args.output, 'w', encoding='utf-8') as f:
+        f.write(HEADER.format(source=os.path.basename(lexicon)))
+        f.writelines(word + "\n" for word in words)
+    print(f"{len(words)} words written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_LATENCY
+
+logger = logging.getLogger(__name__)
+
+# Same model as Chroma's default embedder, so collections built before
+# precomputed vectors were used stay searchable
+DEFAULT_EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+
+
+class EmbeddingService:
+    """
+    Single sentence-embedding component for the vector store and AI service.
+
+    Vectors are cached by content hash in a bounded in-memory LRU and, when
+    `db_path` is set, in SQLite, so the same text is never embedded twice.
+    Misses from concurrent callers are merged into one batched `encode` run
+    in a worker thread. The model loads in the background (`start_warmup`)
+    or on first use; `backend='onnx'` with an `onnx_file` such as
+    'onnx/model_qint8_avx512_vnni.onnx' selects the quantized CPU path.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, backend: str = 'torch',
+                 onnx_file: Optional[str] = None, device: str = 'cpu', batch_size: int = 64,
+                 max_entries: int = 10000, db_path: Optional[str] = None):
+        self.model_name = model_name
+        self.backend = backend
+        self.onnx_file = onnx_file
+        self.device = device
+        self.batch_size = batch_size
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.dimension: Optional[int] = None
+        self._model = None
+        self._load_task: Optional[asyncio.Task] = None
+        self._load_lock = asyncio.Lock()
+        self._pending: List[Tuple[List[str], asyncio.Future]] = []
+        self._worker: Optional[asyncio.Task] = None
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.encode_calls = 0
+        self.load_seconds: Optional[float] = None
+
+        if db_path:
+            self._open_db()
+
+    @property
+    def variant(self) -> str:
+        """Model identity used in cache keys; quantized vectors differ slightly from full precision ones."""
+        if self.backend == 'onnx':
+            return f"{self.model_name}|onnx|{self.onnx_file or 'model.onnx'}"
+        return self.model_name
+
+    def make_key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.variant}\0{text}".encode('utf-8')).hexdigest()
+
+    # Model loading
+
+    def _load(self):
+        from sentence_transformers import SentenceTransformer
+
+        started = time.perf_counter()
+        if self.backend == 'onnx':
+            try:
+                model_kwargs = {'file_name': self.onnx_file} if self.onnx_file else None
+                model = SentenceTransformer(self.model_name, device=self.device, backend='onnx',
+                                            model_kwargs=model_kwargs)
+            except Exception as e:
+                logger.warning(f"ONNX embedding backend unavailable ({e}), falling back to torch")
+                self.backend = 'torch'
+                model = SentenceTransformer(self.model_name, device=self.device)
+        else:
+            model = SentenceTransformer(self.model_name, device=self.device)
+        # Pay the first-inference cost now rather than on the first request
+        model.encode(['warm-up'], normalize_embeddings=True)
+        self.dimension = model.get_sentence_embedding_dimension()
+        self.load_seconds = time.perf_counter() - started
+        logger.info(f"Embedding model {self.variant} loaded in {self.load_seconds:.1f}s")
+        self._model = model
+
+    def start_warmup(self) -> asyncio.Task:
+        """Load the model in a background thread without blocking startup."""
+        if self._load_task is None:
+            self._load_task = asyncio.ensure_future(asyncio.to_thread(self._load))
+        return self._load_task
+
+    def is_ready(self) -> bool:
+        return self._model is not None
+
+    async def _ensure_model(self):
+        if self._model is not None:
+            return
+        async with self._load_lock:
+            try:
+                await self.start_warmup()
+            except Exception:
+                # Let the next call try again
+                self._load_task = None
+                raise
+
+    # Disk tier
+
+    def _open_db(self):
+        try:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embedding_cache (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+            logger.info(f"Embedding cache persisted to {self.db_path}")
+        except Exception as e:
+            logger.error(f"Failed to open embedding cache database {self.db_path}: {e}")
+            self._db = None
+
+    def _db_get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._db_lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embedding_cache WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                found.update((key, np.frombuffer(blob, dtype=np.float32)) for key, blob in rows)
+        return found
+
+    def _db_set_many(self, items: List[Tuple[str, np.ndarray]]):
+        with self._db_lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (key, vector) VALUES (?, ?)",
+                [(key, vector.astype(np.float32).tobytes()) for key, vector in items]
+            )
+            self._db.commit()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    # Encoding
+
+    async def _encode(self, texts: List[str]) -> np.ndarray:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((texts, future))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.ensure_future(self._drain())
+        return await future
+
+    async def _drain(self):
+        """Encode pending requests, merging whatever queued up during the previous run."""
+        try:
+            await self._ensure_model()
+        except Exception as e:
+            pending, self._pending = self._pending, []
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        while self._pending:
+            batch, size = [], 0
+            while self._pending and (not batch or size + len(self._pending[0][0]) <= self.batch_size * 4):
+                texts, future = self._pending.pop(0)
+                batch.append((texts, future))
+                size += len(texts)
+
+            # Concurrent callers often miss on the same text; encode it once
+            texts = list(dict.fromkeys(text for chunk, _ in batch for text in chunk))
+            started = time.perf_counter()
+            try:
+                vectors = await asyncio.to_thread(
+                    self._model.encode, texts, batch_size=self.batch_size,
+                    normalize_embeddings=True, convert_to_numpy=True
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.encode_calls += 1
+            EMBEDDING_LATENCY.observe(time.perf_counter() - started)
+            EMBEDDING_BATCH_SIZE.observe(len(texts))
+
+            index = {text: i for i, text in enumerate(texts)}
+            for chunk, future in batch:
+                if not future.done():
+                    future.set_result(vectors[[index[text] for text in chunk]])
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Return one normalized vector per text, computing only uncached ones."""
+        keys = [self.make_key(text) for text in texts]
+        vectors: Dict[str, np.ndarray] = {}
+        for key in keys:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                vectors[key] = vector
+
+        missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+        if missing and self._db is not None:
+            try:
+                found = await asyncio.to_thread(self._db_get_many, missing)
+            except Exception as e:
+                logger.warning(f"Embedding cache read failed: {e}")
+                found = {}
+            for key, vector in found.items():
+                self._remember(key, vector)
+                vectors[key] = vector
+            self.disk_hits += len(found)
+
+        to_encode = {}
+        for text, key in zip(texts, keys):
+            if key not in vectors:
+                to_encode.setdefault(key, text)
+        self.hits += len(texts) - len(to_encode)
+        self.misses += len(to_encode)
+
+        if to_encode:
+            encoded = await self._encode(list(to_encode.values()))
+            new_items = list(zip(to_encode.keys(), encoded))
+            for key, vector in new_items:
+                self._remember(key, vector)
+                vectors[key] = vector
+            if self._db is not None:
+                try:
+                    await asyncio.to_thread(self._db_set_many, new_items)
+                except Exception as e:
+                    logger.warning(f"Embedding cache write failed: {e}")
+
+        return [vectors[key].tolist() for key in keys]
+
+    async def embed_one(self, text: str) -> List[float]:
+        return (await self.embed([text]))[0]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "model": self.variant,
+            "ready": self.is_ready(),
+            "dimension": self.dimension,
+            "load_seconds": round(self.load_seconds, 2) if self.load_seconds is not None else None,
+            "entries": len(self._memory),
+            "persistent": self._db is not None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "encode_calls": self.encode_calls,
+        }
+
+    def close(self):
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
+
+
+def create_embedding_service() -> EmbeddingService:
+    """Build an EmbeddingService from EMBEDDING_* environment variables."""
+    return EmbeddingService(
+        model_name=os.getenv('EMBEDDING_MODEL', DEFAULT_EMBEDDING_MODEL),
+        backend=os.getenv('EMBEDDING_BACKEND', 'torch').lower(),
+        onnx_file=os.getenv('EMBEDDING_ONNX_FILE') or None,
+        device=os.getenv('EMBEDDING_DEVICE', 'cpu'),
+        batch_size=int(os.getenv('EMBEDDING_BATCH_SIZE', '64')),
+        max_entries=int(os.getenv('EMBEDDING_CACHE_MAX_ENTRIES', '10000')),
+        db_path=os.getenv('EMBEDDING_CACHE_DB_PATH') or None,
+    )
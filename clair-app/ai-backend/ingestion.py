@@ -0,0 +1,167 @@
+"""
+Streaming document ingestion into the vector store.
+
+Reads plain-text/Markdown files or JSONL records, splits them into chunks
+on paragraph and sentence boundaries, and adds them to the collection in
+batches through VectorStore.add_documents (batched embedding, batched
+upsert, content-hash IDs). Re-ingesting the same files only adds the
+chunks that changed.
+
+JSONL records use `content` (or `text`), optional `document_type` and
+optional `metadata`.
+
+Usage:
+    python ingestion.py protocols.jsonl guides/*.md --document-type guideline [--batch-size 256]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from text_segments import split_segments
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_CHARS = int(os.getenv('INGESTION_CHUNK_CHARS', '800'))
+DEFAULT_BATCH_SIZE = int(os.getenv('INGESTION_BATCH_SIZE', '256'))
+
+
+@dataclass
+class IngestionReport:
+    files: int = 0
+    records: int = 0
+    chunks: int = 0
+    added: int = 0
+    skipped: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            **asdict(self),
+            "elapsed_seconds": round(self.elapsed_seconds, 2),
+            "chunks_per_second": round(self.chunks_per_second, 1),
+        }
+
+
+def _scalar_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Chroma only stores str/int/float/bool metadata values."""
+    return {
+        key: value if isinstance(value, (str, int, float, bool)) else json.dumps(value, ensure_ascii=False)
+        for key, value in metadata.items()
+        if value is not None
+    }
+
+
+def iter_records(path: str, document_type: str) -> Iterator[Dict[str, Any]]:
+    """Yield {content, document_type, metadata} records from a JSONL or text file."""
+    source = os.path.basename(path)
+    if path.endswith('.jsonl'):
+        with open(path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"{source}:{line_number}: invalid JSON ({e}), skipped")
+                    continue
+                content = record.get('content') or record.get('text')
+                if not content:
+                    continue
+                yield {
+                    "content": content,
+                    "document_type": record.get('document_type', document_type),
+                    "metadata": {"source": source, "line": line_number, **record.get('metadata', {})},
+                }
+    else:
+        with open(path, encoding='utf-8') as f:
+            yield {"content": f.read(), "document_type": document_type, "metadata": {"source": source}}
+
+
+def iter_chunks(records: Iterable[Dict[str, Any]], max_chars: int = DEFAULT_CHUNK_CHARS) -> Iterator[Dict[str, Any]]:
+    """Split each record into chunks of at most `max_chars` (longer single sentences are kept whole)."""
+    for record in records:
+        contents = [segment.content for segment in split_segments(record["content"], max_chars) if segment.content]
+        for index, content in enumerate(contents):
+            yield {
+                "content": content,
+                "document_type": record["document_type"],
+                "metadata": _scalar_metadata({**record["metadata"], "chunk": index, "chunks": len(contents)}),
+            }
+
+
+async def ingest(paths: List[str], vector_store, document_type: str = 'guideline',
+                 max_chars: int = DEFAULT_CHUNK_CHARS, batch_size: int = DEFAULT_BATCH_SIZE,
+                 progress: Optional[Callable[[IngestionReport], None]] = None) -> IngestionReport:
+    """Chunk, embed and upsert `paths` into `vector_store` batch by batch."""
+    report = IngestionReport()
+    started = time.perf_counter()
+
+    def records() -> Iterator[Dict[str, Any]]:
+        for path in paths:
+            report.files += 1
+            for record in iter_records(path, document_type):
+                report.records += 1
+                yield record
+
+    async def flush(batch: List[Dict[str, Any]]):
+        result = await vector_store.add_documents(batch, batch_size=batch_size)
+        report.chunks += len(batch)
+        report.added += result["added"]
+        report.skipped += result["skipped"]
+        report.elapsed_seconds = time.perf_counter() - started
+        if progress:
+            progress(report)
+
+    batch: List[Dict[str, Any]] = []
+    for chunk in iter_chunks(records(), max_chars):
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+
+    report.elapsed_seconds = time.perf_counter() - started
+    return report
+
+
+def log_progress(report: IngestionReport):
+    logger.info(
+        f"Ingested {report.chunks} chunks from {report.files} files "
+        f"({report.added} added, {report.skipped} unchanged, {report.chunks_per_second:.1f} chunks/s)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest documents into the vector store")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--document-type", default="guideline")
+    parser.add_argument("--chunk-chars", type=int, default=DEFAULT_CHUNK_CHARS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from vector_store import VectorStore
+
+    async def run() -> IngestionReport:
+        store = VectorStore()
+        await store.initialize()
+        return await ingest(args.paths, store, args.document_type, args.chunk_chars, args.batch_size, log_progress)
+
+    report = asyncio.run(run())
+    print(json.dumps(report.as_dict(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
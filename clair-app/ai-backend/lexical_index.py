@@ -0,0 +1,211 @@
+"""
+BM25 inverted index for French clinical text.
+
+Complements the embedding search in VectorStore: drug names, acronyms
+("TSA", "PRN") and exact scale values ("Bristol type 6") are matched on
+their terms instead of through an English-centric embedding model, and
+without an embedding call. Terms are accent-folded, lowercased, stripped
+of stopwords and reduced by a light French stemmer, so "hydratée",
+"hydratation" and "Hydratations" share a stem.
+
+Documents are persisted in SQLite next to the Chroma files; postings are
+rebuilt in memory on load.
+"""
+import json
+import math
+import re
+import logging
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"\w+")
+
+STOPWORDS = frozenset("""
+a au aux avec ce ces cet cette d dans de des du elle elles en est et etre eu il ils
+j je l la le les leur leurs lui m ma mais me meme mes moi mon n ne nos notre nous on
+ou par pas pour qu que qui s sa se ses si son sont sur t ta te tes toi ton tu un une
+vos votre vous y a ete etait sont ont avait fait plus tres
+""".split())
+
+# Longest first; each ending is only removed if at least MIN_STEM characters remain
+SUFFIXES = (
+    'issements', 'issement', 'atrices', 'ateurs', 'ations', 'ements',
+    'atrice', 'ateur', 'ation', 'ement', 'ences', 'ances', 'euses', 'iques', 'istes',
+    'ismes', 'ence', 'ance', 'euse', 'ique', 'iste', 'isme', 'eurs', 'ites', 'ives',
+    'ees', 'ies', 'eur', 'ite', 'ive', 'ifs', 'ee', 'ie', 'if', 'er', 'ez', 'es', 'e', 's', 'x',
+)
+MIN_STEM = 3
+
+
+_COMBINING_MARKS = re.compile('[\u0300-\u036f]')
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents ("Hydratée" -> "hydratee")."""
+    return _COMBINING_MARKS.sub('', unicodedata.normalize('NFKD', text.lower()))
+
+
+def stem(word: str) -> str:
+    """Light French stemmer: drops one inflectional or derivational ending."""
+    if word.isdigit() or len(word) <= MIN_STEM:
+        return word
+    if word.endswith('aux') and len(word) > 5:
+        return word[:-3] + 'al'
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            word = word[:-len(suffix)]
+            break
+    # "selles" -> "sel", "hydratation" and "hydrater" -> "hydrat"
+    if len(word) > MIN_STEM and word[-1] == word[-2]:
+        word = word[:-1]
+    return word
+
+
+def analyze(text: str) -> List[str]:
+    """Index terms of `text`, in order; numbers are kept as terms."""
+    return [stem(word) for word in WORD_PATTERN.findall(fold(text)) if word not in STOPWORDS]
+
+
+class LexicalIndex:
+    """
+    In-memory BM25 index (Okapi, k1/b) keyed by document ID.
+
+    `add`/`remove` keep it in sync with the vector collection; `search`
+    returns (document_id, score) pairs, best first.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        self.db_path = db_path
+        self.k1 = k1
+        self.b = b
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        if db_path:
+            self._open_db()
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    # Persistence
+
+    def _open_db(self):
+        try:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS lexical_documents "
+                "(id TEXT PRIMARY KEY, content TEXT NOT NULL, metadata TEXT NOT NULL)"
+            )
+            self._db.commit()
+            rows = self._db.execute("SELECT id, content, metadata FROM lexical_documents").fetchall()
+            for document_id, content, metadata in rows:
+                self._index(document_id, content, json.loads(metadata))
+            logger.info(f"Lexical index loaded {len(rows)} documents from {self.db_path}")
+        except Exception as e:
+            logger.error(f"Failed to open lexical index database {self.db_path}: {e}")
+            self._db = None
+
+    def _persist(self, upserts: List[Tuple[str, str, Dict[str, Any]]], deletes: Iterable[str] = ()):
+        if self._db is None:
+            return
+        try:
+            self._db.executemany("DELETE FROM lexical_documents WHERE id = ?", [(i,) for i in deletes])
+            self._db.executemany(
+                "INSERT OR REPLACE INTO lexical_documents (id, content, metadata) VALUES (?, ?, ?)",
+                [(i, content, json.dumps(metadata, ensure_ascii=False)) for i, content, metadata in upserts]
+            )
+            self._db.commit()
+        except Exception as e:
+            logger.warning(f"Lexical index write failed: {e}")
+
+    # Maintenance
+
+    def _index(self, document_id: str, content: str, metadata: Dict[str, Any]):
+        self._unindex(document_id)
+        terms = Counter(analyze(content))
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[document_id] = frequency
+        length = sum(terms.values())
+        self._lengths[document_id] = length
+        self._total_length += length
+        self.documents[document_id] = {"content": content, "metadata": metadata}
+
+    def _unindex(self, document_id: str) -> bool:
+        document = self.documents.pop(document_id, None)
+        if document is None:
+            return False
+        for term in set(analyze(document["content"])):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(document_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(document_id, 0)
+        return True
+
+    def add(self, documents: List[Tuple[str, str, Dict[str, Any]]]):
+        """Index or re-index (document_id, content, metadata) triples."""
+        with self._lock:
+            for document_id, content, metadata in documents:
+                self._index(document_id, content, metadata)
+            self._persist(documents)
+
+    def remove(self, document_ids: List[str]):
+        with self._lock:
+            for document_id in document_ids:
+                self._unindex(document_id)
+            self._persist([], document_ids)
+
+    def clear(self):
+        with self._lock:
+            self._persist([], list(self.documents))
+            self.documents.clear()
+            self._postings.clear()
+            self._lengths.clear()
+            self._total_length = 0
+
+    # Queries
+
+    def covers(self, query: str) -> bool:
+        """True when every query term occurs in the index (an exact-term query)."""
+        terms = analyze(query)
+        with self._lock:
+            return bool(terms) and all(term in self._postings for term in terms)
+
+    def search(self, query: str, limit: int = 5, document_type: Optional[str] = None) -> List[Tuple[str, float]]:
+        with self._lock:
+            count = len(self.documents)
+            if not count:
+                return []
+            average_length = self._total_length / count
+            scores: Dict[str, float] = {}
+            for term in set(analyze(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for document_id, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[document_id] / average_length)
+                    scores[document_id] = scores.get(document_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+            if document_type:
+                scores = {
+                    document_id: score for document_id, score in scores.items()
+                    if self.documents[document_id]["metadata"].get('document_type') == document_type
+                }
+            return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def close(self):
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+            self._db = None
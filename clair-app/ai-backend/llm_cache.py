@@ -0,0 +1,164 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """Normalize input text so trivially different notes share a cache entry."""
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+class ResponseCache:
+    """
+    Content-addressed cache for LLM responses.
+
+    Entries live in a bounded in-memory LRU tier and, when `db_path` is set,
+    in a SQLite tier that survives restarts. Both tiers honour the same TTL.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 86400, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if db_path:
+            self._open_db()
+
+    @staticmethod
+    def make_key(text: str, template: str, model: str, options: Dict[str, Any]) -> str:
+        """Hash the normalized input, prompt template, model and generation options."""
+        payload = json.dumps(
+            {
+                "text": normalize_text(text),
+                "template": template,
+                "model": model,
+                "options": {k: options.get(k) for k in sorted(options)},
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _open_db(self):
+        try:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,)
+            )
+            self._db.commit()
+            logger.info(f"LLM response cache persisted to {self.db_path}")
+        except Exception as e:
+            logger.error(f"Failed to open LLM cache database {self.db_path}: {e}")
+            self._db = None
+
+    def _remember(self, key: str, value: str, created_at: float):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _db_get(self, key: str) -> Optional[tuple]:
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+    def _db_set(self, key: str, value: str, created_at: float):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, created_at)
+            )
+            self._db.commit()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached response for `key`, or None on a miss."""
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            value, created_at = entry
+            if now - created_at <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._memory[key]
+
+        if self._db is not None:
+            try:
+                row = await asyncio.to_thread(self._db_get, key)
+            except Exception as e:
+                logger.warning(f"LLM cache read failed: {e}")
+                row = None
+            if row and now - row[1] <= self.ttl_seconds:
+                self._remember(key, row[0], row[1])
+                self.hits += 1
+                self.disk_hits += 1
+                return row[0]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        """Store a response in every configured tier."""
+        created_at = time.time()
+        self._remember(key, value, created_at)
+        if self._db is not None:
+            try:
+                await asyncio.to_thread(self._db_set, key, value, created_at)
+            except Exception as e:
+                logger.warning(f"LLM cache write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "persistent": self._db is not None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def close(self):
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
+
+
+def create_response_cache() -> ResponseCache:
+    """Build a ResponseCache from LLM_CACHE_* environment variables."""
+    return ResponseCache(
+        max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', '1024')),
+        ttl_seconds=float(os.getenv('LLM_CACHE_TTL_SECONDS', '86400')),
+        db_path=os.getenv('LLM_CACHE_DB_PATH') or None,
+    )
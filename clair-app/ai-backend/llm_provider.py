@@ -0,0 +1,433 @@
+import os
+import abc
+import json
+import time
+import random
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = 'gemma3:4b'
+
+
+class ProviderError(Exception):
+    """Raised when the LLM backend fails or answers with an error status."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LLMProvider(abc.ABC):
+    """
+    Text generation backend shared by main.py and ai_service.py.
+
+    Results use Ollama's generate response shape: a dict with `response`,
+    `done` and, on the final chunk, the `load_duration`,
+    `prompt_eval_duration`, `prompt_eval_count`, `eval_duration` and
+    `eval_count` statistics.
+
+    `keep_alive` (an Ollama duration such as "30m", or "-1" for forever) is
+    how long the backend keeps a model loaded after a call; it applies to
+    every call unless one passes its own.
+    """
+
+    name = 'base'
+
+    def __init__(self, model: str = DEFAULT_MODEL, keep_alive: Optional[str] = None):
+        self.model = model
+        self.keep_alive = keep_alive
+
+    @abc.abstractmethod
+    async def generate(self, prompt: str, options: Optional[Dict[str, Any]] = None,
+                       system: Optional[str] = None, model: Optional[str] = None,
+                       keep_alive: Optional[str] = None) -> Dict[str, Any]:
+        """Run one generation and return the final response."""
+
+    @abc.abstractmethod
+    def stream(self, prompt: str, options: Optional[Dict[str, Any]] = None,
+               system: Optional[str] = None, model: Optional[str] = None,
+               keep_alive: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Yield response chunks as they are produced; the last one has done=True."""
+
+    @abc.abstractmethod
+    async def preload(self, model: Optional[str] = None, keep_alive: Optional[str] = None) -> Dict[str, Any]:
+        """Load `model` into memory without generating; the response carries `load_duration`."""
+
+    @abc.abstractmethod
+    async def list_models(self) -> List[str]:
+        """Names of the models available on the backend."""
+
+    def stats(self) -> Dict[str, Any]:
+        return {"provider": self.name, "model": self.model, "keep_alive": self.keep_alive}
+
+    async def close(self):
+        pass
+
+
+class CircuitOpenError(ProviderError):
+    """Raised without contacting the backend while the circuit breaker is open."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"LLM backend unavailable, retry in {retry_after:.0f}s", 503)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Fail fast while the backend is down.
+
+    Opens after `failure_threshold` consecutive failures; while open, calls
+    raise CircuitOpenError immediately. After `reset_timeout` seconds one
+    probe call is let through (half-open): success closes the circuit,
+    failure opens it again for another `reset_timeout`. A probe that ends
+    without an outcome (cancelled) or runs past `probe_timeout` frees the
+    slot for the next call, so a lost probe cannot keep the circuit shut.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, probe_timeout: float = 120.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = probe_timeout
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened = 0
+        self.short_circuited = 0
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+
+    def retry_after(self) -> float:
+        if self.state == 'half_open' and self._probe_started is not None:
+            return max(0.0, self._probe_started + self.probe_timeout - time.monotonic())
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def before_call(self):
+        if self.state == 'closed':
+            return
+        if self.state == 'open' and self.retry_after() <= 0:
+            self.state = 'half_open'
+            self._probe_started = time.monotonic()
+            return
+        if self.state == 'half_open' and self.retry_after() <= 0:
+            # No probe in flight, or the last one was lost: this call probes
+            self._probe_started = time.monotonic()
+            return
+        self.short_circuited += 1
+        raise CircuitOpenError(self.retry_after() or self.reset_timeout)
+
+    def release_probe(self):
+        """The call ended without an outcome (e.g. cancelled); let the next call probe."""
+        if self.state == 'half_open':
+            self._probe_started = None
+
+    def record_success(self):
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self._probe_started = None
+
+    def record_failure(self):
+        self._probe_started = None
+        self.consecutive_failures += 1
+        if self.state == 'half_open' or self.consecutive_failures >= self.failure_threshold:
+            if self.state != 'open':
+                logger.warning(f"LLM circuit breaker opened after {self.consecutive_failures} failures")
+                self.opened += 1
+            self.state = 'open'
+            self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened": self.opened,
+            "short_circuited": self.short_circuited,
+            "retry_after_s": round(self.retry_after(), 1) if self.state != 'closed' else 0.0,
+        }
+
+
+def _keep_alive_value(keep_alive: str):
+    """Ollama takes durations as strings ("30m") but a bare number of seconds as a number (-1 = forever)."""
+    try:
+        return int(keep_alive)
+    except ValueError:
+        return keep_alive
+
+
+# Errors raised before the request reached Ollama, safe to retry
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class OllamaProvider(LLMProvider):
+    """
+    Ollama over its HTTP API, through one pooled keep-alive client.
+
+    Connection errors are retried with jittered exponential backoff. Upstream
+    failures (connection errors, timeouts, 5xx) feed a circuit breaker so a
+    down Ollama costs callers an immediate CircuitOpenError rather than a
+    full timeout each.
+    """
+
+    name = 'ollama'
+
+    def __init__(self, host: str, model: str = DEFAULT_MODEL, max_connections: int = 64,
+                 max_keepalive: int = 16, connect_timeout: float = 5.0, read_timeout: float = 120.0,
+                 retries: int = 2, retry_backoff: float = 0.2, breaker: Optional[CircuitBreaker] = None,
+                 keep_alive: Optional[str] = None):
+        super().__init__(model, keep_alive)
+        self.base_url = host if host.startswith('http') else f'http://{host}'
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.retried = 0
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=60.0
+            )
+        )
+
+    def _payload(self, prompt: str, options: Optional[Dict[str, Any]], system: Optional[str],
+                 model: Optional[str], stream: bool, keep_alive: Optional[str] = None) -> Dict[str, Any]:
+        payload = {
+            "model": model or self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": options or {}
+        }
+        if system:
+            payload["system"] = system
+        keep_alive = keep_alive or self.keep_alive
+        if keep_alive:
+            payload["keep_alive"] = _keep_alive_value(keep_alive)
+        return payload
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: spread retries of concurrent callers over the window
+        return random.uniform(0, self.retry_backoff * (2 ** attempt))
+
+    async def _send(self, method: str, path: str, stream: bool = False, **kwargs) -> httpx.Response:
+        """Send a request through the breaker, retrying connection errors; checks the status."""
+        self.breaker.before_call()
+        try:
+            return await self._send_checked(method, path, stream, **kwargs)
+        except BaseException:
+            # Cancelled (scheduler deadline, client gone) before an outcome was recorded:
+            # a half-open probe must not hold the circuit. No-op once success/failure is recorded.
+            self.breaker.release_probe()
+            raise
+
+    async def _send_checked(self, method: str, path: str, stream: bool, **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                request = self._client.build_request(method, path, **kwargs)
+                response = await self._client.send(request, stream=stream)
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.retries:
+                    self.breaker.record_failure()
+                    raise ProviderError(f"Ollama unreachable after {attempt + 1} attempts: {e!r}") from e
+                self.retried += 1
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+            except httpx.HTTPError as e:
+                self.breaker.record_failure()
+                raise ProviderError(f"Ollama request failed: {e!r}") from e
+
+        if response.status_code != 200:
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            await response.aread()
+            await response.aclose()
+            raise ProviderError(f"Ollama API error: {response.status_code} {response.text[:200]}",
+                                response.status_code)
+        self.breaker.record_success()
+        return response
+
+    async def generate(self, prompt: str, options: Optional[Dict[str, Any]] = None,
+                       system: Optional[str] = None, model: Optional[str] = None,
+                       keep_alive: Optional[str] = None) -> Dict[str, Any]:
+        response = await self._send(
+            'POST', '/api/generate', json=self._payload(prompt, options, system, model, False, keep_alive)
+        )
+        return response.json()
+
+    async def stream(self, prompt: str, options: Optional[Dict[str, Any]] = None,
+                     system: Optional[str] = None, model: Optional[str] = None,
+                     keep_alive: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        # Only opening the stream is retried; a failure mid-stream is surfaced to the caller
+        response = await self._send(
+            'POST', '/api/generate', stream=True,
+            json=self._payload(prompt, options, system, model, True, keep_alive)
+        )
+        try:
+            async for line in response.aiter_lines():
+                if line:
+                    part = json.loads(line)
+                    if 'error' in part:
+                        raise ProviderError(f"Ollama stream error: {part['error']}")
+                    yield part
+        except httpx.HTTPError as e:
+            self.breaker.record_failure()
+            raise ProviderError(f"Ollama stream interrupted: {e!r}") from e
+        finally:
+            await response.aclose()
+
+    async def preload(self, model: Optional[str] = None, keep_alive: Optional[str] = None) -> Dict[str, Any]:
+        # A generate request without a prompt only loads the model (and resets its keep_alive)
+        payload: Dict[str, Any] = {"model": model or self.model, "stream": False}
+        keep_alive = keep_alive or self.keep_alive
+        if keep_alive:
+            payload["keep_alive"] = _keep_alive_value(keep_alive)
+        response = await self._send('POST', '/api/generate', json=payload)
+        return response.json()
+
+    async def list_models(self) -> List[str]:
+        response = await self._send('GET', '/api/tags')
+        return [model['name'] for model in response.json().get('models', [])]
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "retried": self.retried, "circuit_breaker": self.breaker.stats()}
+
+    async def close(self):
+        await self._client.aclose()
+
+
+class FakeProvider(LLMProvider):
+    """
+    Deterministic local stand-in for load tests and CI without Ollama.
+
+    Echoes the prompt after its first paragraph (where the templates put the
+    text being processed), one word per token, after `latency` seconds of
+    simulated prompt evaluation and at `tokens_per_second`. A seeded RNG
+    fails `failure_rate` of the calls with a 503, so runs with the same seed
+    fail the same calls. The first call for each model (generation or
+    preload) also waits `load_latency` seconds and reports it as
+    `load_duration`, like a cold model load.
+    """
+
+    name = 'fake'
+
+    def __init__(self, model: str = DEFAULT_MODEL, latency: float = 0.2, tokens_per_second: float = 30.0,
+                 failure_rate: float = 0.0, seed: int = 0, load_latency: float = 0.0,
+                 keep_alive: Optional[str] = None):
+        super().__init__(model, keep_alive)
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.failure_rate = failure_rate
+        self.load_latency = load_latency
+        self._loaded = set()
+        self._random = random.Random(seed)
+
+    async def _load(self, model: Optional[str]) -> float:
+        model = model or self.model
+        if model in self._loaded:
+            return 0.0
+        self._loaded.add(model)
+        await asyncio.sleep(self.load_latency)
+        return self.load_latency
+
+    def _tokens(self, prompt: str, options: Optional[Dict[str, Any]]) -> List[str]:
+        paragraphs = prompt.strip().split('\n\n')
+        body = paragraphs[1:] or paragraphs
+        # Drop a trailing answer label such as 'Résumé:'
+        if len(body) > 1 and body[-1].endswith(':') and '\n' not in body[-1]:
+            body = body[:-1]
+        words = '\n\n'.join(body).split(' ')
+        limit = int((options or {}).get('num_predict', 0)) or len(words)
+        return [word if i == 0 else ' ' + word for i, word in enumerate(words[:limit])]
+
+    def _final(self, prompt: str, tokens: List[str], model: Optional[str], load_seconds: float = 0.0) -> Dict[str, Any]:
+        eval_seconds = len(tokens) / self.tokens_per_second if self.tokens_per_second else 0.0
+        return {
+            "model": model or self.model,
+            "done": True,
+            "load_duration": int(load_seconds * 1e9),
+            "prompt_eval_count": len(prompt.split()),
+            "prompt_eval_duration": int(self.latency * 1e9),
+            "eval_count": len(tokens),
+            "eval_duration": int(eval_seconds * 1e9),
+        }
+
+    async def _start(self):
+        fail = self.failure_rate and self._random.random() < self.failure_rate
+        await asyncio.sleep(self.latency)
+        if fail:
+            raise ProviderError("Fake provider injected failure", 503)
+
+    async def generate(self, prompt: str, options: Optional[Dict[str, Any]] = None,
+                       system: Optional[str] = None, model: Optional[str] = None,
+                       keep_alive: Optional[str] = None) -> Dict[str, Any]:
+        await self._start()
+        load_seconds = await self._load(model)
+        tokens = self._tokens(prompt, options)
+        if self.tokens_per_second:
+            await asyncio.sleep(len(tokens) / self.tokens_per_second)
+        return {**self._final(prompt, tokens, model, load_seconds), "response": ''.join(tokens)}
+
+    async def stream(self, prompt: str, options: Optional[Dict[str, Any]] = None,
+                     system: Optional[str] = None, model: Optional[str] = None,
+                     keep_alive: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        await self._start()
+        load_seconds = await self._load(model)
+        tokens = self._tokens(prompt, options)
+        interval = 1 / self.tokens_per_second if self.tokens_per_second else 0.0
+        for token in tokens:
+            await asyncio.sleep(interval)
+            yield {"model": model or self.model, "response": token, "done": False}
+        yield {**self._final(prompt, tokens, model, load_seconds), "response": ''}
+
+    async def preload(self, model: Optional[str] = None, keep_alive: Optional[str] = None) -> Dict[str, Any]:
+        load_seconds = await self._load(model)
+        return {"model": model or self.model, "done": True, "load_duration": int(load_seconds * 1e9)}
+
+    async def list_models(self) -> List[str]:
+        return [self.model]
+
+
+def create_provider() -> LLMProvider:
+    """Build the LLM provider selected by LLM_PROVIDER (ollama or fake) and LLM_* / OLLAMA_* variables."""
+    kind = os.getenv('LLM_PROVIDER', 'ollama').lower()
+    model = os.getenv('LLM_MODEL', DEFAULT_MODEL)
+    keep_alive = os.getenv('LLM_KEEP_ALIVE', '30m') or None
+
+    if kind == 'fake':
+        logger.info("Using the fake LLM provider")
+        return FakeProvider(
+            model=model,
+            latency=float(os.getenv('LLM_FAKE_LATENCY_MS', '200')) / 1000,
+            tokens_per_second=float(os.getenv('LLM_FAKE_TOKENS_PER_SECOND', '30')),
+            failure_rate=float(os.getenv('LLM_FAKE_FAILURE_RATE', '0')),
+            seed=int(os.getenv('LLM_FAKE_SEED', '0')),
+            load_latency=float(os.getenv('LLM_FAKE_LOAD_MS', '0')) / 1000,
+            keep_alive=keep_alive,
+        )
+    if kind != 'ollama':
+        raise ValueError(f"Unknown LLM_PROVIDER: {kind}")
+
+    return OllamaProvider(
+        host=os.getenv('OLLAMA_HOST', 'host.docker.internal:11434'),
+        model=model,
+        max_connections=int(os.getenv('OLLAMA_MAX_CONNECTIONS', '64')),
+        max_keepalive=int(os.getenv('OLLAMA_MAX_KEEPALIVE', '16')),
+        connect_timeout=float(os.getenv('OLLAMA_CONNECT_TIMEOUT', '5')),
+        read_timeout=float(os.getenv('OLLAMA_READ_TIMEOUT', '120')),
+        retries=int(os.getenv('OLLAMA_RETRIES', '2')),
+        retry_backoff=float(os.getenv('OLLAMA_RETRY_BACKOFF', '0.2')),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv('OLLAMA_BREAKER_THRESHOLD', '5')),
+            reset_timeout=float(os.getenv('OLLAMA_BREAKER_RESET_SECONDS', '30')),
+            probe_timeout=float(os.getenv('OLLAMA_BREAKER_PROBE_TIMEOUT_SECONDS',
+                                          os.getenv('OLLAMA_READ_TIMEOUT', '120'))),
+        ),
+        keep_alive=keep_alive,
+    )
@@ -1,24 +1,141 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
-import ollama
+from starlette.routing import Match
+from typing import Awaitable, Callable, List, Optional, Union
+import asyncio
+import json
+import math
 import os
 import logging
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
+
+from communication_triage import COMMUNICATION_PROJECTION, create_triage_engine, triage_cursor, unread_filter
+from database import close_database, database_stats, get_database, init_database
+from llm_cache import create_response_cache
+from llm_provider import CircuitOpenError, create_provider
+from model_router import RoutingDecision, create_model_router, create_model_warmer, observe_load
+from metrics import (
+    CONTENT_TYPE,
+    HTTP_IN_FLIGHT,
+    HTTP_LATENCY,
+    HTTP_REQUESTS,
+    IN_FLIGHT,
+    QUEUE_WAIT,
+    REGISTRY,
+    cache_collector,
+    observe_ollama,
+)
+from scheduler import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    SchedulerRejected,
+    Ticket,
+    create_scheduler,
+)
+from singleflight import SingleFlight
+from text_analyzer import create_text_analyzer
+from text_cleanup import (
+    CORRECTION_CLEANUP,
+    SUMMARY_CLEANUP,
+    StreamingCleaner,
+    clean_correction,
+    clean_enhancement,
+    clean_summary,
+)
+from text_segments import count_tokens, join_segments, pack_segments, split_segments
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Configure Ollama client to connect to host machine
-OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'host.docker.internal:11434')
-ollama_client = ollama.Client(host=f'http://{OLLAMA_HOST}')
+# Per-request deadlines (queue wait + generation), in seconds
+INTERACTIVE_TIMEOUT = float(os.getenv('INTERACTIVE_TIMEOUT', '30'))
+BATCH_TIMEOUT = float(os.getenv('BATCH_TIMEOUT', '120'))
+
+# Batch endpoints: maximum items per request and items processed concurrently
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '100'))
+BATCH_MAX_PARALLEL = int(os.getenv('BATCH_MAX_PARALLEL', '4'))
+
+CORRECTION_OPTIONS = {
+    'temperature': 0.3,
+    'top_p': 0.9,
+    'num_predict': 400
+}
+ENHANCEMENT_OPTIONS = {
+    'temperature': 0.4,
+    'top_p': 0.9,
+    'num_predict': 500
+}
+# Communications fetched per cursor batch by /communications/triage
+TRIAGE_BATCH_SIZE = int(os.getenv('TRIAGE_BATCH_SIZE', '1000'))
+
+# Longest segment sent to the model in one /enhance-text call, in characters
+ENHANCEMENT_SEGMENT_CHARS = int(os.getenv('ENHANCEMENT_SEGMENT_CHARS', '600'))
+SUMMARY_OPTIONS = {
+    'temperature': 0.4,
+    'top_p': 0.9,
+    'num_predict': 250
+}
+# Longer summary inputs are summarized chunk by chunk, then the chunk summaries are merged
+SUMMARY_CHUNK_TOKENS = int(os.getenv('SUMMARY_CHUNK_TOKENS', '1500'))
+SUMMARY_MAX_ROUNDS = 3
+
+# A generation whose model took longer than this to load is reported as a cold start
+COLD_LOAD_SECONDS = float(os.getenv('LLM_COLD_LOAD_MS', '500')) / 1000
+
+
+# A single long-lived provider (LLM_PROVIDER=ollama|fake) so every request
+# reuses pooled connections instead of blocking the event loop.
+llm_provider = create_provider()
+MODEL_NAME = llm_provider.model
+# Task/size based model choice (LLM_SMALL_MODEL*, LLM_LARGE_MODEL*) and
+# preloading of every routed model (LLM_KEEP_ALIVE, LLM_WARMUP_INTERVAL_SECONDS)
+model_router = create_model_router(MODEL_NAME)
+model_warmer = create_model_warmer(llm_provider, model_router.models)
+response_cache = create_response_cache()
+single_flight = SingleFlight()
+scheduler = create_scheduler()
+text_analyzer = create_text_analyzer()
+triage_engine = create_triage_engine()
+
+
+def collect_generation_gauges():
+    scheduler_stats = scheduler.stats()
+    IN_FLIGHT.set(scheduler_stats["queue_depth"], stage="queued")
+    IN_FLIGHT.set(scheduler_stats["active"], stage="generating")
+    IN_FLIGHT.set(single_flight.stats()["in_flight"], stage="coalescing")
+
+
+REGISTRY.add_collector(cache_collector("main", response_cache))
+REGISTRY.add_collector(collect_generation_gauges)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await init_database()
+    except Exception as e:
+        # Text endpoints do not need MongoDB; data endpoints retry on first use
+        logger.warning(f"MongoDB unavailable at startup: {e}")
+    model_warmer.start()
+    yield
+    await model_warmer.stop()
+    await close_database()
+    await llm_provider.close()
+    response_cache.close()
+    logger.info(f"LLM provider {llm_provider.name} closed")
+
 
 app = FastAPI(
     title="Irielle AI Backend - Ollama",
     description="AI-powered text correction and summarization using Ollama with Gemma3n",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -30,33 +147,100 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+def route_template(request: Request) -> str:
+    """Route path (e.g. /correct-text) used as the endpoint label, to keep label cardinality bounded."""
+    for route in app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests and time them per endpoint (until headers for streamed responses)."""
+    endpoint = route_template(request)
+    started = time.perf_counter()
+    status = 500
+    HTTP_IN_FLIGHT.inc(endpoint=endpoint)
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_FLIGHT.dec(endpoint=endpoint)
+        HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=str(status))
+        HTTP_LATENCY.observe(time.perf_counter() - started, endpoint=endpoint)
+
 # Pydantic models
 class TextCorrection(BaseModel):
     text: str
+    stream: Optional[bool] = False
 
 class TextSummary(BaseModel):
     text: str
     context: Optional[str] = "healthcare"
     language: Optional[str] = "french"
+    stream: Optional[bool] = False
+    # None: chunk only when the text is over SUMMARY_CHUNK_TOKENS
+    chunked: Optional[bool] = None
+
+class TextAnalysis(BaseModel):
+    text: str
+    context: Optional[str] = "healthcare"
+    language: Optional[str] = "french"
+    analysis_type: Optional[str] = "realtime"
+
+class TextEnhancement(BaseModel):
+    text: str
+    context: Optional[str] = "healthcare"
+    language: Optional[str] = "french"
+    enhancement_type: Optional[str] = "professional"
+
+class CommunicationTriage(BaseModel):
+    user_id: Optional[str] = None
+    patient_ids: Optional[List[str]] = None
+    since_days: Optional[int] = None
+    report_every: Optional[int] = 1000
+    stream: Optional[bool] = True
+
+class BatchItem(BaseModel):
+    id: Optional[str] = None
+    text: str
+
+class BatchCorrection(BaseModel):
+    items: List[BatchItem]
+    stream: Optional[bool] = False
+
+class BatchSummary(BaseModel):
+    items: List[BatchItem]
+    context: Optional[str] = "healthcare"
+    language: Optional[str] = "french"
+    stream: Optional[bool] = False
 
 @app.get("/")
 async def root():
     return {
         "message": "Irielle AI Backend - Ollama",
         "status": "active",
-        "model": "gemma3:4b",
+        "model": MODEL_NAME,
+        "models": model_router.models,
         "timestamp": datetime.now().isoformat()
     }
 
 @app.get("/health")
 async def health_check():
     try:
-        # Test Ollama connection
-        models = ollama_client.list()
+        # Test LLM backend connection
+        models = await llm_provider.list_models()
         return {
             "status": "healthy",
             "ollama_available": True,
-            "models": [model['name'] for model in models.get('models', [])],
+            "models": models,
+            **llm_provider.stats(),
+            "warmup": model_warmer.stats(),
+            "database": database_stats(),
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -65,80 +249,338 @@ async def health_check():
             "status": "degraded",
             "ollama_available": False,
             "error": str(e),
+            **llm_provider.stats(),
+            "warmup": model_warmer.stats(),
+            "database": database_stats(),
             "timestamp": datetime.now().isoformat()
         }
 
+CORRECTION_TEMPLATE = """Vous êtes un correcteur professionnel médical. Corrigez seulement l'orthographe, la grammaire et le style professionnel du texte suivant. Retournez uniquement le texte corrigé sans explication ni introduction:
+
+{text}"""
+
+
+def summary_context(context: Optional[str]) -> str:
+    if context == "healthcare":
+        return "dans le contexte des soins de santé et résidences DI-TSA"
+    return ""
+
+
+def summary_template(context: Optional[str]) -> str:
+    return f"""Résumez ce texte médical en 2-3 phrases professionnelles {summary_context(context)}:
+
+{{text}}
+
+Résumé:"""
+
+
+def chunk_summary_template(context: Optional[str]) -> str:
+    return f"""Résumez cet extrait de notes d'observation {summary_context(context)} en quelques phrases factuelles, en conservant les dates, les incidents et les changements notables:
+
+{{text}}
+
+Résumé:"""
+
+
+def reduce_summary_template(context: Optional[str]) -> str:
+    return f"""Voici les résumés successifs de plusieurs extraits de notes d'observation. Rédigez-en un résumé global en 2-3 phrases professionnelles {summary_context(context)}, en dégageant les tendances:
+
+{{text}}
+
+Résumé:"""
+
+
+ENHANCEMENT_INSTRUCTIONS = {
+    "professional": "Réécrivez ce passage en utilisant un ton professionnel et médical approprié, en corrigeant la grammaire et en améliorant la clarté.",
+    "concise": "Réécrivez ce passage de manière plus concise tout en gardant toutes les informations importantes.",
+    "detailed": "Enrichissez ce passage en ajoutant des précisions pertinentes, sans inventer de faits."
+}
+
+
+def enhancement_template(enhancement_type: Optional[str]) -> str:
+    instruction = ENHANCEMENT_INSTRUCTIONS.get(enhancement_type, ENHANCEMENT_INSTRUCTIONS["professional"])
+    return f"""{instruction} Retournez uniquement le passage réécrit, sans explication ni introduction:
+
+{{text}}"""
+
+
+@dataclass
+class Generation:
+    """Raw model output and where it came from."""
+    text: str
+    routing: RoutingDecision
+    cached: bool = False
+    coalesced: bool = False
+    queue_wait_ms: float = 0.0
+    service_ms: float = 0.0
+    load_ms: float = 0.0
+
+    @property
+    def model(self) -> str:
+        return self.routing.model
+
+    @property
+    def cold_start(self) -> bool:
+        return self.load_ms >= COLD_LOAD_SECONDS * 1000
+
+    def timings(self) -> dict:
+        return {
+            "queue_wait_ms": self.queue_wait_ms,
+            "service_ms": self.service_ms,
+            "load_ms": self.load_ms
+        }
+
+    def model_info(self) -> dict:
+        return {
+            "model_used": self.model,
+            "routing": self.routing.as_dict(),
+            "cold_start": self.cold_start
+        }
+
+
+def ticket_timings(ticket: Ticket) -> dict:
+    QUEUE_WAIT.observe(ticket.queue_wait, priority="batch" if ticket.priority >= PRIORITY_BATCH else "interactive")
+    return {
+        "queue_wait_ms": round(ticket.queue_wait * 1000, 1),
+        "service_ms": round(ticket.service_time * 1000, 1)
+    }
+
+
+async def generate_raw(template: str, text: str, options: dict,
+                       priority: int = PRIORITY_INTERACTIVE, timeout: float = INTERACTIVE_TIMEOUT,
+                       task: str = "default", routing: Optional[RoutingDecision] = None) -> Generation:
+    """
+    Return the raw model output for `template` applied to `text`.
+
+    The model is chosen by model_router from `task` and the size of `text`.
+    Served from the response cache when possible; identical prompts already
+    in flight share the same upstream call, which is admitted through the
+    generation scheduler. Raises SchedulerRejected when shed.
+    """
+    routing = routing or model_router.route(task, text)
+    model = routing.model
+    key = response_cache.make_key(text, template, model, options)
+    cached = await response_cache.get(key)
+    if cached is not None:
+        return Generation(cached, routing, cached=True)
+
+    async def call_upstream() -> tuple:
+        async def generate() -> tuple:
+            response = await llm_provider.generate(template.format(text=text), options, model=model)
+            observe_ollama(response, caller="main", model=model)
+            return response['response'], observe_load(response, model, COLD_LOAD_SECONDS)
+
+        (raw, load_ms), ticket = await scheduler.run(generate, priority=priority, timeout=timeout)
+        await response_cache.set(key, raw)
+        return raw, {**ticket_timings(ticket), "load_ms": load_ms}
+
+    (raw, timings), coalesced = await single_flight.do(key, call_upstream)
+    return Generation(raw, routing, coalesced=coalesced, **timings)
+
+
+# Generation failures that carry a status code and a Retry-After delay
+Unavailable = (SchedulerRejected, CircuitOpenError)
+
+
+def unavailable_detail(error: Union[SchedulerRejected, CircuitOpenError]) -> str:
+    if isinstance(error, CircuitOpenError):
+        return "Service IA temporairement indisponible, veuillez réessayer sous peu"
+    return "Service IA surchargé, veuillez réessayer sous peu"
+
+
+def rejection_exception(rejection: Union[SchedulerRejected, CircuitOpenError]) -> HTTPException:
+    """Map a shed generation, or an open LLM circuit, to 429/503 with a Retry-After header."""
+    retry_after = max(1, math.ceil(rejection.retry_after))
+    logger.warning(f"Generation rejected: {rejection} (retry after {retry_after}s)")
+    return HTTPException(
+        status_code=rejection.status_code,
+        detail=unavailable_detail(rejection),
+        headers={"Retry-After": str(retry_after)}
+    )
+
+
+def correction_result(request: TextCorrection, corrected_text: str, generation: Generation) -> dict:
+    return {
+        "success": True,
+        "original_text": request.text,
+        "corrected_text": corrected_text,
+        "has_changes": corrected_text.strip() != request.text.strip(),
+        "suggestions": {
+            "grammar_improvements": True if corrected_text != request.text else False,
+            "style_improvements": True if len(corrected_text) != len(request.text) else False
+        },
+        "timestamp": datetime.now().isoformat(),
+        **generation.model_info(),
+        "cached": generation.cached,
+        "coalesced": generation.coalesced,
+        **generation.timings()
+    }
+
+
+async def summarize_chunks(chunks: List[str], context: Optional[str]) -> tuple:
+    """
+    Map step of chunked summarization: summarize chunks concurrently
+    (bounded by BATCH_MAX_PARALLEL) through the cached generation path, so
+    chunks that did not change since the last request are not regenerated.
+    If the joined summaries are still over the budget, they are chunked and
+    summarized again. Returns the reduce input and chunk counters.
+    """
+    template = chunk_summary_template(context)
+    semaphore = asyncio.Semaphore(BATCH_MAX_PARALLEL)
+
+    async def summarize(chunk: str) -> Generation:
+        async with semaphore:
+            return await generate_raw(template, chunk, SUMMARY_OPTIONS, priority=PRIORITY_BATCH,
+                                      timeout=BATCH_TIMEOUT, task="summary_chunk")
+
+    stats = {"total": len(chunks), "summarized": 0, "reused": 0, "rounds": 0}
+    while True:
+        generations = await asyncio.gather(*(summarize(chunk) for chunk in chunks))
+        reused = sum(1 for g in generations if g.cached or g.coalesced)
+        stats["reused"] += reused
+        stats["summarized"] += len(generations) - reused
+        stats["rounds"] += 1
+
+        joined = "\n\n".join(
+            f"Partie {i}: {clean_summary(g.text)}" for i, g in enumerate(generations, 1)
+        )
+        if count_tokens(joined) <= SUMMARY_CHUNK_TOKENS or stats["rounds"] >= SUMMARY_MAX_ROUNDS:
+            return joined, stats
+        next_chunks = pack_segments(joined, SUMMARY_CHUNK_TOKENS)
+        if len(next_chunks) >= len(chunks):
+            return joined, stats
+        chunks = next_chunks
+
+
+def summary_result(request: TextSummary, summary: str, generation: Generation,
+                   chunks: Optional[dict] = None) -> dict:
+    return {
+        "success": True,
+        "original_text": request.text,
+        "summary": summary,
+        "word_count_original": len(request.text.split()),
+        "word_count_summary": len(summary.split()),
+        "compression_ratio": round(len(summary) / len(request.text) * 100, 1) if len(request.text) > 0 else 0,
+        "context": request.context,
+        "language": request.language,
+        "timestamp": datetime.now().isoformat(),
+        **generation.model_info(),
+        "cached": generation.cached,
+        "coalesced": generation.coalesced,
+        **({"chunks": chunks} if chunks else {}),
+        **generation.timings()
+    }
+
+
+async def stream_generation(template: str, text: str, options: dict, cleaner: StreamingCleaner,
+                           clean: Callable[[str], str], build_result: Callable[[str, Generation], dict],
+                           error_detail: str, priority: int = PRIORITY_INTERACTIVE,
+                           timeout: float = INTERACTIVE_TIMEOUT, task: str = "default") -> StreamingResponse:
+    """
+    Stream a generation as NDJSON events.
+
+    Emits {"type": "token", "content": ...} while the model produces text,
+    then a single {"type": "done", ...} event carrying the same payload as the
+    non-streaming endpoint, or {"type": "error", "detail": ...} on failure.
+    A cache hit, or an identical generation already in flight, is sent as a
+    single token event. A scheduler slot is acquired before the response
+    starts, so shedding still surfaces as a 429/503 status.
+    """
+    def event(payload: dict) -> str:
+        return json.dumps(payload, ensure_ascii=False) + "\n"
+
+    routing = model_router.route(task, text)
+    model = routing.model
+    key = response_cache.make_key(text, template, model, options)
+    generation = None
+    if key in single_flight:
+        generation = await generate_raw(template, text, options, priority, timeout, routing=routing)
+    else:
+        cached = await response_cache.get(key)
+        if cached is not None:
+            generation = Generation(cached, routing, cached=True)
+
+    if generation is not None:
+        async def replay():
+            cleaned = clean(generation.text)
+            yield event({"type": "token", "content": cleaned})
+            yield event({"type": "done", **build_result(cleaned, generation)})
+
+        return StreamingResponse(replay(), media_type="application/x-ndjson")
+
+    ticket = await scheduler.acquire(priority, timeout)
+
+    async def events():
+        released = False
+        try:
+            raw = []
+            load_ms = 0.0
+            async for part in llm_provider.stream(template.format(text=text), options, model=model):
+                if part.get('done'):
+                    observe_ollama(part, caller="main", model=model)
+                    load_ms = observe_load(part, model, COLD_LOAD_SECONDS)
+                token = part.get('response', '')
+                raw.append(token)
+                visible = cleaner.feed(token)
+                if visible:
+                    yield event({"type": "token", "content": visible})
+            visible = cleaner.flush()
+            if visible:
+                yield event({"type": "token", "content": visible})
+
+            scheduler.release(ticket)
+            released = True
+            raw_text = ''.join(raw)
+            await response_cache.set(key, raw_text)
+            generation = Generation(raw_text, routing, load_ms=load_ms, **ticket_timings(ticket))
+            yield event({"type": "done", **build_result(clean(raw_text), generation)})
+        except Exception as e:
+            logger.error(f"Streaming generation failed: {e}")
+            yield event({"type": "error", "detail": error_detail})
+        finally:
+            if not released:
+                scheduler.release(ticket)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
 @app.post("/correct-text")
 async def correct_text(request: TextCorrection):
     """
     Correct text using Ollama Gemma3n for grammar, spelling, and professional tone.
+
+    With `stream: true` the response is NDJSON: token events followed by a
+    final "done" event.
     """
+    if request.stream:
+        try:
+            return await stream_generation(
+                CORRECTION_TEMPLATE,
+                request.text,
+                CORRECTION_OPTIONS,
+                StreamingCleaner(CORRECTION_CLEANUP),
+                clean_correction,
+                lambda corrected_text, generation: correction_result(request, corrected_text, generation),
+                "Service de correction IA temporairement indisponible",
+                task="correction"
+            )
+        except Unavailable as e:
+            raise rejection_exception(e)
+
     try:
-        logger.info(f"Processing text correction request with Ollama host: {OLLAMA_HOST}")
-        
-        prompt = f"""Vous êtes un correcteur professionnel médical. Corrigez seulement l'orthographe, la grammaire et le style professionnel du texte suivant. Retournez uniquement le texte corrigé sans explication ni introduction:
-
-{request.text}"""
-
-        logger.info(f"Sending generate request to Ollama...")
-        response = ollama_client.generate(
-            model='gemma3:4b',
-            prompt=prompt,
-            options={
-                'temperature': 0.3,
-                'top_p': 0.9,
-                'num_predict': 400
-            }
+        logger.info(f"Processing text correction request with LLM provider: {llm_provider.name}")
+
+        generation = await generate_raw(CORRECTION_TEMPLATE, request.text, CORRECTION_OPTIONS, task="correction")
+        logger.info(
+            f"Generate request completed successfully with {generation.model} "
+            f"(route={generation.routing.route}, cached={generation.cached}, "
+            f"coalesced={generation.coalesced}, cold_start={generation.cold_start})"
         )
-        logger.info("Generate request completed successfully")
-        
-        corrected_text = response['response'].strip()
-        
-        # Aggressive cleanup - remove any unwanted prefixes/suffixes
-        unwanted_prefixes = [
-            'voici', 'voilà', 'le texte corrigé', 'texte corrigé', 'correction',
-            'voici le texte', 'voilà le texte', 'le résultat', 'résultat',
-            'voici la correction', 'voilà la correction', 'après correction'
-        ]
-        
-        # Check for unwanted prefixes and remove them
-        corrected_lower = corrected_text.lower()
-        for prefix in unwanted_prefixes:
-            if corrected_lower.startswith(prefix):
-                # Find the actual content after the prefix
-                lines = corrected_text.split('\n')
-                for i, line in enumerate(lines):
-                    if ':' in line and any(p in line.lower() for p in unwanted_prefixes):
-                        corrected_text = '\n'.join(lines[i+1:]).strip()
-                        break
-                else:
-                    # If no colon found, just remove the prefix
-                    corrected_text = corrected_text[len(prefix):].strip()
-                break
-        
-        # Remove wrapping quotes
-        if corrected_text.startswith('"') and corrected_text.endswith('"'):
-            corrected_text = corrected_text[1:-1].strip()
-        if corrected_text.startswith("'") and corrected_text.endswith("'"):
-            corrected_text = corrected_text[1:-1].strip()
-            
-        # Remove any remaining colons at the start
-        if corrected_text.startswith(':'):
-            corrected_text = corrected_text[1:].strip()
-        
-        return {
-            "success": True,
-            "original_text": request.text,
-            "corrected_text": corrected_text,
-            "has_changes": corrected_text.strip() != request.text.strip(),
-            "suggestions": {
-                "grammar_improvements": True if corrected_text != request.text else False,
-                "style_improvements": True if len(corrected_text) != len(request.text) else False
-            },
-            "timestamp": datetime.now().isoformat(),
-            "model_used": "gemma3:4b"
-        }
-        
+
+        return correction_result(request, clean_correction(generation.text), generation)
+
+    except Unavailable as e:
+        raise rejection_exception(e)
     except Exception as e:
         logger.error(f"Text correction failed: {e}")
         raise HTTPException(
@@ -150,102 +592,62 @@ async def correct_text(request: TextCorrection):
 async def generate_summary(request: TextSummary):
     """
     Generate summary using Ollama Gemma3n with healthcare context awareness.
+
+    With `stream: true` the response is NDJSON: token events followed by a
+    final "done" event.
+
+    Texts over SUMMARY_CHUNK_TOKENS (or any text with `chunked: true`) are
+    split on note and paragraph boundaries, the chunks are summarized
+    concurrently, and the final summary is generated from the chunk
+    summaries. Chunk summaries are cached, so appending notes only
+    summarizes the new chunks.
     """
-    try:
-        context_prompt = ""
-        if request.context == "healthcare":
-            context_prompt = "dans le contexte des soins de santé et résidences DI-TSA"
-        
-        prompt = f"""Résumez ce texte médical en 2-3 phrases professionnelles {context_prompt}:
+    template = summary_template(request.context)
+    text = request.text
+    chunks = None
+    task = "summary"
 
-{request.text}
+    chunk_texts = pack_segments(request.text, SUMMARY_CHUNK_TOKENS) if request.chunked is not False else []
+    if len(chunk_texts) > 1 or (request.chunked and chunk_texts):
+        try:
+            text, chunks = await summarize_chunks(chunk_texts, request.context)
+        except Unavailable as e:
+            raise rejection_exception(e)
+        except Exception as e:
+            logger.error(f"Chunk summarization failed: {e}")
+            raise HTTPException(
+                status_code=503,
+                detail="Service de résumé IA temporairement indisponible"
+            )
+        template = reduce_summary_template(request.context)
+        task = "summary_reduce"
 
-Résumé:"""
+    if request.stream:
+        try:
+            return await stream_generation(
+                template,
+                text,
+                SUMMARY_OPTIONS,
+                StreamingCleaner(SUMMARY_CLEANUP),
+                clean_summary,
+                lambda summary, generation: summary_result(request, summary, generation, chunks),
+                "Service de résumé IA temporairement indisponible",
+                priority=PRIORITY_BATCH,
+                timeout=BATCH_TIMEOUT,
+                task=task
+            )
+        except Unavailable as e:
+            raise rejection_exception(e)
 
-        response = ollama_client.generate(
-            model='gemma3:4b',
-            prompt=prompt,
-            options={
-                'temperature': 0.4,
-                'top_p': 0.9,
-                'num_predict': 250
-            }
+    try:
+        generation = await generate_raw(
+            template, text, SUMMARY_OPTIONS, priority=PRIORITY_BATCH, timeout=BATCH_TIMEOUT, task=task
         )
-        
-        summary = response['response'].strip()
-        
-        # Aggressive cleanup for summary
-        unwanted_prefixes = [
-            'voici', 'voilà', 'le résumé', 'résumé', 'voici le résumé',
-            'voilà le résumé', 'résumé:', 'voici un résumé', 'résultat',
-            'voici la synthèse', 'synthèse', 'en résumé', 'pour résumer',
-            'ce résumé', 'ce résumé est', 'le patient', 'dans le contexte'
-        ]
-        
-        # Remove entire prefatory sentences
-        unwanted_sentences = [
-            'ce résumé est pertinent pour les soins de santé',
-            'ce résumé est approprié pour',
-            'dans le contexte des soins de santé',
-            'pour les résidences di-tsa'
-        ]
-        
-        # Clean up unwanted sentences first
-        summary_lower = summary.lower()
-        for sentence in unwanted_sentences:
-            if sentence in summary_lower:
-                # Remove the entire sentence and everything before it up to the first period
-                lines = summary.split('.')
-                cleaned_lines = []
-                found_content = False
-                for line in lines:
-                    if not found_content and any(s in line.lower() for s in unwanted_sentences):
-                        continue
-                    if not found_content and line.strip() and not any(s in line.lower() for s in unwanted_sentences):
-                        found_content = True
-                    if found_content:
-                        cleaned_lines.append(line)
-                summary = '.'.join(cleaned_lines)
-                break
-        
-        # Check for unwanted prefixes and remove them
-        summary_lower = summary.lower()
-        for prefix in unwanted_prefixes:
-            if summary_lower.startswith(prefix):
-                # Find the actual content after the prefix
-                lines = summary.split('\n')
-                for i, line in enumerate(lines):
-                    if ':' in line and any(p in line.lower() for p in unwanted_prefixes):
-                        summary = '\n'.join(lines[i+1:]).strip()
-                        break
-                else:
-                    # If no colon found, just remove the prefix
-                    summary = summary[len(prefix):].strip()
-                break
-        
-        # Remove wrapping quotes
-        if summary.startswith('"') and summary.endswith('"'):
-            summary = summary[1:-1].strip()
-        if summary.startswith("'") and summary.endswith("'"):
-            summary = summary[1:-1].strip()
-            
-        # Remove any remaining colons at the start
-        if summary.startswith(':'):
-            summary = summary[1:].strip()
-        
-        return {
-            "success": True,
-            "original_text": request.text,
-            "summary": summary,
-            "word_count_original": len(request.text.split()),
-            "word_count_summary": len(summary.split()),
-            "compression_ratio": round(len(summary) / len(request.text) * 100, 1) if len(request.text) > 0 else 0,
-            "context": request.context,
-            "language": request.language,
-            "timestamp": datetime.now().isoformat(),
-            "model_used": "gemma3:4b"
-        }
-        
+
+        return summary_result(request, clean_summary(generation.text), generation, chunks)
+
+    except Unavailable as e:
+        raise rejection_exception(e)
     except Exception as e:
         logger.error(f"Summary generation failed: {e}")
         raise HTTPException(
@@ -253,6 +655,293 @@ Résumé:"""
             detail="Service de résumé IA temporairement indisponible"
         )
 
+@app.post("/analyze-text")
+async def analyze_text(request: TextAnalysis):
+    """
+    Real-time spelling, grammar and style checks for editor underlines.
+
+    Runs locally on precompiled rules and a dictionary, without calling the
+    LLM, so it can be invoked on every keystroke pause.
+    """
+    started = time.perf_counter()
+    errors = text_analyzer.analyze(request.text, request.language or "french")
+    return {
+        "success": True,
+        "errors": errors,
+        "confidence_score": 0.7,
+        "model_used": "local-rules",
+        "processing_time_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+@app.post("/communications/triage")
+async def triage_communications(request: CommunicationTriage):
+    """
+    Triage unread communications for urgency and sentiment.
+
+    Scores messages straight from a projected MongoDB cursor and keeps only
+    running totals; with `stream` the totals are emitted as NDJSON every
+    `report_every` messages, followed by a final "done" line.
+    """
+    try:
+        db = await get_database()
+    except Exception as e:
+        logger.error(f"Communication triage unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Base de données temporairement indisponible")
+
+    since = datetime.now() - timedelta(days=request.since_days) if request.since_days else None
+    cursor = db.communications.find(
+        unread_filter(request.user_id, request.patient_ids, since),
+        COMMUNICATION_PROJECTION,
+        batch_size=TRIAGE_BATCH_SIZE
+    )
+    updates = triage_cursor(cursor, triage_engine, report_every=max(1, request.report_every or 1000))
+
+    if not request.stream:
+        try:
+            async for update in updates:
+                result = update
+        except Exception as e:
+            logger.error(f"Communication triage failed: {e}")
+            raise HTTPException(status_code=503, detail="Base de données temporairement indisponible")
+        del result["done"]
+        return {**result, "timestamp": datetime.now().isoformat()}
+
+    async def events():
+        try:
+            async for update in updates:
+                done = update.pop("done")
+                yield json.dumps({"type": "done" if done else "progress", **update}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.error(f"Communication triage failed: {e}")
+            yield json.dumps({"type": "error", "error": "Base de données temporairement indisponible"},
+                             ensure_ascii=False) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.post("/enhance-text")
+async def enhance_text(request: TextEnhancement):
+    """
+    Enhance text segment by segment.
+
+    The note is split into paragraphs (long paragraphs on sentence
+    boundaries) and each segment goes through the cached generation path, so
+    re-submitting an edited note only regenerates the segments that changed.
+    """
+    template = enhancement_template(request.enhancement_type)
+    segments = split_segments(request.text, ENHANCEMENT_SEGMENT_CHARS)
+    semaphore = asyncio.Semaphore(BATCH_MAX_PARALLEL)
+
+    async def enhance_segment(content: str) -> Optional[Generation]:
+        if not content:
+            return None
+        async with semaphore:
+            return await generate_raw(template, content, ENHANCEMENT_OPTIONS, task="enhancement")
+
+    try:
+        generations = await asyncio.gather(*(enhance_segment(segment.content) for segment in segments))
+    except Unavailable as e:
+        raise rejection_exception(e)
+    except Exception as e:
+        logger.error(f"Text enhancement failed: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Service d'amélioration IA temporairement indisponible"
+        )
+
+    contents = [
+        clean_enhancement(generation.text) if generation else segment.content
+        for segment, generation in zip(segments, generations)
+    ]
+    enhanced_text = join_segments(segments, contents)
+    generated = [g for g in generations if g is not None]
+    reused = sum(1 for g in generated if g.cached or g.coalesced)
+
+    return {
+        "success": True,
+        "original_text": request.text,
+        "enhanced_text": enhanced_text,
+        "enhancement_type": request.enhancement_type,
+        "has_changes": enhanced_text.strip() != request.text.strip(),
+        "segments": {
+            "total": len(generated),
+            "regenerated": len(generated) - reused,
+            "reused": reused
+        },
+        "timestamp": datetime.now().isoformat(),
+        # Segments are routed one by one and may use different models
+        "model_used": ", ".join(sorted({g.model for g in generated})) or MODEL_NAME,
+        "cold_start": any(g.cold_start for g in generated)
+    }
+
+def validate_batch(items: List[BatchItem]):
+    if not items:
+        raise HTTPException(status_code=400, detail="Aucun élément à traiter")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Trop d'éléments dans le lot (maximum {BATCH_MAX_ITEMS})"
+        )
+
+
+def batch_processor(process: Callable[[BatchItem], Awaitable[dict]],
+                    error_detail: str) -> Callable[[int, BatchItem], Awaitable[dict]]:
+    """
+    Wrap `process` so each batch item yields its own result or error entry,
+    tagged with its index and id, with at most BATCH_MAX_PARALLEL in flight.
+    """
+    semaphore = asyncio.Semaphore(BATCH_MAX_PARALLEL)
+
+    async def process_item(index: int, item: BatchItem) -> dict:
+        async with semaphore:
+            try:
+                return {"index": index, "id": item.id, **await process(item)}
+            except Unavailable as e:
+                return {
+                    "index": index,
+                    "id": item.id,
+                    "success": False,
+                    "error": unavailable_detail(e),
+                    "status_code": e.status_code,
+                    "retry_after": max(1, math.ceil(e.retry_after))
+                }
+            except Exception as e:
+                logger.error(f"Batch item {index} failed: {e}")
+                return {
+                    "index": index,
+                    "id": item.id,
+                    "success": False,
+                    "error": error_detail,
+                    "status_code": 503
+                }
+
+    return process_item
+
+
+def batch_counts(total: int, results: List[dict]) -> dict:
+    succeeded = sum(1 for r in results if r["success"])
+    return {
+        "total": total,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+async def run_batch(items: List[BatchItem], process_item: Callable[[int, BatchItem], Awaitable[dict]]) -> dict:
+    """Process every item and return the results in request order."""
+    results = await asyncio.gather(*(process_item(i, item) for i, item in enumerate(items)))
+    return {
+        "success": all(r["success"] for r in results),
+        "results": results,
+        **batch_counts(len(items), results)
+    }
+
+
+def stream_batch(items: List[BatchItem], process_item: Callable[[int, BatchItem], Awaitable[dict]]) -> StreamingResponse:
+    """
+    Stream batch results as NDJSON "item" events in completion order,
+    followed by a "done" event with the counts.
+    """
+    async def events():
+        tasks = [asyncio.ensure_future(process_item(i, item)) for i, item in enumerate(items)]
+        results = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                results.append(result)
+                yield json.dumps({"type": "item", **result}, ensure_ascii=False) + "\n"
+            yield json.dumps({"type": "done", **batch_counts(len(items), results)}, ensure_ascii=False) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.post("/batch/correct-text")
+async def batch_correct_text(request: BatchCorrection):
+    """
+    Correct many texts in one request with bounded parallelism.
+
+    Items are scheduled at batch priority, behind interactive corrections.
+    With `stream: true` each item's result is sent as soon as it finishes.
+    """
+    validate_batch(request.items)
+
+    async def correct(item: BatchItem) -> dict:
+        generation = await generate_raw(
+            CORRECTION_TEMPLATE, item.text, CORRECTION_OPTIONS,
+            priority=PRIORITY_BATCH, timeout=BATCH_TIMEOUT, task="correction"
+        )
+        return correction_result(TextCorrection(text=item.text), clean_correction(generation.text), generation)
+
+    process_item = batch_processor(correct, "Service de correction IA temporairement indisponible")
+    if request.stream:
+        return stream_batch(request.items, process_item)
+    return await run_batch(request.items, process_item)
+
+@app.post("/batch/generate-summary")
+async def batch_generate_summary(request: BatchSummary):
+    """
+    Summarize many texts in one request with bounded parallelism.
+    """
+    validate_batch(request.items)
+    template = summary_template(request.context)
+
+    async def summarize(item: BatchItem) -> dict:
+        generation = await generate_raw(
+            template, item.text, SUMMARY_OPTIONS,
+            priority=PRIORITY_BATCH, timeout=BATCH_TIMEOUT, task="summary"
+        )
+        summary_request = TextSummary(text=item.text, context=request.context, language=request.language)
+        return summary_result(summary_request, clean_summary(generation.text), generation)
+
+    process_item = batch_processor(summarize, "Service de résumé IA temporairement indisponible")
+    if request.stream:
+        return stream_batch(request.items, process_item)
+    return await run_batch(request.items, process_item)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Report LLM response cache and request coalescing counters."""
+    return {
+        **response_cache.stats(),
+        "single_flight": single_flight.stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Expose request, generation, cleanup and cache metrics in the Prometheus text format."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get("/models/stats")
+async def models_stats():
+    """Report the model routing policy and the warm-up state of each model."""
+    return {
+        "default_model": model_router.default_model,
+        "routes": [
+            {
+                "name": route.name,
+                "model": route.model,
+                "tasks": sorted(route.tasks),
+                "min_tokens": route.min_tokens,
+                "max_tokens": route.max_tokens
+            }
+            for route in model_router.routes
+        ],
+        "warmup": model_warmer.stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/scheduler/stats")
+async def scheduler_stats():
+    """Report generation queue depth, queue wait and service time."""
+    return {
+        **scheduler.stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -0,0 +1,358 @@
+import abc
+import time
+import bisect
+import asyncio
+import logging
+import functools
+import threading
+from typing import Callable, Dict, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default latency buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Buckets for sub-millisecond work such as response cleanup
+FAST_BUCKETS = (0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+TOKEN_RATE_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 40, 60, 80, 120, 200)
+
+# Starlette appends '; charset=utf-8' to text/* media types
+CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(abc.ABC):
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+    @abc.abstractmethod
+    def _samples(self) -> List[str]:
+        """Exposition lines for every label set, called with the lock held."""
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        return [
+            f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down per label set."""
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        return [
+            f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class _Timer:
+    """Observe elapsed time into a histogram, as a context manager or a (sync or async) decorator."""
+
+    def __init__(self, histogram: 'Histogram', labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+        self._started = 0.0
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self._started, **self.labels)
+        return False
+
+    def __call__(self, fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with _Timer(self.histogram, self.labels):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Timer(self.histogram, self.labels):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count per label set."""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts..., +Inf count], sum
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[index] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def time(self, **labels) -> _Timer:
+        self._key(labels)
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, counts in sorted(self._counts.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(self._sums[key])}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    In-process metric registry rendered in the Prometheus text format.
+
+    Collectors are callables run just before rendering, used to copy state
+    that is cheaper to read on scrape (cache and scheduler stats) into gauges.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                raise ValueError(f"Metric {metric.name} already registered with a different definition")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry shared by main.py and ai_service.py
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'http_requests_total', 'HTTP requests by endpoint, method and status code.',
+    ('endpoint', 'method', 'status')
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Time to produce the response (headers for streamed responses).',
+    ('endpoint',)
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    'http_requests_in_flight', 'HTTP requests currently being handled.', ('endpoint',)
+)
+
+OLLAMA_GENERATIONS = REGISTRY.counter(
+    'ollama_generations_total', 'Completed Ollama generate calls.', ('caller', 'model')
+)
+OLLAMA_LOAD = REGISTRY.histogram(
+    'ollama_load_duration_seconds', 'Model load time reported by Ollama.', ('caller', 'model')
+)
+OLLAMA_PROMPT_EVAL = REGISTRY.histogram(
+    'ollama_prompt_eval_duration_seconds', 'Prompt evaluation time reported by Ollama.', ('caller', 'model')
+)
+OLLAMA_EVAL = REGISTRY.histogram(
+    'ollama_eval_duration_seconds', 'Token generation time reported by Ollama.', ('caller', 'model')
+)
+OLLAMA_PROMPT_TOKENS = REGISTRY.counter(
+    'ollama_prompt_tokens_total', 'Prompt tokens evaluated by Ollama.', ('caller', 'model')
+)
+OLLAMA_EVAL_TOKENS = REGISTRY.counter(
+    'ollama_eval_tokens_total', 'Tokens generated by Ollama.', ('caller', 'model')
+)
+OLLAMA_TOKENS_PER_SECOND = REGISTRY.histogram(
+    'ollama_tokens_per_second', 'Generation speed (eval_count / eval_duration).', ('caller', 'model'),
+    buckets=TOKEN_RATE_BUCKETS
+)
+
+CLEANUP_LATENCY = REGISTRY.histogram(
+    'llm_cleanup_duration_seconds', 'Time spent cleaning a model output.', ('profile',),
+    buckets=FAST_BUCKETS
+)
+QUEUE_WAIT = REGISTRY.histogram(
+    'llm_queue_wait_seconds', 'Time generations waited for a scheduler slot.', ('priority',)
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    'llm_cache_lookups_total', 'Response cache lookups, by result.', ('cache', 'result')
+)
+CACHE_HIT_RATIO = REGISTRY.gauge(
+    'llm_cache_hit_ratio', 'Response cache hit ratio since start.', ('cache',)
+)
+CACHE_ENTRIES = REGISTRY.gauge(
+    'llm_cache_entries', 'Entries held in the in-memory response cache.', ('cache',)
+)
+IN_FLIGHT = REGISTRY.gauge(
+    'llm_in_flight', 'Generation work currently in flight, by stage.', ('stage',)
+)
+OPERATION_LATENCY = REGISTRY.histogram(
+    'ai_service_operation_duration_seconds', 'AIService operation latency.', ('operation',)
+)
+RAG_STAGE_LATENCY = REGISTRY.histogram(
+    'rag_stage_duration_seconds', 'Retrieval-augmented chat latency by stage.', ('stage',)
+)
+MONGO_POOL_CONNECTIONS = REGISTRY.gauge(
+    'mongo_pool_connections', 'MongoDB pool connections by state (open, checked_out, max).', ('state',)
+)
+MONGO_POOL_CHECKOUTS = REGISTRY.counter(
+    'mongo_pool_checkouts_total', 'MongoDB connection checkouts by result.', ('result',)
+)
+MODEL_ROUTES = REGISTRY.counter(
+    'llm_model_routes_total', 'Generations routed to each model, by task.', ('task', 'model')
+)
+MODEL_COLD_LOADS = REGISTRY.counter(
+    'llm_model_cold_loads_total', 'Generations that waited for the model to load.', ('model',)
+)
+MODEL_WARMUPS = REGISTRY.counter(
+    'llm_model_warmups_total', 'Model preload calls by result.', ('model', 'result')
+)
+EMBEDDING_LATENCY = REGISTRY.histogram(
+    'embedding_encode_duration_seconds', 'Time spent in one batched embedding encode call.'
+)
+EMBEDDING_BATCH_SIZE = REGISTRY.histogram(
+    'embedding_batch_size', 'Texts encoded per embedding call.', buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+
+_NANOSECONDS = 1e9
+
+
+def observe_ollama(response: dict, caller: str, model: str):
+    """Record the timings and token counts Ollama returns with a finished generation."""
+    OLLAMA_GENERATIONS.inc(caller=caller, model=model)
+    load = response.get('load_duration')
+    if load:
+        OLLAMA_LOAD.observe(load / _NANOSECONDS, caller=caller, model=model)
+    prompt_eval = response.get('prompt_eval_duration')
+    if prompt_eval:
+        OLLAMA_PROMPT_EVAL.observe(prompt_eval / _NANOSECONDS, caller=caller, model=model)
+    OLLAMA_PROMPT_TOKENS.inc(response.get('prompt_eval_count') or 0, caller=caller, model=model)
+
+    eval_duration = response.get('eval_duration')
+    eval_count = response.get('eval_count') or 0
+    OLLAMA_EVAL_TOKENS.inc(eval_count, caller=caller, model=model)
+    if eval_duration:
+        OLLAMA_EVAL.observe(eval_duration / _NANOSECONDS, caller=caller, model=model)
+        if eval_count:
+            OLLAMA_TOKENS_PER_SECOND.observe(eval_count / (eval_duration / _NANOSECONDS), caller=caller, model=model)
+
+
+def cache_collector(name: str, cache) -> Callable[[], None]:
+    """Collector exporting a ResponseCache's stats under `cache=name`."""
+    seen = {'hit': 0, 'miss': 0}
+    lock = threading.Lock()
+
+    def collect():
+        stats = cache.stats()
+        with lock:
+            # The cache keeps running totals; the counter gets what was added since the last scrape
+            for result, total in (('hit', stats['hits']), ('miss', stats['misses'])):
+                CACHE_LOOKUPS.inc(total - seen[result] if total >= seen[result] else total, cache=name, result=result)
+                seen[result] = total
+        CACHE_HIT_RATIO.set(stats['hit_ratio'], cache=name)
+        CACHE_ENTRIES.set(stats['entries'], cache=name)
+    return collect
@@ -0,0 +1,207 @@
+"""
+Model routing and warm-up.
+
+ModelRouter picks the model for each generation from its task and input
+size: short corrections can go to a small model, long summaries to a
+larger one, everything else to the default model. ModelWarmer preloads
+every routed model at startup and again on a schedule, with `keep_alive`
+so Ollama keeps them resident between requests.
+"""
+import os
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional
+
+from llm_provider import LLMProvider
+from metrics import MODEL_COLD_LOADS, MODEL_ROUTES, MODEL_WARMUPS
+from text_segments import count_tokens
+
+logger = logging.getLogger(__name__)
+
+_NANOSECONDS = 1e9
+
+
+@dataclass(frozen=True)
+class Route:
+    """Send `tasks` whose input is within [min_tokens, max_tokens] to `model`."""
+    name: str
+    model: str
+    tasks: FrozenSet[str]
+    min_tokens: int = 0
+    max_tokens: Optional[int] = None
+
+    def matches(self, task: str, tokens: int) -> bool:
+        return (task in self.tasks and tokens >= self.min_tokens
+                and (self.max_tokens is None or tokens <= self.max_tokens))
+
+
+@dataclass
+class RoutingDecision:
+    task: str
+    model: str
+    route: str
+    input_tokens: int
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"task": self.task, "model": self.model, "route": self.route, "input_tokens": self.input_tokens}
+
+
+class ModelRouter:
+    """First matching route wins; otherwise the default model is used."""
+
+    def __init__(self, default_model: str, routes: Optional[List[Route]] = None):
+        self.default_model = default_model
+        self.routes = routes or []
+
+    @property
+    def models(self) -> List[str]:
+        return list(dict.fromkeys([self.default_model] + [route.model for route in self.routes]))
+
+    def route(self, task: str, text: str) -> RoutingDecision:
+        tokens = count_tokens(text)
+        for route in self.routes:
+            if route.matches(task, tokens):
+                decision = RoutingDecision(task, route.model, route.name, tokens)
+                break
+        else:
+            decision = RoutingDecision(task, self.default_model, "default", tokens)
+        MODEL_ROUTES.inc(task=task, model=decision.model)
+        return decision
+
+
+def observe_load(response: Dict[str, Any], model: str, threshold_seconds: float) -> float:
+    """
+    Return the model load time reported with a generation, in ms, logging
+    and counting it as a cold load when over `threshold_seconds`.
+    """
+    load_seconds = (response.get('load_duration') or 0) / _NANOSECONDS
+    if load_seconds >= threshold_seconds:
+        MODEL_COLD_LOADS.inc(model=model)
+        logger.warning(f"Cold load of model {model}: {load_seconds:.1f}s before generating")
+    return round(load_seconds * 1000, 1)
+
+
+@dataclass
+class WarmState:
+    warm: bool = False
+    last_warmed: Optional[float] = None
+    load_ms: Optional[float] = None
+    error: Optional[str] = None
+    failures: int = 0
+
+
+class ModelWarmer:
+    """Preload `models` now and every `interval` seconds (0 disables the schedule)."""
+
+    def __init__(self, provider: LLMProvider, models: List[str], keep_alive: Optional[str],
+                 interval: float = 600.0):
+        self.provider = provider
+        self.models = models
+        self.keep_alive = keep_alive
+        self.interval = interval
+        self.state: Dict[str, WarmState] = {model: WarmState() for model in models}
+        self._task: Optional[asyncio.Task] = None
+
+    async def warm(self, model: str):
+        state = self.state.setdefault(model, WarmState())
+        started = time.perf_counter()
+        try:
+            response = await self.provider.preload(model, self.keep_alive)
+            load_seconds = (response.get('load_duration') or 0) / _NANOSECONDS
+            state.warm = True
+            state.last_warmed = time.time()
+            state.load_ms = round(load_seconds * 1000, 1)
+            state.error = None
+            MODEL_WARMUPS.inc(model=model, result="ok")
+            logger.info(f"Model {model} warm (load {state.load_ms} ms, "
+                        f"call {(time.perf_counter() - started) * 1000:.0f} ms, keep_alive {self.keep_alive})")
+        except Exception as e:
+            state.warm = False
+            state.error = str(e)
+            state.failures += 1
+            MODEL_WARMUPS.inc(model=model, result="failed")
+            logger.warning(f"Could not warm model {model}: {e}")
+
+    async def warm_all(self):
+        for model in self.models:
+            await self.warm(model)
+
+    async def _run(self):
+        while True:
+            await self.warm_all()
+            if self.interval <= 0:
+                return
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> asyncio.Task:
+        """Warm in the background so startup is not blocked by model loads."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "keep_alive": self.keep_alive,
+            "interval_seconds": self.interval,
+            "models": {
+                model: {
+                    "warm": state.warm,
+                    "last_warmed": state.last_warmed,
+                    "load_ms": state.load_ms,
+                    "failures": state.failures,
+                    "error": state.error,
+                }
+                for model, state in self.state.items()
+            },
+        }
+
+
+def _tasks(value: str) -> FrozenSet[str]:
+    return frozenset(task.strip() for task in value.split(',') if task.strip())
+
+
+def create_model_router(default_model: str) -> ModelRouter:
+    """
+    Build the routing policy from LLM_SMALL_MODEL* and LLM_LARGE_MODEL*
+    variables; without them every task uses `default_model`.
+    """
+    routes = []
+    small_model = os.getenv('LLM_SMALL_MODEL')
+    if small_model:
+        routes.append(Route(
+            name="small",
+            model=small_model,
+            tasks=_tasks(os.getenv('LLM_SMALL_MODEL_TASKS', 'correction,enhancement')),
+            max_tokens=int(os.getenv('LLM_SMALL_MODEL_MAX_TOKENS', '200')),
+        ))
+    large_model = os.getenv('LLM_LARGE_MODEL')
+    if large_model:
+        routes.append(Route(
+            name="large",
+            model=large_model,
+            tasks=_tasks(os.getenv('LLM_LARGE_MODEL_TASKS', 'summary,summary_reduce')),
+            min_tokens=int(os.getenv('LLM_LARGE_MODEL_MIN_TOKENS', '1500')),
+        ))
+    router = ModelRouter(default_model, routes)
+    logger.info(f"Model routing: default {default_model}, routes {[(r.name, r.model) for r in routes]}")
+    return router
+
+
+def create_model_warmer(provider: LLMProvider, models: List[str]) -> ModelWarmer:
+    return ModelWarmer(
+        provider,
+        models,
+        keep_alive=provider.keep_alive,
+        interval=float(os.getenv('LLM_WARMUP_INTERVAL_SECONDS', '600')),
+    )
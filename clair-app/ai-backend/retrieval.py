@@ -0,0 +1,45 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from text_segments import SENTENCE_BREAK, count_tokens
+
+
+def fit_to_budget(chunks: List[str], max_tokens: int) -> List[str]:
+    """
+    Keep chunks, in order, until `max_tokens` is reached.
+
+    The chunk that crosses the budget is cut back to its whole leading
+    sentences; nothing after it is kept, so the most relevant chunks win.
+    """
+    kept = []
+    remaining = max_tokens
+    for chunk in chunks:
+        tokens = count_tokens(chunk)
+        if tokens <= remaining:
+            kept.append(chunk)
+            remaining -= tokens
+            continue
+
+        partial = ''
+        for sentence in SENTENCE_BREAK.split(chunk):
+            if not sentence.strip():
+                continue
+            tokens = count_tokens(sentence)
+            if tokens > remaining:
+                break
+            partial = f"{partial} {sentence}" if partial else sentence
+            remaining -= tokens
+        if partial:
+            kept.append(partial)
+        break
+    return kept
+
+
+@dataclass
+class RetrievalResult:
+    """Retrieved knowledge for one question, trimmed to the prompt budget."""
+    documents: List[Dict[str, Any]] = field(default_factory=list)
+    context: List[str] = field(default_factory=list)
+    tokens: int = 0
+    cached: bool = False
+    timings: Dict[str, float] = field(default_factory=dict)
@@ -0,0 +1,226 @@
+import os
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Lower value is served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+
+class SchedulerRejected(Exception):
+    """Raised when a generation is shed instead of being served."""
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class QueueFullError(SchedulerRejected):
+    pass
+
+
+class DeadlineExceededError(SchedulerRejected):
+    pass
+
+
+class _LatencyWindow:
+    """Rolling window of recent durations (seconds)."""
+
+    def __init__(self, size: int = 512):
+        self.samples: Deque[float] = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def mean(self) -> float:
+        return sum(self.samples) / len(self.samples) if self.samples else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+
+        def pct(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(p * (len(ordered) - 1)))]
+
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 1) if self.count else 0.0,
+            "p50_ms": round(pct(0.50) * 1000, 1),
+            "p95_ms": round(pct(0.95) * 1000, 1),
+            "max_ms": round(ordered[-1] * 1000, 1) if ordered else 0.0,
+        }
+
+
+class Ticket:
+    """A granted generation slot, with its measured queue wait."""
+
+    def __init__(self, priority: int, deadline: float):
+        self.priority = priority
+        self.deadline = deadline
+        self.queue_wait = 0.0
+        self.service_time = 0.0
+        self._started = 0.0
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+
+class GenerationScheduler:
+    """
+    Admission control in front of the LLM.
+
+    At most `max_concurrency` generations run at once; the rest wait in a
+    priority queue (interactive before batch, FIFO within a priority).
+    Requests are shed with 429 (batch) or 503 (interactive) once the queue is
+    too deep, and with 503 when their deadline expires while still queued.
+    """
+
+    def __init__(self, max_concurrency: int = 2, max_queue_depth: int = 32, batch_queue_depth: Optional[int] = None):
+        self.max_concurrency = max_concurrency
+        self.max_queue_depth = max_queue_depth
+        # Batch work is shed earlier so interactive requests keep some headroom
+        self.batch_queue_depth = batch_queue_depth if batch_queue_depth is not None else max_queue_depth // 2
+        self._active = 0
+        self._queue: List[tuple] = []
+        self._sequence = itertools.count()
+        self.queue_wait = _LatencyWindow()
+        self.service_time = _LatencyWindow()
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_deadline = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def _retry_after(self) -> int:
+        # Time for the current backlog to drain, at least one second
+        backlog = (self.queue_depth + self._active) / max(1, self.max_concurrency)
+        return max(1, int(round(backlog * self.service_time.mean())))
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE, timeout: float = 60.0) -> Ticket:
+        """Wait for a generation slot; raise SchedulerRejected when shed."""
+        ticket = Ticket(priority, time.monotonic() + timeout)
+        enqueued = time.monotonic()
+
+        if self._active < self.max_concurrency and not self._queue:
+            self._active += 1
+        else:
+            limit = self.batch_queue_depth if priority >= PRIORITY_BATCH else self.max_queue_depth
+            if self.queue_depth >= limit:
+                self.rejected_queue_full += 1
+                raise QueueFullError(
+                    "Generation queue is full",
+                    status_code=429 if priority >= PRIORITY_BATCH else 503,
+                    retry_after=self._retry_after()
+                )
+
+            waiter = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._queue, (priority, next(self._sequence), waiter))
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), timeout=ticket.remaining())
+            except asyncio.TimeoutError:
+                if not waiter.done():
+                    waiter.cancel()
+                    self._drop_cancelled()
+                    self.rejected_deadline += 1
+                    raise DeadlineExceededError(
+                        "Deadline exceeded while queued",
+                        status_code=503,
+                        retry_after=self._retry_after()
+                    )
+                # The slot was handed over just as the deadline expired; keep it
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._release_slot()
+                else:
+                    waiter.cancel()
+                    self._drop_cancelled()
+                raise
+
+        ticket.queue_wait = time.monotonic() - enqueued
+        ticket._started = time.monotonic()
+        self.queue_wait.add(ticket.queue_wait)
+        self.admitted += 1
+        return ticket
+
+    def release(self, ticket: Ticket):
+        """Return a slot to the scheduler and record the service time."""
+        ticket.service_time = time.monotonic() - ticket._started
+        self.service_time.add(ticket.service_time)
+        self._release_slot()
+
+    def _release_slot(self):
+        # Hand the slot directly to the next live waiter, if any
+        while self._queue:
+            _, _, waiter = heapq.heappop(self._queue)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def _drop_cancelled(self):
+        self._queue = [entry for entry in self._queue if not entry[2].done()]
+        heapq.heapify(self._queue)
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_INTERACTIVE, timeout: float = 60.0):
+        """Hold a generation slot for the duration of the block."""
+        ticket = await self.acquire(priority, timeout)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    async def run(self, fn: Callable[[], Awaitable[Any]], priority: int = PRIORITY_INTERACTIVE,
+                  timeout: float = 60.0) -> tuple:
+        """Run `fn` in a slot, bounded by the request deadline; return (result, ticket)."""
+        async with self.slot(priority, timeout) as ticket:
+            try:
+                result = await asyncio.wait_for(fn(), timeout=ticket.remaining())
+            except asyncio.TimeoutError:
+                self.rejected_deadline += 1
+                raise DeadlineExceededError(
+                    "Deadline exceeded during generation",
+                    status_code=503,
+                    retry_after=self._retry_after()
+                ) from None
+        return result, ticket
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue_depth": self.max_queue_depth,
+            "batch_queue_depth": self.batch_queue_depth,
+            "active": self._active,
+            "queue_depth": self.queue_depth,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_deadline": self.rejected_deadline,
+            "queue_wait": self.queue_wait.summary(),
+            "service_time": self.service_time.summary(),
+        }
+
+
+def create_scheduler() -> GenerationScheduler:
+    """Build a GenerationScheduler from SCHEDULER_* environment variables."""
+    batch_depth = os.getenv('SCHEDULER_BATCH_QUEUE_DEPTH')
+    return GenerationScheduler(
+        max_concurrency=int(os.getenv('SCHEDULER_MAX_CONCURRENCY', '2')),
+        max_queue_depth=int(os.getenv('SCHEDULER_MAX_QUEUE_DEPTH', '32')),
+        batch_queue_depth=int(batch_depth) if batch_depth else None,
+    )
@@ -0,0 +1,261 @@
+import os
+import re
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DICTIONARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dictionaries', 'fr_soins.txt')
+
+# Abbreviations whose period does not end a sentence ("p. ex. le", "env. trois")
+ABBREVIATIONS = (
+    'p', 'ex', 'env', 'approx', 'etc', 'cf', 'vs', 'c.-à-d', 'd', 'min', 'max', 'sec', 'hr', 'tél', 'no',
+    'm', 'mme', 'mlle', 'dr', 'dre', 'st', 'ste', 'inf', 'préc', 'suiv',
+)
+_NOT_AFTER_ABBREVIATION = ''.join(rf'(?<!\b(?i:{re.escape(a)})\.[ \n])' for a in ABBREVIATIONS)
+
+# (type, message, pattern, case_sensitive)
+FRENCH_RULES: List[Tuple[str, str, str, bool]] = [
+    ('grammar', 'Peut-être vouliez-vous dire "ça va" ?', r'\b(?:ca|sa)\s+va\b', False),
+    ('grammar', 'Accent manquant: "à cause de"', r'\ba\s+cause\s+d', False),
+    ('grammar', 'Préférer "bien que" (suivi du subjonctif)', r'\bmalgré\s+que\b', False),
+    ('grammar', '"Pallier" est transitif direct: "pallier quelque chose"', r'\bpallier\s+(?:à|aux)\b', False),
+    ('style', 'Pléonasme: préférer "aujourd\'hui"', r'\bau\s+jour\s+d\'aujourd\'hui\b', False),
+    ('spelling', 'Orthographe: "parmi" (sans s)', r'\bparmis\b', False),
+    ('spelling', 'Orthographe: "quand même" (avec accent)', r'\bquand\s+meme\b', False),
+    ('spelling', 'Orthographe: "bien sûr" (en deux mots avec accent)', r'\bbiensur\b', False),
+    ('spelling', 'Orthographe: "sûrement"', r'\bsurement\b', False),
+    ('spelling', 'Orthographe: "déjà"', r'\bd[eé]j[aà]\b(?<!déjà)', False),
+    ('spelling', 'Orthographe: "peut-être"', r'\bpeut[ -]?etre\b', False),
+    ('spelling', 'Orthographe: "après"', r'\bapres\b', False),
+    ('spelling', 'Orthographe: "très"', r'\btres\b', False),
+    ('spelling', 'Orthographe: "hôpital"', r'\bhopital\b', False),
+    ('spelling', 'Orthographe: "diarrhée"', r'\bdiar+h?[eé]e?s?\b(?<!diarrhée)(?<!diarrhées)', False),
+    ('spelling', 'Orthographe: "comportement"', r'\bcomportment\b', False),
+]
+
+COMMON_RULES: List[Tuple[str, str, str, bool]] = [
+    ('style', 'Espaces multiples détectés', r'(?<=\S) {2,}(?=\S)', True),
+    ('style', 'Majuscule manquante après un point', rf'(?<=[.!?][ \n]){_NOT_AFTER_ABBREVIATION}[a-zà-ÿ]', True),
+    ('style', 'Espace superflue avant la ponctuation', r'(?<=\w) +[,.](?!\d)', True),
+    ('style', 'Espaces en fin de ligne', r'[ \t]+(?=\n|$)', True),
+]
+
+# Clinical vocabulary and abbreviations that must never be flagged as unknown words
+MEDICAL_TERMS = {
+    'bristol', 'tsa', 'di', 'ditsa', 'di-tsa', 'prn', 'tdah', 'ta', 'fc', 'fr', 'spo2', 'glycémie',
+    'acétaminophène', 'ibuprofène', 'lorazépam', 'rispéridone', 'quétiapine', 'méthylphénidate',
+    'mélatonine', 'lactulose', 'sennosides', 'polyéthylène', 'glycol', 'laxatif', 'laxatifs',
+    'hydratation', 'constipation', 'diarrhée', 'selles', 'miction', 'mictions', 'énurésie', 'encoprésie',
+    'épilepsie', 'convulsion', 'convulsions', 'dysphagie', 'automutilation', 'stéréotypies', 'écholalie',
+    'pictogramme', 'pictogrammes', 'psychoéducateur', 'psychoéducatrice', 'ergothérapeute', 'inhalothérapeute',
+    'infirmière', 'infirmier', 'préposé', 'préposée', 'usager', 'usagère', 'ciusss', 'chsld', 'rpa', 'ri', 'rti',
+}
+
+_LETTERS = "A-Za-zÀ-ÖØ-öø-ÿœŒæÆ"
+WORD_PATTERN = re.compile(rf"[{_LETTERS}]+(?:['’-][{_LETTERS}]+)*")
+
+# Elided articles and pronouns (l'usager, qu'il, d'eau...)
+ELISIONS = ('l', 'd', 'j', 'm', 'n', 's', 't', 'c', 'qu', 'jusqu', 'lorsqu', 'puisqu')
+
+
+class Dawg:
+    """
+    Minimal acyclic word automaton (DAWG) built from a sorted word list.
+
+    Uses Daciuk's incremental construction, so common prefixes and suffixes
+    share nodes; lookups walk one edge per character.
+    """
+
+    def __init__(self):
+        self._edges: List[Dict[str, int]] = [{}]
+        self._final: List[bool] = [False]
+        self._register: Dict[tuple, int] = {}
+        self._unchecked: List[Tuple[int, str, int]] = []
+        self._previous = ''
+        self.word_count = 0
+
+    def __len__(self) -> int:
+        return self.word_count
+
+    @property
+    def node_count(self) -> int:
+        return len(self._edges)
+
+    def _new_node(self) -> int:
+        self._edges.append({})
+        self._final.append(False)
+        return len(self._edges) - 1
+
+    def _minimize(self, down_to: int):
+        while len(self._unchecked) > down_to:
+            parent, char, child = self._unchecked.pop()
+            signature = (self._final[child], tuple(sorted(self._edges[child].items())))
+            existing = self._register.get(signature)
+            if existing is not None:
+                self._edges[parent][char] = existing
+            else:
+                self._register[signature] = child
+
+    def insert(self, word: str):
+        """Insert a word; words must arrive in sorted order."""
+        if word <= self._previous and self.word_count:
+            if word == self._previous:
+                return
+            raise ValueError("Words must be inserted in sorted order")
+
+        common = 0
+        for a, b in zip(word, self._previous):
+            if a != b:
+                break
+            common += 1
+        self._minimize(common)
+
+        node = self._unchecked[-1][2] if self._unchecked else 0
+        for char in word[common:]:
+            child = self._new_node()
+            self._edges[node][char] = child
+            self._unchecked.append((node, char, child))
+            node = child
+        self._final[node] = True
+        self._previous = word
+        self.word_count += 1
+
+    def finish(self):
+        self._minimize(0)
+        self._register.clear()
+
+    def __contains__(self, word: str) -> bool:
+        node = 0
+        for char in word:
+            node = self._edges[node].get(char)
+            if node is None:
+                return False
+        return self._final[node]
+
+    @classmethod
+    def from_words(cls, words: Iterable[str]) -> "Dawg":
+        dawg = cls()
+        for word in sorted(set(words)):
+            dawg.insert(word)
+        dawg.finish()
+        return dawg
+
+
+def _compile_rules(rules: List[Tuple[str, str, str, bool]]) -> Tuple[re.Pattern, Dict[str, Tuple[str, str]]]:
+    """Compile rules into a single alternation; returns the pattern and group -> (type, message)."""
+    parts = []
+    lookup = {}
+    for index, (error_type, message, pattern, case_sensitive) in enumerate(rules):
+        group = f"r{index}"
+        body = pattern if case_sensitive else f"(?i:{pattern})"
+        parts.append(f"(?P<{group}>{body})")
+        lookup[group] = (error_type, message)
+    return re.compile('|'.join(parts), re.MULTILINE), lookup
+
+
+class TextAnalyzer:
+    """
+    Fast, LLM-free French text analysis for real-time editor underlines.
+
+    All rules are precompiled into one regular expression per language and
+    unknown words are looked up in a DAWG dictionary. Spelling of unknown
+    words is only checked when a dictionary has been loaded.
+    """
+
+    def __init__(self, dictionary: Optional[Dawg] = None, max_errors: int = 25):
+        self.dictionary = dictionary
+        self.max_errors = max_errors
+        self._rules = {
+            'french': _compile_rules(FRENCH_RULES + COMMON_RULES),
+            'default': _compile_rules(COMMON_RULES),
+        }
+
+    def _listed(self, word: str) -> bool:
+        if word in MEDICAL_TERMS or word in self.dictionary:
+            return True
+        # Lexicons often spell the ligatures out (soeur, oedème)
+        spelled_out = word.replace('œ', 'oe').replace('æ', 'ae')
+        if spelled_out != word and spelled_out in self.dictionary:
+            return True
+        # Plural of a listed word (nuits, professionnels, fécalomes)
+        if len(word) > 3 and word[-1] in 'sx':
+            stem = word[:-1]
+            return stem in MEDICAL_TERMS or stem in self.dictionary
+        return False
+
+    def _unknown_span(self, word: str) -> Optional[Tuple[int, int]]:
+        """Offsets within `word` (lowercase) of the part to flag, or None when the word is known."""
+        if self._listed(word):
+            return None
+        head, apostrophe, rest = word.partition("'")
+        if apostrophe and head in ELISIONS and rest:
+            span = self._unknown_span(rest)
+            return None if span is None else (span[0] + len(head) + 1, span[1] + len(head) + 1)
+        if '-' in word and all(self._listed(part) for part in word.split('-') if part):
+            return None
+        return (0, len(word))
+
+    def analyze(self, text: str, language: str = 'french') -> List[Dict[str, Any]]:
+        """Return errors as {type, message, start, end}, ordered by position."""
+        pattern, lookup = self._rules.get(language, self._rules['default'])
+        errors = []
+        flagged = set()
+
+        for match in pattern.finditer(text):
+            error_type, message = lookup[match.lastgroup]
+            start, end = match.span()
+            errors.append({"type": error_type, "message": message, "start": start, "end": end})
+            flagged.update(range(start, end))
+
+        if self.dictionary is not None and language == 'french':
+            for match in WORD_PATTERN.finditer(text):
+                word = match.group()
+                if len(word) <= 2 or word.isupper() or match.start() in flagged:
+                    continue
+                # Capitalized inside a sentence: a name (usager, staff, place)
+                if word[0].isupper() and text[:match.start()].rstrip()[-1:] not in ('', '.', '!', '?', ':'):
+                    continue
+                span = self._unknown_span(word.lower().replace('’', "'"))
+                if span is None:
+                    continue
+                # Underline the unknown word itself, not an elided article before it
+                start, end = match.start() + span[0], match.start() + span[1]
+                errors.append({
+                    "type": "spelling",
+                    "message": f'Mot inconnu: "{text[start:end]}"',
+                    "start": start,
+                    "end": end
+                })
+
+        errors.sort(key=lambda e: e["start"])
+        return errors[:self.max_errors]
+
+
+def load_dictionary(path: str) -> Optional[Dawg]:
+    """Load a one-word-per-line dictionary file into a DAWG."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            words = (line.strip().lower() for line in f)
+            dawg = Dawg.from_words(word for word in words if word and not word.startswith('#'))
+        logger.info(f"Loaded {len(dawg)} dictionary words into {dawg.node_count} DAWG nodes from {path}")
+        return dawg
+    except Exception as e:
+        logger.warning(f"Could not load analyzer dictionary {path}: {e}")
+        return None
+
+
+def create_text_analyzer() -> TextAnalyzer:
+    """
+    Build a TextAnalyzer from ANALYZER_* environment variables.
+
+    ANALYZER_DICTIONARY_PATH is a one-word-per-line list for the unknown-word
+    check, by default dictionaries/fr_soins.txt (a full-form French lexicon
+    plus care vocabulary, see dictionaries/build_dictionary.py); set it
+    empty to turn the check off.
+    """
+    path = os.getenv('ANALYZER_DICTIONARY_PATH', DEFAULT_DICTIONARY_PATH)
+    return TextAnalyzer(
+        dictionary=load_dictionary(path) if path else None,
+        max_errors=int(os.getenv('ANALYZER_MAX_ERRORS', '25')),
+    )
@@ -0,0 +1,210 @@
+import re
+import logging
+from typing import Dict, Optional, Sequence
+
+from metrics import CLEANUP_LATENCY
+
+logger = logging.getLogger(__name__)
+
+# Preambles the model puts before a colon or on a line of their own
+CORRECTION_PREFIXES = [
+    'voici le texte corrigé', 'voilà le texte corrigé', 'le texte corrigé', 'texte corrigé',
+    'voici la correction', 'voilà la correction', 'correction', 'après correction',
+    'voici le texte', 'voilà le texte', 'le résultat', 'résultat'
+]
+
+# Preambles the model tends to add before a rewritten passage
+ENHANCEMENT_PREFIXES = CORRECTION_PREFIXES + [
+    'texte amélioré', 'le texte amélioré', 'version améliorée', 'voici la version améliorée',
+    'texte réécrit', 'voici le texte réécrit'
+]
+
+# Preambles the model tends to add before a summary
+SUMMARY_PREFIXES = [
+    'le résumé', 'résumé', 'voici le résumé', 'voilà le résumé', 'voici un résumé', 'résultat',
+    'voici la synthèse', 'synthèse', 'ce résumé', 'le patient', 'dans le contexte'
+]
+
+# Lead-in words, dropped when followed by a comma or when they open a line with no sentence in it
+LEAD_INS = ['voici', 'voilà']
+SUMMARY_LEAD_INS = LEAD_INS + ['en résumé', 'pour résumer', 'en bref']
+
+# Entire prefatory sentences to drop from summaries
+SUMMARY_SENTENCES = [
+    'ce résumé est pertinent pour les soins de santé',
+    'ce résumé est approprié pour',
+    'dans le contexte des soins de santé',
+    'pour les résidences di-tsa'
+]
+
+# Closing remarks the model sometimes appends after the answer
+TRAILERS = [
+    "n'hésitez pas", "j'espère que", 'si vous avez besoin', 'si vous souhaitez',
+    'souhaitez-vous', 'voulez-vous que'
+]
+
+QUOTES: Dict[str, str] = {'"': '"', "'": "'", '«': '»', '“': '”'}
+
+# Maximum number of characters held back while deciding whether a preamble is present
+MAX_HOLDBACK = 160
+
+# Closing remarks are looked for in this many trailing characters only
+TRAILER_WINDOW = 300
+
+
+def _alternation(phrases: Sequence[str]) -> str:
+    # Longest first, so 'résumé' can never shadow 'résumé de la journée'
+    return '|'.join(re.escape(p) for p in sorted(set(phrases), key=len, reverse=True))
+
+
+class CleanupProfile:
+    """
+    Precompiled response cleanup for one endpoint.
+
+    Everything that may precede the answer (prefatory sentences, a preamble
+    ending in a colon or a line break, lead-ins, colons and whitespace, in
+    any order) is consumed by one anchored regular expression, and closing
+    remarks by one expression anchored at the end. Both run in a single pass
+    over the text and their result does not depend on the order of the lists.
+    """
+
+    def __init__(self, prefixes: Sequence[str], lead_ins: Sequence[str] = (),
+                 sentences: Sequence[str] = (), trailers: Sequence[str] = ()):
+        self.prefixes = list(prefixes)
+        self.lead_ins = list(lead_ins)
+        self.sentences = list(sentences)
+        self.trailers = list(trailers)
+
+        # Markdown emphasis or heading markers the model wraps preambles in
+        mark, close = r'[#*_]*[ \t]*', r'[ \t]*[*_]*'
+        head = [r'\s+', ':']
+        if self.sentences:
+            head.append(rf'[^.\n]*?(?:{_alternation(self.sentences)})[^.\n]*(?:[.\n]|\Z)')
+        if self.prefixes:
+            prefix = _alternation(self.prefixes)
+            # 'Résumé :' anywhere, 'Résumé de la journée :' only when the colon ends the line,
+            # so that 'Résultat de la glycémie : 5,4' is kept
+            head.append(rf'{mark}(?:{prefix}){close}(?::{close}|\n|\Z)')
+            head.append(rf'{mark}(?:{prefix})\b[^\n:.]{{0,80}}:{close}(?=\n|\Z)')
+        if self.lead_ins:
+            lead_in = _alternation(self.lead_ins)
+            head.append(rf'{mark}(?:{lead_in})\b[^\n:.]{{0,80}}(?::{close}|\n|\Z)')
+            head.append(rf'(?:{lead_in})[ \t]*,')
+        self._head = re.compile(rf'(?:{"|".join(head)})*', re.IGNORECASE)
+
+        self._tail = None
+        if self.trailers:
+            self._tail = re.compile(
+                rf'(?:(?<=[.!?])[ \t]+|\n\s*)(?:{_alternation(self.trailers)})[^\n]*\s*\Z',
+                re.IGNORECASE
+            )
+
+        self._starts = tuple(p.lower() for p in self.prefixes + self.lead_ins)
+
+    def strip_head(self, text: str) -> str:
+        return text[self._head.match(text).end():]
+
+    def strip_tail(self, text: str) -> str:
+        if self._tail is None:
+            return text
+        match = self._tail.search(text, max(0, len(text) - TRAILER_WINDOW))
+        return text[:match.start()] if match else text
+
+    def head_pending(self, text: str) -> bool:
+        """True while more output could still change what strip_head removes."""
+        rest = self.strip_head(text).lower().lstrip('#*_ \t')
+        if not rest:
+            return True
+        if self.sentences and '.' not in rest and '\n' not in rest:
+            return True
+        for start in self._starts:
+            if len(rest) < len(start) and start.startswith(rest):
+                return True
+            if rest.startswith(start) and not any(c in rest for c in '\n:.,'):
+                return True
+        return False
+
+    def clean(self, text: str) -> str:
+        """Strip preambles, prefatory sentences, closing remarks, wrapping quotes and leading colons."""
+        text = self.strip_tail(self.strip_head(text.strip())).strip()
+
+        close = QUOTES.get(text[:1])
+        if close and len(text) > 1 and text.endswith(close):
+            text = text[1:-1].strip()
+
+        return text.lstrip(':').strip()
+
+
+CORRECTION_CLEANUP = CleanupProfile(CORRECTION_PREFIXES, LEAD_INS, trailers=TRAILERS)
+ENHANCEMENT_CLEANUP = CleanupProfile(ENHANCEMENT_PREFIXES, LEAD_INS, trailers=TRAILERS)
+SUMMARY_CLEANUP = CleanupProfile(SUMMARY_PREFIXES, SUMMARY_LEAD_INS, SUMMARY_SENTENCES, TRAILERS)
+
+
+@CLEANUP_LATENCY.time(profile='correction')
+def clean_correction(text: str) -> str:
+    """Clean a raw /correct-text model output."""
+    return CORRECTION_CLEANUP.clean(text)
+
+
+@CLEANUP_LATENCY.time(profile='enhancement')
+def clean_enhancement(text: str) -> str:
+    """Clean a raw /enhance-text model output."""
+    return ENHANCEMENT_CLEANUP.clean(text)
+
+
+@CLEANUP_LATENCY.time(profile='summary')
+def clean_summary(text: str) -> str:
+    """Clean a raw /generate-summary model output."""
+    return SUMMARY_CLEANUP.clean(text)
+
+
+class StreamingCleaner:
+    """
+    Incremental version of CleanupProfile.clean for token streams.
+
+    Only the head of the stream is held back until it is clear whether a
+    preamble is present; afterwards tokens pass straight through, except for
+    trailing whitespace and quotes which are kept until the stream ends.
+    The streamed text is a preview: the final cleaned text is still computed
+    with CleanupProfile.clean on the complete output.
+    """
+
+    def __init__(self, profile: CleanupProfile):
+        self.profile = profile
+        self._head = ''
+        self._head_done = False
+        self._tail = ''
+        self._quote: Optional[str] = None
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk of model output and return the text safe to emit."""
+        if not self._head_done:
+            self._head += chunk
+            if len(self._head) < MAX_HOLDBACK and self.profile.head_pending(self._head):
+                return ''
+            chunk = self._resolve_head()
+        return self._release(chunk)
+
+    def flush(self) -> str:
+        """Return whatever is still held back once the stream is complete."""
+        text = '' if self._head_done else self._resolve_head()
+        text = (self._tail + text).rstrip()
+        self._tail = ''
+        if self._quote and text.endswith(self._quote):
+            text = text[:-1].rstrip()
+        return text
+
+    def _release(self, chunk: str) -> str:
+        text = self._tail + chunk
+        keep = len(text.rstrip(' \t\r\n' + ''.join(QUOTES.values())))
+        self._tail = text[keep:]
+        return text[:keep]
+
+    def _resolve_head(self) -> str:
+        text = self.profile.strip_head(self._head)
+        self._head = ''
+        self._head_done = True
+        if text[:1] in QUOTES:
+            self._quote = QUOTES[text[0]]
+            text = text[1:].lstrip()
+        return text.lstrip(':').lstrip()
@@ -0,0 +1,102 @@
+import re
+from typing import List, NamedTuple
+
+PARAGRAPH_BREAK = re.compile(r'(\n[ \t]*\n\s*)')
+SENTENCE_BREAK = re.compile(r'(?<=[.!?…])(\s+)')
+
+# Words and punctuation marks; long words count as several subword tokens
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+CHARS_PER_SUBWORD = 6
+# Rough characters per token, to pre-split text before counting
+CHARS_PER_TOKEN = 4
+
+
+def count_tokens(text: str) -> int:
+    """
+    Fast token estimate for prompt budgeting.
+
+    Close to what subword tokenizers produce for French prose (one token per
+    short word or punctuation mark, more for long words) at a fraction of
+    the cost of running a real tokenizer.
+    """
+    return sum(1 + (len(token) - 1) // CHARS_PER_SUBWORD for token in TOKEN_PATTERN.findall(text))
+
+
+class Segment(NamedTuple):
+    """A piece of text to process on its own, with the whitespace around it."""
+    leading: str
+    content: str
+    trailing: str
+
+
+def _split_whitespace(piece: str) -> Segment:
+    stripped = piece.strip()
+    if not stripped:
+        return Segment(piece, '', '')
+    start = piece.index(stripped)
+    return Segment(piece[:start], stripped, piece[start + len(stripped):])
+
+
+def _group_sentences(paragraph: str, max_chars: int) -> List[str]:
+    """Split an oversized paragraph into runs of whole sentences of at most `max_chars`."""
+    parts = SENTENCE_BREAK.split(paragraph)
+    groups = []
+    current = ''
+    # parts alternates sentence, whitespace, sentence, ...
+    for i in range(0, len(parts), 2):
+        sentence = parts[i] + (parts[i + 1] if i + 1 < len(parts) else '')
+        if current and len(current) + len(sentence) > max_chars:
+            groups.append(current)
+            current = ''
+        current += sentence
+    if current:
+        groups.append(current)
+    return groups
+
+
+def split_segments(text: str, max_chars: int = 600) -> List[Segment]:
+    """
+    Split text into paragraph segments, breaking long paragraphs on sentence
+    boundaries. Joining every segment's leading + content + trailing gives
+    back the original text exactly.
+    """
+    segments = []
+    pieces = PARAGRAPH_BREAK.split(text)
+    for i in range(0, len(pieces), 2):
+        paragraph = pieces[i] + (pieces[i + 1] if i + 1 < len(pieces) else '')
+        if len(paragraph.strip()) <= max_chars:
+            segments.append(_split_whitespace(paragraph))
+        else:
+            segments.extend(_split_whitespace(group) for group in _group_sentences(paragraph, max_chars))
+    return [segment for segment in segments if segment.leading or segment.content or segment.trailing]
+
+
+def join_segments(segments: List[Segment], contents: List[str]) -> str:
+    """Reassemble segments, replacing each segment's content."""
+    return ''.join(
+        segment.leading + content + segment.trailing
+        for segment, content in zip(segments, contents)
+    )
+
+
+def pack_segments(text: str, max_tokens: int) -> List[str]:
+    """
+    Group paragraphs (sentence runs for oversized ones) into chunks of at
+    most about `max_tokens`, in order. Packing is greedy from the start, so
+    appending text leaves every chunk but the last unchanged.
+    """
+    chunks = []
+    current: List[str] = []
+    current_tokens = 0
+    for segment in split_segments(text, max_tokens * CHARS_PER_TOKEN):
+        if not segment.content:
+            continue
+        tokens = count_tokens(segment.content)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append('\n\n'.join(current))
+            current, current_tokens = [], 0
+        current.append(segment.content)
+        current_tokens += tokens
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks
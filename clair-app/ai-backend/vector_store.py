@@ -1,18 +1,185 @@
 import os
+import json
+import time
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
-import chromadb
-from chromadb.config import Settings
+from typing import AsyncIterator, List, Dict, Any, Optional
 import uuid
+from collections import OrderedDict
 from datetime import datetime
+from urllib.parse import urlparse
+
+from embeddings import EmbeddingService, create_embedding_service
+from lexical_index import LexicalIndex, analyze
+from llm_cache import normalize_text
 
 logger = logging.getLogger(__name__)
 
+COUNTS_FILE = 'document_type_counts.json'
+LEXICAL_INDEX_FILE = 'lexical_index.db'
+
+COLLECTION_NAME = "irielle_documents"
+COLLECTION_METADATA = {"description": "Healthcare documents and knowledge base"}
+
+SEARCH_MODES = ('hybrid', 'vector', 'lexical')
+# Hybrid queries of at most this many terms, all present in the index, skip the embedding
+LEXICAL_FAST_PATH_TERMS = int(os.getenv('LEXICAL_FAST_PATH_TERMS', '3'))
+
+# Seeded into an empty collection under content-hash IDs, so concurrent starters converge on one copy
+DEFAULT_KNOWLEDGE = [
+    {
+        "content": "L'échelle de Bristol classe les selles en 7 types: Type 1-2 indique constipation, Type 3-4 est normal, Type 5-7 indique diarrhée. Surveiller les changements de pattern.",
+        "document_type": "protocol",
+        "metadata": {"topic": "bristol_scale", "language": "fr"}
+    },
+    {
+        "content": "Pour les personnes avec TSA, maintenir une routine prévisible est essentiel. Les changements doivent être introduits graduellement avec préparation.",
+        "document_type": "guideline",
+        "metadata": {"topic": "autism_care", "language": "fr"}
+    },
+    {
+        "content": "La déficience intellectuelle nécessite une communication adaptée: phrases simples, temps de réponse, supports visuels, et patience.",
+        "document_type": "guideline",
+        "metadata": {"topic": "intellectual_disability", "language": "fr"}
+    },
+    {
+        "content": "Signes d'urgence médicale: changement soudain de comportement, fièvre élevée, difficultés respiratoires, perte de conscience. Contacter immédiatement les services médicaux.",
+        "document_type": "emergency_protocol",
+        "metadata": {"topic": "emergency", "language": "fr"}
+    },
+    {
+        "content": "L'hydratation est cruciale: surveiller la couleur des urines, encourager la consommation d'eau, adapter selon la température et l'activité.",
+        "document_type": "health_guideline",
+        "metadata": {"topic": "hydration", "language": "fr"}
+    }
+]
+
+
+def create_chroma_client(persist_directory: str):
+    """
+    Chroma client selected by CHROMA_URL.
+
+    With CHROMA_URL (e.g. http://chromadb:8000) documents live in the Chroma
+    server and every worker and replica shares them over pooled HTTP
+    connections (CHROMA_HTTP_MAX_CONNECTIONS, CHROMA_AUTH_TOKEN). Without it,
+    an embedded PersistentClient writes to `persist_directory`, which only
+    one process may open.
+    """
+    # Imported here so the BM25 path and the benchmarks run without chromadb
+    import chromadb
+    from chromadb.config import Settings
+
+    settings = {"anonymized_telemetry": False, "allow_reset": True}
+    url = os.getenv('CHROMA_URL')
+    if not url:
+        if int(os.getenv('WEB_CONCURRENCY', '1')) > 1:
+            logger.warning("Several workers share an embedded Chroma store; set CHROMA_URL to use the Chroma server")
+        return chromadb.PersistentClient(path=persist_directory, settings=Settings(**settings))
+
+    # Connection pool limits, on Chroma versions whose HTTP client supports them
+    fields = getattr(Settings, 'model_fields', None) or getattr(Settings, '__fields__', {})
+    if 'chroma_http_max_connections' in fields:
+        max_connections = int(os.getenv('CHROMA_HTTP_MAX_CONNECTIONS', '32'))
+        settings["chroma_http_max_connections"] = max_connections
+        settings["chroma_http_max_keepalive_connections"] = max_connections
+    token = os.getenv('CHROMA_AUTH_TOKEN')
+    parsed = urlparse(url if '://' in url else f'http://{url}')
+    ssl = parsed.scheme == 'https'
+    logger.info(f"Using the Chroma server at {parsed.hostname}:{parsed.port or (443 if ssl else 8000)}")
+    return chromadb.HttpClient(
+        host=parsed.hostname,
+        port=parsed.port or (443 if ssl else 8000),
+        ssl=ssl,
+        headers={"Authorization": f"Bearer {token}"} if token else None,
+        settings=Settings(**settings)
+    )
+
+
+class DocumentTypeCounts:
+    """
+    Per-document-type counts kept up to date by VectorStore writes and
+    saved as JSON next to the Chroma files, so stats never scan the
+    collection. A missing or stale file is rebuilt with one paginated scan.
+    With no `path` the counts are only kept in memory.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.counts: Dict[str, int] = {}
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def load(self) -> bool:
+        if self.path is None:
+            return False
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.counts = {key: int(value) for key, value in json.load(f).items()}
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable document counts {self.path}: {e}")
+            return False
+
+    def save(self):
+        if self.path is None:
+            return
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.counts, f, ensure_ascii=False, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Failed to save document counts {self.path}: {e}")
+
+    def apply(self, added: List[str] = (), removed: List[str] = ()):
+        for doc_type in added:
+            self.counts[doc_type] = self.counts.get(doc_type, 0) + 1
+        for doc_type in removed:
+            remaining = self.counts.get(doc_type, 0) - 1
+            if remaining > 0:
+                self.counts[doc_type] = remaining
+            else:
+                self.counts.pop(doc_type, None)
+        self.save()
+
+    def reset(self, counts: Optional[Dict[str, int]] = None):
+        self.counts = dict(counts or {})
+        self.save()
+
+
 class VectorStore:
-    def __init__(self):
+    def __init__(self, embeddings: Optional[EmbeddingService] = None):
+        self.embeddings = embeddings or create_embedding_service()
         self.client = None
         self.collection = None
+        self.persist_directory = "./chroma_db"
+        # With a Chroma server, other processes write too: the type counts and
+        # lexical index are kept in memory and rebuilt when the collection
+        # changes elsewhere (checked at most every index_refresh_interval seconds)
+        self.remote = bool(os.getenv('CHROMA_URL'))
+        self.type_counts = DocumentTypeCounts(
+            None if self.remote else os.path.join(self.persist_directory, COUNTS_FILE)
+        )
+        self.lexical = LexicalIndex()
+        self.index_refresh_interval = float(os.getenv('VECTOR_INDEX_REFRESH_SECONDS', '30'))
+        self._generation: Optional[str] = None
+        self._refreshed_at = 0.0
+        self._refresh_lock = asyncio.Lock()
+        self.search_mode = os.getenv('VECTOR_SEARCH_MODE', 'hybrid').lower()
+        # Weight of the vector similarity in hybrid scores; the rest goes to BM25
+        self.hybrid_alpha = float(os.getenv('HYBRID_SEARCH_ALPHA', '0.5'))
         self._ready = False
+        # query -> results, dropped whenever this store changes the collection
+        self.search_cache_size = int(os.getenv('VECTOR_SEARCH_CACHE_SIZE', '512'))
+        self._search_cache: "OrderedDict[tuple, List[Dict[str, Any]]]" = OrderedDict()
+        self.search_cache_hits = 0
+        self.search_cache_misses = 0
+        self.version = 0
 
     async def initialize(self):
         """Initialize ChromaDB vector store."""
@@ -20,19 +187,24 @@ class VectorStore:
             logger.info("Initializing ChromaDB vector store...")
             
             # Initialize ChromaDB client
-            self.client = chromadb.PersistentClient(
-                path="./chroma_db",
-                settings=Settings(
-                    anonymized_telemetry=False,
-                    allow_reset=True
-                )
-            )
+            self.client = await asyncio.to_thread(create_chroma_client, self.persist_directory)
             
-            # Get or create collection
-            self.collection = self.client.get_or_create_collection(
-                name="irielle_documents",
-                metadata={"description": "Healthcare documents and knowledge base"}
+            # Get or create collection; vectors come from self.embeddings, not Chroma's embedder
+            self.collection = await asyncio.to_thread(
+                self.client.get_or_create_collection,
+                name=COLLECTION_NAME,
+                metadata=COLLECTION_METADATA,
+                embedding_function=None
             )
+
+            # Start loading the embedding model; requests wait for it on first use
+            self.embeddings.start_warmup()
+
+            if not self.remote:
+                self.lexical = LexicalIndex(os.path.join(self.persist_directory, LEXICAL_INDEX_FILE))
+            self._generation = self._generation_of(self.collection)
+            self._refreshed_at = time.monotonic()
+            await self._sync_local_indexes()
             
             # Initialize with some default healthcare knowledge
             await self._initialize_default_knowledge()
@@ -47,56 +219,155 @@ class VectorStore:
     def is_ready(self) -> bool:
         return self._ready
 
+    async def _collection_changed(self, publish: bool = True):
+        self.version += 1
+        self._search_cache.clear()
+        if publish and self.remote:
+            await asyncio.to_thread(self._publish_generation)
+
+    def _current_collection(self):
+        return self.client.get_collection(name=COLLECTION_NAME, embedding_function=None)
+
+    @staticmethod
+    def _generation_of(collection) -> Optional[str]:
+        return (collection.metadata or {}).get("generation")
+
+    def _publish_generation(self):
+        """Stamp the collection with a new generation so other processes see this write."""
+        self._generation = uuid.uuid4().hex
+        try:
+            self.collection.modify(metadata={**COLLECTION_METADATA, "generation": self._generation})
+        except Exception as e:
+            logger.warning(f"Could not publish collection generation: {e}")
+
+    async def _scan_into(self, lexical: Optional[LexicalIndex]) -> Dict[str, int]:
+        """One paginated scan: returns the type counts and fills `lexical` when given."""
+        counts: Dict[str, int] = {}
+        async for page in self.scan_metadata(include_content=lexical is not None):
+            for item in page:
+                doc_type = item["metadata"].get('document_type', 'unknown')
+                counts[doc_type] = counts.get(doc_type, 0) + 1
+            if lexical is not None:
+                await asyncio.to_thread(
+                    lexical.add, [(item["id"], item["content"], item["metadata"]) for item in page]
+                )
+        return counts
+
+    async def _sync_local_indexes(self):
+        """
+        Load the persisted type counts and lexical index, rebuilding whichever
+        no longer matches the collection with one paginated scan.
+        """
+        count = await asyncio.to_thread(self.collection.count)
+        counts_stale = not self.type_counts.load() or self.type_counts.total != count
+        lexical_stale = len(self.lexical) != count
+        if not counts_stale and not lexical_stale:
+            return
+
+        logger.info(f"Rebuilding local indexes from {count} documents "
+                    f"(type counts: {counts_stale}, lexical: {lexical_stale})")
+        if lexical_stale:
+            await asyncio.to_thread(self.lexical.clear)
+        counts = await self._scan_into(self.lexical if lexical_stale else None)
+        if counts_stale:
+            self.type_counts.reset(counts)
+
+    async def refresh_local_indexes(self, force: bool = False):
+        """
+        With a Chroma server, rebuild the in-memory lexical index and type
+        counts when another process changed the collection (new generation
+        or different document count). Searches keep using the previous index
+        until the new one is swapped in.
+        """
+        if not self.remote or self._refresh_lock.locked():
+            return
+        if not force and time.monotonic() - self._refreshed_at < self.index_refresh_interval:
+            return
+        async with self._refresh_lock:
+            self._refreshed_at = time.monotonic()
+            try:
+                collection = await asyncio.to_thread(self._current_collection)
+                if collection.id != self.collection.id:
+                    # Cleared and recreated by another process
+                    self.collection = collection
+                    force = True
+                generation = self._generation_of(collection)
+                count = await asyncio.to_thread(self.collection.count)
+                if not force and generation == self._generation and count == len(self.lexical):
+                    return
+
+                version = self.version
+                lexical = LexicalIndex()
+                counts = await self._scan_into(lexical)
+            except Exception as e:
+                logger.warning(f"Could not refresh local indexes: {e}")
+                return
+            if version != self.version:
+                # This process wrote meanwhile; try again on the next check
+                self._refreshed_at = 0.0
+                return
+            self.lexical = lexical
+            self.type_counts.reset(counts)
+            self._generation = generation
+            await self._collection_changed(publish=False)
+            logger.info(f"Reloaded local indexes: {len(lexical)} documents changed by other processes")
+
+    async def _document_types(self, document_ids: List[str]) -> Dict[str, str]:
+        """Current document_type of each existing ID (missing IDs are left out)."""
+        existing = await asyncio.to_thread(self.collection.get, ids=document_ids, include=['metadatas'])
+        return {
+            document_id: (metadata or {}).get('document_type', 'unknown')
+            for document_id, metadata in zip(existing['ids'], existing['metadatas'])
+        }
+
     async def _initialize_default_knowledge(self):
-        """Initialize with default healthcare knowledge."""
+        """
+        Seed the default healthcare knowledge into an empty collection.
+
+        A non-empty collection is left as it is, so defaults an operator
+        deleted stay deleted; only duplicate copies of a default are removed
+        (see _dedupe_default_knowledge). Content-hash IDs and upserts make
+        seeding idempotent: workers or replicas seeding an empty collection
+        at the same time write the same IDs, so one copy remains.
+        """
         try:
-            # Check if we already have documents
-            existing_docs = self.collection.count()
+            existing_docs = await asyncio.to_thread(self.collection.count)
             if existing_docs > 0:
                 logger.info(f"Vector store already contains {existing_docs} documents")
+                await self._dedupe_default_knowledge()
                 return
 
-            default_knowledge = [
-                {
-                    "content": "L'échelle de Bristol classe les selles en 7 types: Type 1-2 indique constipation, Type 3-4 est normal, Type 5-7 indique diarrhée. Surveiller les changements de pattern.",
-                    "document_type": "protocol",
-                    "metadata": {"topic": "bristol_scale", "language": "fr"}
-                },
-                {
-                    "content": "Pour les personnes avec TSA, maintenir une routine prévisible est essentiel. Les changements doivent être introduits graduellement avec préparation.",
-                    "document_type": "guideline",
-                    "metadata": {"topic": "autism_care", "language": "fr"}
-                },
-                {
-                    "content": "La déficience intellectuelle nécessite une communication adaptée: phrases simples, temps de réponse, supports visuels, et patience.",
-                    "document_type": "guideline", 
-                    "metadata": {"topic": "intellectual_disability", "language": "fr"}
-                },
-                {
-                    "content": "Signes d'urgence médicale: changement soudain de comportement, fièvre élevée, difficultés respiratoires, perte de conscience. Contacter immédiatement les services médicaux.",
-                    "document_type": "emergency_protocol",
-                    "metadata": {"topic": "emergency", "language": "fr"}
-                },
-                {
-                    "content": "L'hydratation est cruciale: surveiller la couleur des urines, encourager la consommation d'eau, adapter selon la température et l'activité.",
-                    "document_type": "health_guideline",
-                    "metadata": {"topic": "hydration", "language": "fr"}
-                }
-            ]
+            result = await self.add_documents(DEFAULT_KNOWLEDGE)
 
-            # Add default knowledge to collection
-            for i, doc in enumerate(default_knowledge):
-                await self.add_document(
-                    content=doc["content"],
-                    document_type=doc["document_type"],
-                    metadata=doc["metadata"]
-                )
-
-            logger.info(f"Added {len(default_knowledge)} default knowledge documents")
+            logger.info(f"Default knowledge: {result['added']} added, {result['skipped']} already present")
 
         except Exception as e:
             logger.error(f"Error initializing default knowledge: {e}")
 
+    async def _dedupe_default_knowledge(self):
+        """
+        Keep one copy of each default document, matched by topic and content.
+
+        Stores seeded with random IDs could get a second, content-hash copy
+        of the defaults; the original copy is kept.
+        """
+        for doc in DEFAULT_KNOWLEDGE:
+            matches = await asyncio.to_thread(
+                self.collection.get, where={"topic": doc["metadata"]["topic"]}, include=['documents']
+            )
+            copies = [
+                document_id for document_id, content in zip(matches['ids'], matches['documents'])
+                if content == doc["content"]
+            ]
+            if len(copies) < 2:
+                continue
+            hashed = self.content_id(doc["content"], doc["document_type"])
+            keep = next((document_id for document_id in copies if document_id != hashed), copies[0])
+            for document_id in copies:
+                if document_id != keep:
+                    await self.delete_document(document_id)
+            logger.info(f"Removed {len(copies) - 1} duplicate default document(s) on {doc['metadata']['topic']}")
+
     async def add_document(
         self, 
         content: str, 
@@ -115,12 +386,18 @@ class VectorStore:
             }
             
             # Add to collection
-            self.collection.add(
+            embedding = await self.embeddings.embed_one(content)
+            await asyncio.to_thread(
+                self.collection.add,
                 documents=[content],
+                embeddings=[embedding],
                 metadatas=[full_metadata],
                 ids=[document_id]
             )
             
+            self.type_counts.apply(added=[full_metadata['document_type']])
+            await asyncio.to_thread(self.lexical.add, [(document_id, content, full_metadata)])
+            await self._collection_changed()
             logger.info(f"Added document {document_id} of type {document_type}")
             return document_id
             
@@ -128,36 +405,183 @@ class VectorStore:
             logger.error(f"Error adding document: {e}")
             raise
 
+    @staticmethod
+    def content_id(content: str, document_type: str) -> str:
+        """Deterministic document ID, so re-ingesting the same chunk is a no-op."""
+        return hashlib.sha256(f"{document_type}\0{content}".encode('utf-8')).hexdigest()[:32]
+
+    async def add_documents(self, documents: List[Dict[str, Any]], batch_size: int = 256) -> Dict[str, Any]:
+        """
+        Add many documents with content-hash IDs, in batches.
+
+        Each document is a dict with `content`, `document_type` and optional
+        `metadata`. Documents whose ID is already in the collection are
+        skipped without being embedded, as are repeats within the input; the
+        rest are embedded in one batch and upserted in one call per batch.
+        Returns the added/skipped counts and the ID of every input document.
+        """
+        ids = [self.content_id(doc["content"], doc["document_type"]) for doc in documents]
+        added = 0
+        created_at = datetime.now().isoformat()
+
+        for start in range(0, len(documents), batch_size):
+            batch = dict(zip(ids[start:start + batch_size], documents[start:start + batch_size]))
+            existing = await asyncio.to_thread(self.collection.get, ids=list(batch), include=[])
+            for document_id in existing['ids']:
+                batch.pop(document_id, None)
+            if not batch:
+                continue
+
+            contents = [doc["content"] for doc in batch.values()]
+            embeddings = await self.embeddings.embed(contents)
+            metadatas = [
+                {"document_type": doc["document_type"], "created_at": created_at, **doc.get("metadata", {})}
+                for doc in batch.values()
+            ]
+            await asyncio.to_thread(
+                self.collection.upsert,
+                ids=list(batch), documents=contents, embeddings=embeddings, metadatas=metadatas
+            )
+            added += len(batch)
+            self.type_counts.apply(added=[metadata['document_type'] for metadata in metadatas])
+            await asyncio.to_thread(self.lexical.add, list(zip(batch, contents, metadatas)))
+            await self._collection_changed(publish=False)
+
+        if added and self.remote:
+            await asyncio.to_thread(self._publish_generation)
+
+        skipped = len(documents) - added
+        logger.info(f"Bulk add: {added} added, {skipped} already present or repeated")
+        return {"added": added, "skipped": skipped, "ids": ids}
+
+    def _search_key(self, query: str, limit: int, document_type: Optional[str], mode: str) -> tuple:
+        return (normalize_text(query).lower(), limit, document_type, mode)
+
+    def cached_search(self, query: str, limit: int = 5, document_type: Optional[str] = None,
+                      mode: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """Return cached results for this query, or None when it has to be searched."""
+        key = self._search_key(query, limit, document_type, mode or self.search_mode)
+        results = self._search_cache.get(key)
+        if results is None:
+            self.search_cache_misses += 1
+            return None
+        self._search_cache.move_to_end(key)
+        self.search_cache_hits += 1
+        return results
+
+    def lexical_fast_path(self, query: str) -> bool:
+        """Short exact-term queries ("TSA", "Bristol type 6") are answered by BM25 alone."""
+        return len(analyze(query)) <= LEXICAL_FAST_PATH_TERMS and self.lexical.covers(query)
+
+    def needs_embedding(self, query: str, mode: Optional[str] = None) -> bool:
+        mode = mode or self.search_mode
+        return mode == 'vector' or (mode == 'hybrid' and not self.lexical_fast_path(query))
+
+    async def _vector_results(self, query: str, limit: int, document_type: Optional[str],
+                              query_embedding: Optional[List[float]]) -> List[Dict[str, Any]]:
+        where_clause = {}
+        if document_type:
+            where_clause["document_type"] = document_type
+
+        # Perform similarity search
+        embedding = query_embedding or await self.embeddings.embed_one(query)
+        results = await asyncio.to_thread(
+            self.collection.query,
+            query_embeddings=[embedding],
+            n_results=limit,
+            where=where_clause if where_clause else None
+        )
+
+        # Format results
+        formatted_results = []
+        if results['documents'] and len(results['documents']) > 0:
+            for i, doc in enumerate(results['documents'][0]):
+                formatted_results.append({
+                    "id": results['ids'][0][i],
+                    "content": doc,
+                    "metadata": results['metadatas'][0][i],
+                    "distance": results['distances'][0][i] if 'distances' in results else None
+                })
+        return formatted_results
+
+    def _lexical_results(self, query: str, limit: int, document_type: Optional[str]) -> List[Dict[str, Any]]:
+        results = []
+        for document_id, score in self.lexical.search(query, limit, document_type):
+            document = self.lexical.documents[document_id]
+            results.append({
+                "id": document_id,
+                "content": document["content"],
+                "metadata": document["metadata"],
+                "distance": None,
+                "score": score
+            })
+        return results
+
+    def _fuse(self, vector_results: List[Dict[str, Any]], lexical_results: List[Dict[str, Any]],
+              limit: int) -> List[Dict[str, Any]]:
+        """
+        Weighted sum of the vector similarity (1 - d/2, i.e. cosine for
+        normalized vectors under squared L2) and the BM25 score scaled by the
+        best lexical hit; documents missing from one list score 0 there.
+        """
+        best_lexical = max((result["score"] for result in lexical_results), default=0.0) or 1.0
+        fused: Dict[str, Dict[str, Any]] = {}
+        for result in lexical_results:
+            fused[result["id"]] = {**result, "score": (1 - self.hybrid_alpha) * result["score"] / best_lexical}
+        for result in vector_results:
+            similarity = max(0.0, 1 - result["distance"] / 2) if result["distance"] is not None else 0.0
+            entry = fused.setdefault(result["id"], {**result, "score": 0.0})
+            entry["distance"] = result["distance"]
+            entry["score"] += self.hybrid_alpha * similarity
+        return sorted(fused.values(), key=lambda result: result["score"], reverse=True)[:limit]
+
     async def search_documents(
         self, 
         query: str, 
         limit: int = 5,
-        document_type: Optional[str] = None
+        document_type: Optional[str] = None,
+        query_embedding: Optional[List[float]] = None,
+        mode: Optional[str] = None,
+        check_cache: bool = True
     ) -> List[Dict[str, Any]]:
-        """Search for relevant documents using semantic similarity."""
+        """
+        Search for relevant documents.
+
+        `mode` is 'vector' (embedding similarity), 'lexical' (BM25 only) or
+        'hybrid' (both, fused; the default), which falls back to the lexical
+        fast path for short exact-term queries. Results are cached per
+        normalized query until the collection changes; pass `query_embedding`
+        when the caller already embedded the query, and `check_cache=False`
+        when it already missed in cached_search.
+        """
         try:
-            where_clause = {}
-            if document_type:
-                where_clause["document_type"] = document_type
-
-            # Perform similarity search
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=limit,
-                where=where_clause if where_clause else None
-            )
-            
-            # Format results
-            formatted_results = []
-            if results['documents'] and len(results['documents']) > 0:
-                for i, doc in enumerate(results['documents'][0]):
-                    formatted_results.append({
-                        "id": results['ids'][0][i],
-                        "content": doc,
-                        "metadata": results['metadatas'][0][i],
-                        "distance": results['distances'][0][i] if 'distances' in results else None
-                    })
+            mode = mode or self.search_mode
+            if mode not in SEARCH_MODES:
+                raise ValueError(f"Unknown search mode {mode!r}, expected one of {SEARCH_MODES}")
+            await self.refresh_local_indexes()
+            cached = self.cached_search(query, limit, document_type, mode) if check_cache else None
+            if cached is not None:
+                return cached
+
+            version = self.version
+            if mode == 'vector':
+                formatted_results = await self._vector_results(query, limit, document_type, query_embedding)
+            elif mode == 'lexical' or self.lexical_fast_path(query):
+                formatted_results = self._lexical_results(query, limit, document_type)
+            else:
+                # Widen both candidate lists so fusion can promote documents ranked lower in one
+                formatted_results = self._fuse(
+                    await self._vector_results(query, limit * 2, document_type, query_embedding),
+                    self._lexical_results(query, limit * 2, document_type),
+                    limit
+                )
             
+            # Skip caching if the collection changed while we were searching
+            if version == self.version:
+                self._search_cache[self._search_key(query, limit, document_type, mode)] = formatted_results
+                while len(self._search_cache) > self.search_cache_size:
+                    self._search_cache.popitem(last=False)
+
             logger.info(f"Found {len(formatted_results)} documents for query: {query}")
             return formatted_results
             
@@ -179,13 +603,26 @@ class VectorStore:
                 "updated_at": datetime.now().isoformat()
             }
             
+            previous = await self._document_types([document_id])
+
             # Update in collection
-            self.collection.update(
+            embedding = await self.embeddings.embed_one(content)
+            await asyncio.to_thread(
+                self.collection.update,
                 ids=[document_id],
                 documents=[content],
+                embeddings=[embedding],
                 metadatas=[full_metadata]
             )
+            if document_id in previous:
+                stored = self.lexical.documents.get(document_id, {}).get("metadata", {})
+                await asyncio.to_thread(self.lexical.add, [(document_id, content, {**stored, **full_metadata})])
             
+            if document_id in previous:
+                new_type = full_metadata.get('document_type', previous[document_id])
+                if new_type != previous[document_id]:
+                    self.type_counts.apply(added=[new_type], removed=[previous[document_id]])
+            await self._collection_changed()
             logger.info(f"Updated document {document_id}")
             return True
             
@@ -196,7 +633,11 @@ class VectorStore:
     async def delete_document(self, document_id: str) -> bool:
         """Delete a document from the vector store."""
         try:
-            self.collection.delete(ids=[document_id])
+            previous = await self._document_types([document_id])
+            await asyncio.to_thread(self.collection.delete, ids=[document_id])
+            self.type_counts.apply(removed=list(previous.values()))
+            await asyncio.to_thread(self.lexical.remove, [document_id])
+            await self._collection_changed()
             logger.info(f"Deleted document {document_id}")
             return True
             
@@ -207,19 +648,17 @@ class VectorStore:
     async def get_collection_stats(self) -> Dict[str, Any]:
         """Get statistics about the document collection."""
         try:
-            count = self.collection.count()
-            
-            # Get document types distribution
-            all_docs = self.collection.get()
-            doc_types = {}
-            if all_docs['metadatas']:
-                for metadata in all_docs['metadatas']:
-                    doc_type = metadata.get('document_type', 'unknown')
-                    doc_types[doc_type] = doc_types.get(doc_type, 0) + 1
-            
+            await self.refresh_local_indexes()
+            count = await asyncio.to_thread(self.collection.count)
+
+            # Document types distribution, maintained on every write
             return {
                 "total_documents": count,
-                "document_types": doc_types,
+                "document_types": dict(self.type_counts.counts),
+                "counts_in_sync": self.type_counts.total == count,
+                "lexical_documents": len(self.lexical),
+                "search_mode": self.search_mode,
+                "chroma": "server" if self.remote else "embedded",
                 "collection_name": self.collection.name
             }
             
@@ -227,16 +666,51 @@ class VectorStore:
             logger.error(f"Error getting collection stats: {e}")
             return {"error": "Unable to get stats"}
 
+    async def scan_metadata(
+        self,
+        page_size: int = 500,
+        document_type: Optional[str] = None,
+        include_content: bool = False
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Walk the collection one page at a time, yielding lists of
+        {id, metadata[, content]} without ever loading it whole.
+        """
+        include = ['metadatas', 'documents'] if include_content else ['metadatas']
+        where = {"document_type": document_type} if document_type else None
+        offset = 0
+        while True:
+            page = await asyncio.to_thread(
+                self.collection.get, where=where, limit=page_size, offset=offset, include=include
+            )
+            if not page['ids']:
+                return
+            items = []
+            for i, document_id in enumerate(page['ids']):
+                item = {"id": document_id, "metadata": page['metadatas'][i] or {}}
+                if include_content:
+                    item["content"] = page['documents'][i]
+                items.append(item)
+            yield items
+            if len(items) < page_size:
+                return
+            offset += page_size
+
     async def clear_collection(self) -> bool:
         """Clear all documents from the collection (use with caution)."""
         try:
             # This is a destructive operation
-            self.client.delete_collection(self.collection.name)
-            self.collection = self.client.create_collection(
-                name="irielle_documents",
-                metadata={"description": "Healthcare documents and knowledge base"}
+            await asyncio.to_thread(self.client.delete_collection, self.collection.name)
+            self.collection = await asyncio.to_thread(
+                self.client.create_collection,
+                name=COLLECTION_NAME,
+                metadata=COLLECTION_METADATA,
+                embedding_function=None
             )
             
+            self.type_counts.reset()
+            await asyncio.to_thread(self.lexical.clear)
+            await self._collection_changed()
             logger.warning("Collection cleared - all documents deleted")
             return True
             
@@ -2,7 +2,7 @@ import { NextRequest, NextResponse } from 'next/server';
 
 export async function POST(request: NextRequest) {
   try {
-    const { text } = await request.json();
+    const { text, stream = false } = await request.json();
 
     if (!text || typeof text !== 'string') {
       return NextResponse.json(
@@ -22,7 +22,8 @@ export async function POST(request: NextRequest) {
       body: JSON.stringify({ 
         text,
         context: 'healthcare', // Specify medical/healthcare context
-        language: 'french'
+        language: 'french',
+        stream
       }),
     });
 
@@ -30,6 +31,16 @@ export async function POST(request: NextRequest) {
       throw new Error(`AI Backend error: ${response.status}`);
     }
 
+    // Streaming mode: pass the backend NDJSON events straight through
+    if (stream && response.body) {
+      return new Response(response.body, {
+        headers: {
+          'Content-Type': 'application/x-ndjson',
+          'Cache-Control': 'no-cache',
+        },
+      });
+    }
+
     const data = await response.json();
 
     return NextResponse.json({
@@ -34,12 +34,14 @@ export interface UseAIAssistanceOptions {
   language?: 'french' | 'english';
   autoCorrect?: boolean;
   enableSuggestions?: boolean;
+  streaming?: boolean;
 }
 
 export function useAIAssistance(options: UseAIAssistanceOptions = {}) {
   const [isProcessing, setIsProcessing] = useState(false);
   const [currentSuggestion, setCurrentSuggestion] = useState<AISuggestion | null>(null);
   const [showSuggestionModal, setShowSuggestionModal] = useState(false);
+  const [streamingText, setStreamingText] = useState('');
   const [realtimeErrors, setRealtimeErrors] = useState<Array<{
     type: 'grammar' | 'spelling' | 'style';
     message: string;
@@ -51,7 +53,8 @@ export function useAIAssistance(options: UseAIAssistanceOptions = {}) {
     context = 'healthcare',
     language = 'french',
     autoCorrect = false,
-    enableSuggestions = true
+    enableSuggestions = true,
+    streaming = false
   } = options;
 
   // Real-time text analysis for Grammarly-like underlines
@@ -110,7 +113,8 @@ export function useAIAssistance(options: UseAIAssistanceOptions = {}) {
           text, 
           context, 
           language,
-          auto_apply: autoCorrect
+          auto_apply: autoCorrect,
+          stream: streaming
         })
       });
 
@@ -118,7 +122,9 @@ export function useAIAssistance(options: UseAIAssistanceOptions = {}) {
         throw new Error('Erreur lors de la correction');
       }
 
-      const data = await response.json();
+      const data = streaming
+        ? await readAIStream(response, setStreamingText)
+        : await response.json();
       
       if (data.success && data.corrected_text) {
         const suggestion: AISuggestion = {
@@ -154,8 +160,9 @@ export function useAIAssistance(options: UseAIAssistanceOptions = {}) {
       return false;
     } finally {
       setIsProcessing(false);
+      setStreamingText('');
     }
-  }, [context, language, autoCorrect]);
+  }, [context, language, autoCorrect, streaming]);
 
   // Text summarization
   const summarizeText = useCallback(async (text: string): Promise<boolean> => {
@@ -173,7 +180,8 @@ export function useAIAssistance(options: UseAIAssistanceOptions = {}) {
           text, 
           context, 
           language,
-          summary_type: 'professional'
+          summary_type: 'professional',
+          stream: streaming
         })
       });
 
@@ -181,7 +189,9 @@ export function useAIAssistance(options: UseAIAssistanceOptions = {}) {
         throw new Error('Erreur lors de la génération du résumé');
       }
 
-      const data = await response.json();
+      const data = streaming
+        ? await readAIStream(response, setStreamingText)
+        : await response.json();
       
       if (data.success && data.summary) {
         const suggestion: AISuggestion = {
@@ -210,8 +220,9 @@ export function useAIAssistance(options: UseAIAssistanceOptions = {}) {
       return false;
     } finally {
       setIsProcessing(false);
+      setStreamingText('');
     }
-  }, [context, language]);
+  }, [context, language, streaming]);
 
   // Enhanced text improvement
   const enhanceText = useCallback(async (text: string, enhancementType: 'professional' | 'concise' | 'detailed' = 'professional'): Promise<boolean> => {
@@ -305,6 +316,7 @@ export function useAIAssistance(options: UseAIAssistanceOptions = {}) {
     currentSuggestion,
     showSuggestionModal,
     realtimeErrors,
+    streamingText,
     
     // Actions
     correctText,
@@ -320,6 +332,46 @@ export function useAIAssistance(options: UseAIAssistanceOptions = {}) {
   };
 }
 
+// Read an NDJSON stream of {type: 'token' | 'done' | 'error'} events from the AI backend.
+// Calls onPartial with the text accumulated so far and resolves with the final "done" payload.
+async function readAIStream(
+  response: Response,
+  onPartial: (text: string) => void
+): Promise<any> {
+  if (!response.body) {
+    throw new Error('Flux de réponse indisponible');
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let partial = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    const lines = buffer.split('\n');
+    buffer = lines.pop() || '';
+
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      const event = JSON.parse(line);
+      if (event.type === 'token') {
+        partial += event.content;
+        onPartial(partial);
+      } else if (event.type === 'done') {
+        return event;
+      } else if (event.type === 'error') {
+        throw new Error(event.detail);
+      }
+    }
+  }
+
+  throw new Error('Flux interrompu avant la fin de la génération');
+}
+
 // Utility function for debouncing
 function debounce<T extends (...args: any[]) => any>(
   func: T,